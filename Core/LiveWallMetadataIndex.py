@@ -0,0 +1,197 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from Utility.VideoAnalyzer import VideoProbe, probe_video
+
+
+class LiveWallMetadataIndex:
+    """Persistent SQLite index of video metadata keyed by path, size and mtime.
+
+    Unchanged files are answered from the index without spawning ffprobe;
+    a changed or unknown file is probed once and its row is replaced.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_path=None):
+        self.cache_dir = os.path.expanduser("~/.cache/MyLiveWall")
+        self.db_path = db_path or os.path.join(self.cache_dir, "metadata.sqlite3")
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.probes = 0  # Número de ffprobe executados por este índice
+        self._connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._create_tables()
+
+    @classmethod
+    def shared(cls) -> "LiveWallMetadataIndex":
+        """Index instance shared by the whole application"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _create_tables(self):
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS videos (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    duration REAL,
+                    width INTEGER,
+                    height INTEGER,
+                    fps REAL,
+                    codec TEXT,
+                    bitrate INTEGER,
+                    pix_fmt TEXT,
+                    tags TEXT,
+                    preprocessed INTEGER,
+                    updated REAL
+                )
+            """)
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS palettes (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    params TEXT NOT NULL,
+                    palette TEXT NOT NULL,
+                    updated REAL
+                )
+            """)
+
+    @staticmethod
+    def _identity(video_path):
+        stat = os.stat(video_path)
+        return os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns
+
+    def get(self, video_path) -> Optional[VideoProbe]:
+        """Metadata of an unchanged file, or None if unknown or stale"""
+        try:
+            path, size, mtime_ns = self._identity(video_path)
+        except OSError:
+            return None
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT duration, width, height, fps, codec, bitrate, pix_fmt, tags FROM videos "
+                "WHERE path=? AND size=? AND mtime_ns=?",
+                (path, size, mtime_ns)
+            ).fetchone()
+
+        if row is None:
+            return None
+        duration, width, height, fps, codec, bitrate, pix_fmt, tags = row
+        return VideoProbe(
+            duration=duration,
+            width=width,
+            height=height,
+            fps=fps,
+            codec=codec,
+            bitrate=bitrate,
+            pix_fmt=pix_fmt,
+            tags=json.loads(tags or "{}")
+        )
+
+    def put(self, video_path, probe: VideoProbe):
+        """Store the metadata of a file under its current size and mtime"""
+        try:
+            path, size, mtime_ns = self._identity(video_path)
+        except OSError:
+            return
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO videos "
+                "(path, size, mtime_ns, duration, width, height, fps, codec, bitrate, pix_fmt, tags, preprocessed, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, probe.duration, probe.width, probe.height, probe.fps, probe.codec,
+                 probe.bitrate, probe.pix_fmt, json.dumps(probe.tags), int(probe.preprocessed), time.time())
+            )
+
+    def probe(self, video_path) -> Optional[VideoProbe]:
+        """Metadata from the index, running ffprobe only for new or changed files"""
+        probe = self.get(video_path)
+        if probe is not None:
+            return probe
+
+        probe = probe_video(video_path)
+        with self._lock:
+            self.probes += 1
+        if probe is not None:
+            self.put(video_path, probe)
+        return probe
+
+    def get_palette(self, video_path, params: dict) -> Optional[dict]:
+        """Palette stored for an unchanged file with the same analysis parameters"""
+        try:
+            path, size, mtime_ns = self._identity(video_path)
+        except OSError:
+            return None
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT palette FROM palettes WHERE path=? AND size=? AND mtime_ns=? AND params=?",
+                (path, size, mtime_ns, json.dumps(params, sort_keys=True))
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_palette(self, video_path, params: dict, palette: dict):
+        """Store the palette of a file under its current size and mtime"""
+        try:
+            path, size, mtime_ns = self._identity(video_path)
+        except OSError:
+            return
+
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO palettes (path, size, mtime_ns, params, palette, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, json.dumps(params, sort_keys=True), json.dumps(palette), time.time())
+            )
+
+    def stale_paths(self, video_paths: Iterable[str]) -> List[str]:
+        """Paths that are missing from the index or changed since indexed"""
+        stale = []
+        for video_path in video_paths:
+            try:
+                path, size, mtime_ns = self._identity(video_path)
+            except OSError:
+                continue
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT 1 FROM videos WHERE path=? AND size=? AND mtime_ns=?",
+                    (path, size, mtime_ns)
+                ).fetchone()
+            if row is None:
+                stale.append(video_path)
+        return stale
+
+    def remove(self, video_path):
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM videos WHERE path=?", (os.path.abspath(video_path),))
+            self._connection.execute("DELETE FROM palettes WHERE path=?", (os.path.abspath(video_path),))
+
+    def prune_missing(self, directory=None):
+        """Drop rows of files that no longer exist (optionally only under `directory`)"""
+        with self._lock:
+            if directory:
+                prefix = os.path.join(os.path.abspath(directory), "")
+                rows = self._connection.execute(
+                    "SELECT path FROM videos WHERE substr(path, 1, ?)=?", (len(prefix), prefix)
+                ).fetchall()
+            else:
+                rows = self._connection.execute("SELECT path FROM videos").fetchall()
+
+        missing = [(path,) for (path,) in rows if not os.path.exists(path)]
+        if missing:
+            with self._lock, self._connection:
+                self._connection.executemany("DELETE FROM videos WHERE path=?", missing)
+                self._connection.executemany("DELETE FROM palettes WHERE path=?", missing)
+        return len(missing)
@@ -0,0 +1,141 @@
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+
+class MpvIpcError(Exception):
+    """Raised when an mpv instance can't be reached or rejects a command."""
+
+
+class MpvIpcClient:
+    """Client for the JSON IPC socket of one mpv instance (--input-ipc-server).
+
+    Replies are matched to commands by request_id; events received while
+    waiting for a reply are kept so they can be consumed by wait_event.
+    """
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self._socket = None
+        self._buffer = b""
+        self._lock = threading.Lock()
+        self._request_id = 0
+        self.events = deque(maxlen=100)
+
+    def connect(self, timeout=5.0):
+        """Connect to the socket, waiting for mpv to create it"""
+        deadline = time.monotonic() + timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+                self._socket = sock
+                self._buffer = b""
+                return self
+            except OSError as e:
+                sock.close()
+                if time.monotonic() >= deadline:
+                    raise MpvIpcError(f"mpv IPC indisponível em {self.socket_path}: {e}")
+                time.sleep(0.02)
+
+    @property
+    def connected(self):
+        return self._socket is not None
+
+    def close(self):
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+
+    def _read_message(self, deadline):
+        while b"\n" not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise MpvIpcError("tempo esgotado aguardando resposta do mpv")
+            self._socket.settimeout(remaining)
+            try:
+                chunk = self._socket.recv(65536)
+            except socket.timeout:
+                raise MpvIpcError("tempo esgotado aguardando resposta do mpv")
+            except OSError as e:
+                self.close()
+                raise MpvIpcError(f"conexão com o mpv perdida: {e}")
+            if not chunk:
+                self.close()
+                raise MpvIpcError("o mpv fechou a conexão IPC")
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return json.loads(line)
+
+    def command(self, *args, timeout=2.0):
+        """Run an mpv command and return its data field"""
+        with self._lock:
+            if self._socket is None:
+                self.connect(timeout)
+            self._request_id += 1
+            request_id = self._request_id
+            payload = json.dumps({"command": list(args), "request_id": request_id}).encode() + b"\n"
+            try:
+                self._socket.sendall(payload)
+            except OSError as e:
+                self.close()
+                raise MpvIpcError(f"conexão com o mpv perdida: {e}")
+
+            deadline = time.monotonic() + timeout
+            while True:
+                message = self._read_message(deadline)
+                if "event" in message:
+                    self.events.append(message)
+                    continue
+                if message.get("request_id")!=request_id:
+                    continue
+                if message.get("error")!="success":
+                    raise MpvIpcError(f"{args[0]}: {message.get('error')}")
+                return message.get("data")
+
+    def wait_event(self, name, timeout=5.0):
+        """Wait for an event (ex: playback-restart) and return it"""
+        with self._lock:
+            for event in list(self.events):
+                if event.get("event")==name:
+                    self.events.remove(event)
+                    return event
+            if self._socket is None:
+                self.connect(timeout)
+            deadline = time.monotonic() + timeout
+            while True:
+                message = self._read_message(deadline)
+                if message.get("event")==name:
+                    return message
+                if "event" in message:
+                    self.events.append(message)
+
+    def get_property(self, name, default=None):
+        """Property value, or `default` when it is unavailable"""
+        try:
+            return self.command("get_property", name)
+        except MpvIpcError:
+            if self._socket is None:
+                raise
+            return default
+
+    def set_property(self, name, value):
+        return self.command("set_property", name, value)
+
+    def loadfile(self, path, mode="replace"):
+        return self.command("loadfile", os.path.abspath(path), mode)
+
+    def set_pause(self, paused):
+        return self.set_property("pause", bool(paused))
+
+    def quit(self):
+        try:
+            self.command("quit", timeout=0.5)
+        except MpvIpcError:
+            pass
+        self.close()
@@ -0,0 +1,291 @@
+import select
+import threading
+from typing import Callable, Iterable, List, NamedTuple, Optional, Set
+
+try:
+    from Xlib import X, display as xdisplay
+    from Xlib.error import XError
+except ImportError:  # python-xlib é opcional: sem ele o monitor de oclusão fica desativado
+    xdisplay = None
+
+# Tipos de janela que nunca escondem o wallpaper
+IGNORED_WINDOW_TYPES = ("_NET_WM_WINDOW_TYPE_DESKTOP", "_NET_WM_WINDOW_TYPE_DOCK")
+# Janelas do próprio wallpaper
+IGNORED_WINDOW_CLASSES = ("xwinwrap", "mpv")
+
+
+class WindowInfo(NamedTuple):
+    """Geometry and state of a top-level window, in root coordinates."""
+    x: int
+    y: int
+    width: int
+    height: int
+    fullscreen: bool = False
+    active: bool = False
+
+
+def _intersection(monitor, window):
+    left = max(monitor.x, window.x)
+    top = max(monitor.y, window.y)
+    right = min(monitor.x + monitor.width, window.x + window.width)
+    bottom = min(monitor.y + monitor.height, window.y + window.height)
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
+
+
+def covered_area(monitor, windows: Iterable[WindowInfo]) -> int:
+    """Area of `monitor` hidden by the union of `windows`"""
+    rects = [rect for rect in (_intersection(monitor, window) for window in windows) if rect]
+    if not rects:
+        return 0
+
+    # Compressão de coordenadas: poucas janelas, então O(n³) é suficiente
+    xs = sorted({x for rect in rects for x in (rect[0], rect[2])})
+    ys = sorted({y for rect in rects for y in (rect[1], rect[3])})
+    area = 0
+    for i in range(len(xs) - 1):
+        for j in range(len(ys) - 1):
+            if any(r[0] <= xs[i] and xs[i + 1] <= r[2] and r[1] <= ys[j] and ys[j + 1] <= r[3] for r in rects):
+                area += (xs[i + 1] - xs[i]) * (ys[j + 1] - ys[j])
+    return area
+
+
+def covered_monitors(monitors, windows: List[WindowInfo]) -> Set[str]:
+    """
+    Names of the monitors whose wallpaper can't be seen.
+
+    A monitor is covered when the union of the visible windows hides all of
+    it, or when a fullscreen window is centered on it.
+    """
+    covered = set()
+    for monitor in monitors:
+        for window in windows:
+            if not window.fullscreen:
+                continue
+            center_x = window.x + window.width // 2
+            center_y = window.y + window.height // 2
+            if (monitor.x <= center_x < monitor.x + monitor.width and
+                    monitor.y <= center_y < monitor.y + monitor.height):
+                covered.add(monitor.name)
+                break
+        else:
+            if covered_area(monitor, windows) >= monitor.width * monitor.height:
+                covered.add(monitor.name)
+    return covered
+
+
+class X11WindowSource:
+    """Reads the visible top-level windows of an X11 display with python-xlib"""
+
+    def __init__(self, display_name=None):
+        if xdisplay is None:
+            raise RuntimeError("python-xlib não está instalado")
+        self.display = xdisplay.Display(display_name)
+        self.root = self.display.screen().root
+        self._atoms = {}
+
+    def atom(self, name):
+        if name not in self._atoms:
+            self._atoms[name] = self.display.intern_atom(name)
+        return self._atoms[name]
+
+    def fileno(self):
+        return self.display.fileno()
+
+    def watch_root(self):
+        """Receive root property and stacking changes (active window, client list, geometry)"""
+        self.root.change_attributes(event_mask=X.PropertyChangeMask | X.SubstructureNotifyMask)
+        self.display.flush()
+
+    def drain_events(self):
+        count = 0
+        while self.display.pending_events():
+            self.display.next_event()
+            count += 1
+        return count
+
+    def _atom_list(self, window, name):
+        prop = window.get_full_property(self.atom(name), X.AnyPropertyType)
+        return list(prop.value) if prop else []
+
+    def _client_windows(self):
+        client_list = self._atom_list(self.root, "_NET_CLIENT_LIST_STACKING") or self._atom_list(self.root, "_NET_CLIENT_LIST")
+        if client_list:
+            return [self.display.create_resource_object("window", wid) for wid in client_list]
+        # Sem window manager (ex: Xvfb) as janelas de topo são filhas diretas da raiz
+        return [w for w in self.root.query_tree().children if not w.get_attributes().override_redirect]
+
+    def windows(self) -> List[WindowInfo]:
+        active_ids = self._atom_list(self.root, "_NET_ACTIVE_WINDOW")
+        active_id = active_ids[0] if active_ids else None
+        ignored_types = {self.atom(name) for name in IGNORED_WINDOW_TYPES}
+        hidden = self.atom("_NET_WM_STATE_HIDDEN")
+        fullscreen = self.atom("_NET_WM_STATE_FULLSCREEN")
+
+        windows = []
+        for window in self._client_windows():
+            try:
+                if window.get_attributes().map_state!=X.IsViewable:
+                    continue
+                if ignored_types & set(self._atom_list(window, "_NET_WM_WINDOW_TYPE")):
+                    continue
+                wm_class = window.get_wm_class() or ()
+                if any(name.lower() in IGNORED_WINDOW_CLASSES for name in wm_class):
+                    continue
+                state = set(self._atom_list(window, "_NET_WM_STATE"))
+                if hidden in state:
+                    continue
+                geometry = window.get_geometry()
+                position = window.translate_coords(self.root, 0, 0)
+                windows.append(WindowInfo(
+                    x=-position.x,
+                    y=-position.y,
+                    width=geometry.width,
+                    height=geometry.height,
+                    fullscreen=fullscreen in state,
+                    active=window.id==active_id
+                ))
+            except XError:
+                # A janela pode ter sido destruída durante a leitura
+                continue
+        return windows
+
+
+class OcclusionMonitor:
+    """Pause the wallpaper instances of monitors covered by other windows.
+
+    Runs in its own thread, waking up on X events from the root window and
+    at least every `interval` seconds. `on_change` receives the new set of
+    covered monitor names whenever it changes.
+    """
+
+    def __init__(self, on_change: Callable[[Set[str]], None], monitors_getter: Callable[[], list],
+                 interval: float = 2.0, display_name: Optional[str] = None):
+        self.on_change = on_change
+        self.monitors_getter = monitors_getter
+        self.interval = interval
+        self.display_name = display_name
+        self.covered: Set[str] = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def available():
+        return xdisplay is not None
+
+    def start(self):
+        if not self.available():
+            print("python-xlib não encontrado; pausa automática desativada")
+            return False
+        if self._thread and self._thread.is_alive():
+            return True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="occlusion-monitor", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.interval + 1)
+            self._thread = None
+
+    def _run(self):
+        try:
+            source = X11WindowSource(self.display_name)
+            source.watch_root()
+        except Exception as e:
+            print(f"Erro ao conectar ao X11 para detectar oclusão: {e}")
+            return
+
+        while not self._stop.is_set():
+            try:
+                covered = covered_monitors(self.monitors_getter(), source.windows())
+            except Exception as e:
+                print(f"Erro ao verificar oclusão: {e}")
+                covered = set()
+            if covered!=self.covered:
+                self.covered = covered
+                self.on_change(covered)
+
+            select.select([source.fileno()], [], [], self.interval)
+            source.drain_events()
+
+        # Ao parar, nada deve ficar pausado
+        if self.covered:
+            self.covered = set()
+            self.on_change(set())
+
+
+def main():
+    import argparse
+    import time
+    from types import SimpleNamespace
+
+    parser = argparse.ArgumentParser(description='Detecta monitores cobertos por janelas (X11)')
+    parser.add_argument('--display', help='Display X (ex: :99 de um Xvfb)')
+    parser.add_argument('--monitors',
+        help='Monitores simulados, ex: 1920x1080+0+0,1280x1024+1920+0 (padrão: monitores reais)')
+    parser.add_argument('--selftest', action='store_true',
+        help='Cria janelas sintéticas e verifica a detecção (use com Xvfb)')
+
+    args = parser.parse_args()
+
+    if xdisplay is None:
+        parser.error('python-xlib não está instalado')
+
+    if args.monitors:
+        monitors = []
+        for i, spec in enumerate(args.monitors.split(',')):
+            size, x, y = spec.split('+')
+            width, height = size.split('x')
+            monitors.append(SimpleNamespace(name=f"MON-{i}", x=int(x), y=int(y), width=int(width), height=int(height)))
+    else:
+        from screeninfo import get_monitors
+        monitors = get_monitors()
+
+    source = X11WindowSource(args.display)
+
+    if not args.selftest:
+        print(f"Janelas: {source.windows()}")
+        print(f"Monitores cobertos: {sorted(covered_monitors(monitors, source.windows()))}")
+        return
+
+    def create_window(x, y, width, height):
+        window = source.root.create_window(x, y, width, height, 0, source.display.screen().root_depth)
+        window.map()
+        source.display.sync()
+        return window
+
+    def check(expected, label):
+        time.sleep(0.1)
+        covered = covered_monitors(monitors, source.windows())
+        print(f"{'OK  ' if covered==expected else 'FAIL'} {label}: {sorted(covered)}")
+        return covered==expected
+
+    first = monitors[0]
+    results = [check(set(), "sem janelas")]
+
+    half = create_window(first.x, first.y, first.width // 2, first.height)
+    results.append(check(set(), "metade do monitor coberta"))
+    other_half = create_window(first.x + first.width // 2, first.y, first.width - first.width // 2, first.height)
+    results.append(check({first.name}, "duas janelas cobrindo o monitor"))
+    other_half.unmap()
+    source.display.sync()
+    results.append(check(set(), "janela escondida"))
+
+    small = create_window(first.x + 10, first.y + 10, 200, 200)
+    small.change_property(source.atom("_NET_WM_STATE"), source.display.intern_atom("ATOM"), 32,
+                          [source.atom("_NET_WM_STATE_FULLSCREEN")])
+    source.display.sync()
+    results.append(check({first.name}, "janela em tela cheia"))
+
+    for window in (half, other_half, small):
+        window.destroy()
+    source.display.sync()
+    raise SystemExit(0 if all(results) else 1)
+
+
+if __name__=="__main__":
+    main()
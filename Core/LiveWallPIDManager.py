@@ -1,9 +1,358 @@
 import os
 import json
+import queue
+import select
 import signal
 import subprocess
+import threading
 import time;
 from pathlib import Path
+from typing import Callable, List, Optional
+
+
+def process_start_time(pid) -> Optional[int]:
+    """Start time of a process in clock ticks since boot (None if it is gone).
+
+    Together with the PID it identifies a process even after the PID is reused.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # O nome do processo pode conter espaços e parênteses
+    fields = data[data.rindex(")") + 2:].split()
+    if fields[0]=="Z":
+        return None
+    return int(fields[19])
+
+
+def open_pidfd(pid) -> Optional[int]:
+    """pidfd of a process (Linux 5.3+), None where it is not supported"""
+    if not hasattr(os, "pidfd_open"):
+        return None
+    try:
+        return os.pidfd_open(pid)
+    except OSError:
+        return None
+
+
+def wait_for_exit(pid, timeout, start_time=None) -> bool:
+    """Wait until the process exits (or becomes a zombie); True if it did"""
+    pidfd = open_pidfd(pid)
+    if pidfd is not None:
+        try:
+            # O pidfd fica legível quando o processo termina
+            readable, _, _ = select.select([pidfd], [], [], timeout)
+            return bool(readable) or process_start_time(pid) is None
+        finally:
+            os.close(pidfd)
+
+    deadline = time.monotonic() + timeout
+    while True:
+        current = process_start_time(pid)
+        if current is None or (start_time is not None and current!=start_time):
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.02)
+
+
+def group_members(pgid) -> List[int]:
+    """Running processes of a process group (zombies don't count), read from /proc"""
+    members = []
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat") as f:
+                data = f.read()
+        except OSError:
+            continue
+        fields = data[data.rindex(")") + 2:].split()
+        if fields[0]!="Z" and int(fields[2])==pgid:
+            members.append(int(entry.name))
+    return members
+
+
+def group_alive(pgid) -> bool:
+    """True while some process of the group is still running (zombies don't count)"""
+    try:
+        os.killpg(pgid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # killpg também encontra zumbis, como o líder que o Popen ainda não colheu
+    return bool(group_members(pgid))
+
+
+def terminate_process(pid, start_time=None, timeout=3.0) -> bool:
+    """
+    SIGTERM the process (its whole group if it leads one), then SIGKILL
+    whatever is still running after `timeout` seconds.
+
+    With `start_time`, a PID that now belongs to another process is left alone.
+    """
+    pid = int(pid)
+    if start_time is not None and process_start_time(pid)!=start_time:
+        return True
+
+    try:
+        group = os.getpgid(pid)==pid
+    except ProcessLookupError:
+        return True
+
+    def send(sig):
+        try:
+            if group:
+                os.killpg(pid, sig)
+            else:
+                os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    deadline = time.monotonic() + timeout
+    send(signal.SIGTERM)
+    if wait_for_exit(pid, timeout, start_time):
+        if group:
+            # Filhos (mpv) podem ainda estar saindo: /proc é lido uma vez e cada um é esperado pelo pidfd
+            for member in group_members(pid):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not wait_for_exit(member, remaining, process_start_time(member)):
+                    break
+            if group_alive(pid):
+                print(f"Grupo {pid} não terminou com SIGTERM, enviando SIGKILL")
+                send(signal.SIGKILL)
+        return True
+    print(f"Processo {pid} não terminou com SIGTERM, enviando SIGKILL")
+    send(signal.SIGKILL)
+    return wait_for_exit(pid, 1.0, start_time)
+
+
+class SupervisedProcess:
+    """A command kept running by ProcessSupervisor, in its own process group"""
+
+    def __init__(self, command: List[str], name: str = ""):
+        self.command = list(command)
+        self.name = name or command[0]
+        self.process: Optional[subprocess.Popen] = None
+        self.start_time = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.pidfd = None
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    def spawn(self):
+        # Nova sessão: o grupo (xwinwrap + mpv) pode ser terminado de uma vez
+        self.process = subprocess.Popen(self.command, start_new_session=True)
+        self.start_time = process_start_time(self.process.pid)
+        self.started_at = time.monotonic()
+        self.close_pidfd()
+        self.pidfd = open_pidfd(self.process.pid)
+        return self.process
+
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def close_pidfd(self):
+        if self.pidfd is not None:
+            os.close(self.pidfd)
+            self.pidfd = None
+
+    def terminate(self, timeout=3.0):
+        if self.process is None:
+            return
+        terminate_process(self.process.pid, timeout=timeout)
+        try:
+            self.process.wait(timeout=1.0)
+        except subprocess.TimeoutExpired:
+            pass
+        self.close_pidfd()
+
+    def record(self):
+        """Entry for the PID file"""
+        return {"pid": self.pid, "start_time": self.start_time, "name": self.name}
+
+
+class ProcessSupervisor:
+    """
+    Restart supervised processes that exit unexpectedly, with exponential backoff.
+
+    Exits are detected through pidfds (or polling where they are not
+    available). A process that ran for `stable_after` seconds before dying
+    restarts after `backoff_initial` again.
+    """
+
+    def __init__(self, on_restart: Optional[Callable[[SupervisedProcess], None]] = None,
+                 backoff_initial=0.5, backoff_max=30.0, stable_after=60.0, poll_interval=0.5):
+        self.on_restart = on_restart
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.stable_after = stable_after
+        self.poll_interval = poll_interval
+        self.units: List[SupervisedProcess] = []
+        self._backoff = {}
+        self._pending = {}  # unidade -> horário do próximo restart
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = None
+
+    def add(self, unit: SupervisedProcess):
+        with self._lock:
+            self.units.append(unit)
+        self._wake()
+
+    def remove(self, unit: SupervisedProcess):
+        """Stop supervising a unit (before terminating it on purpose)"""
+        with self._lock:
+            if unit in self.units:
+                self.units.remove(unit)
+            self._pending.pop(unit, None)
+        self._wake()
+
+    def set_command(self, unit: SupervisedProcess, command: List[str]):
+        """Replace the command a unit is restarted with"""
+        with self._lock:
+            unit.command = list(command)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="process-supervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop supervising; the processes keep running"""
+        self._stop.set()
+        self._wake()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(2.0)
+        self._thread = None
+
+    def close(self):
+        self.stop()
+        for fd in (self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _wake(self):
+        try:
+            os.write(self._wake_w, b"\0")
+        except OSError:
+            pass
+
+    def _schedule_restart(self, unit, now):
+        returncode = unit.process.returncode if unit.process else None
+        if now - unit.started_at >= self.stable_after:
+            self._backoff[unit] = self.backoff_initial
+        delay = self._backoff.get(unit, self.backoff_initial)
+        self._backoff[unit] = min(delay * 2, self.backoff_max)
+        self._pending[unit] = now + delay
+        print(f"{unit.name} (pid {unit.pid}) terminou com código {returncode}; reiniciando em {delay:.1f}s")
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                units = list(self.units)
+
+            for unit in units:
+                with self._lock:
+                    if unit in self._pending or unit.process is None or unit not in self.units:
+                        continue
+                    if unit.process.poll() is not None:
+                        unit.close_pidfd()
+                        self._schedule_restart(unit, now)
+
+            # remove() altera _pending de outras threads: o resto da iteração usa esta cópia
+            with self._lock:
+                pending = dict(self._pending)
+            for unit, when in pending.items():
+                if when <= now and not self._stop.is_set():
+                    with self._lock:
+                        # Pode ter sido removida enquanto aguardava o backoff
+                        if self._pending.pop(unit, None) is None or unit not in self.units:
+                            continue
+                        try:
+                            unit.spawn()
+                            unit.restarts += 1
+                        except OSError as e:
+                            print(f"Erro ao reiniciar {unit.name}: {e}")
+                            self._schedule_restart(unit, now)
+                            continue
+                    if self.on_restart:
+                        self.on_restart(unit)
+
+            with self._lock:
+                pending = dict(self._pending)
+            next_restart = min(pending.values(), default=None)
+            fds = [self._wake_r] + [u.pidfd for u in units if u.pidfd is not None and u not in pending]
+            timeout = None
+            if next_restart is not None:
+                timeout = max(0.0, next_restart - time.monotonic())
+            if any(u.pidfd is None and u not in pending for u in units):
+                timeout = self.poll_interval if timeout is None else min(timeout, self.poll_interval)
+            try:
+                readable, _, _ = select.select(fds, [], [], timeout)
+            except (OSError, ValueError):
+                # Um pidfd foi fechado por remove() + terminate() nesse meio tempo
+                continue
+            if self._wake_r in readable:
+                os.read(self._wake_r, 1024)
+
+
+class ProcessReaper:
+    """
+    Runs process teardowns (IPC quit, SIGTERM, waiting for the group to exit)
+    on one background thread, in the order they were submitted, so the GUI
+    thread never blocks on them.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def shared(cls) -> "ProcessReaper":
+        """Reaper shared by the whole application"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def submit(self, teardown: Callable[[], None]):
+        self._queue.put(teardown)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="process-reaper", daemon=True)
+                self._thread.start()
+
+    def wait(self):
+        """Block until every submitted teardown has run (ex: before the app exits)"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            teardown = self._queue.get()
+            try:
+                teardown()
+            except Exception as e:
+                print(f"Erro ao encerrar processos: {e}")
+            finally:
+                self._queue.task_done()
+
 
 class LiveWallPIDManager:
     def __init__(self):
@@ -15,14 +364,21 @@ class LiveWallPIDManager:
         self.pid_file.parent.mkdir(parents=True, exist_ok=True)
 
     def save_process_info(self, main_pid, child_pids):
-        """Save the main process PID and its child PIDs"""
+        """Save the main process PID and its children.
+
+        `child_pids` holds SupervisedProcess.record() entries (pid + start
+        time); plain PIDs are still accepted.
+        """
         data = {
             'main_pid': main_pid,
+            'main_start_time': process_start_time(main_pid) if main_pid else None,
             'child_pids': child_pids,
             'timestamp': time.time()
         }
-        with open(self.pid_file, 'w') as f:
+        tmp_file = self.pid_file.with_suffix(".tmp")
+        with open(tmp_file, 'w') as f:
             json.dump(data, f)
+        os.replace(tmp_file, self.pid_file)
 
     def load_process_info(self):
         """Load saved process information"""
@@ -32,30 +388,26 @@ class LiveWallPIDManager:
         except (FileNotFoundError, json.JSONDecodeError):
             return None
 
-    def kill_processes(self):
-        """Kill all saved processes"""
+    def kill_processes(self, timeout=3.0):
+        """Terminate all saved processes: SIGTERM first, SIGKILL after `timeout`"""
         process_info = self.load_process_info()
-        print(process_info)
         if not process_info:
             return
 
-        # Tenta matar os processos filhos primeiro
-        for pid in process_info.get('child_pids', []):
-            try:
-                os.kill(int(pid), signal.SIGKILL)
-            except ProcessLookupError:
-                pass
+        # O processo principal (modo headless) primeiro, para que ele não reinicie os filhos
+        main_pid = process_info.get('main_pid')
+        if main_pid and int(main_pid)!=os.getpid():
+            terminate_process(main_pid, process_info.get('main_start_time'), timeout)
 
-        # Tenta matar o processo principal
-        try:
-            main_pid = process_info.get('main_pid')
-            if main_pid:
-                os.kill(int(main_pid), signal.SIGKILL)
-        except ProcessLookupError:
-            pass
+        for child in process_info.get('child_pids', []):
+            if isinstance(child, dict):
+                if child.get('pid'):
+                    terminate_process(child['pid'], child.get('start_time'), timeout)
+            else:
+                terminate_process(child, timeout=timeout)
 
         # Remove o arquivo de PIDs
         try:
             self.pid_file.unlink()
         except FileNotFoundError:
-            pass
\ No newline at end of file
+            pass
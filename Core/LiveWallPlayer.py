@@ -1,17 +1,98 @@
-import subprocess
 import json
-from screeninfo import get_monitors
+import itertools
+import os
+import threading
+import time
+from Core.LiveWallTopology import LiveWallTopology
+from Core.LiveWallMpvIpc import MpvIpcClient, MpvIpcError
+from Core.LiveWallPIDManager import ProcessReaper, ProcessSupervisor, SupervisedProcess
+from Utility import ProcStats
+
+try:
+    from Xlib import X, display as xdisplay
+except ImportError:  # python-xlib é opcional: sem ele não há standby
+    xdisplay = None
+
+# per_monitor: um xwinwrap + mpv por monitor
+# span: um único mpv decodifica uma vez e recorta a imagem para cada monitor
+PLAYBACK_MODES = ("per_monitor", "span")
+
+IPC_DIR = os.environ.get("XDG_RUNTIME_DIR") or f"/var/run/user/{os.getuid()}"
+_ipc_counter = itertools.count()
+
+# Memória que precisa continuar disponível depois de criar o standby
+STANDBY_MIN_FREE_BYTES = 512 * 2**20
+
+# Cache do demuxer: pacotes + índices ocupam um pouco mais que o arquivo
+LOOP_CACHE_OVERHEAD = 1.1
+LOOP_CACHE_MARGIN = 8 * 2**20
+# Padrões do mpv, restaurados ao trocar para um arquivo grande via IPC
+STREAM_CACHE_PROPERTIES = {"cache": "auto", "demuxer-max-bytes": "150MiB", "demuxer-max-back-bytes": "50MiB"}
+
+
+def loop_cache_policy(file_size, instances, budget):
+    """
+    ("memory", bytes per instance) when every instance can keep the whole file
+    in its demuxer cache within `budget` bytes, otherwise ("stream", 0).
+    """
+    per_instance = int(file_size * LOOP_CACHE_OVERHEAD) + LOOP_CACHE_MARGIN
+    if budget > 0 and file_size > 0 and per_instance * max(1, instances) <= budget:
+        return "memory", per_instance
+    return "stream", 0
+
+
+def ipc_socket_path():
+    """Unique path for the IPC socket of a new mpv instance"""
+    return os.path.join(IPC_DIR, f"mylivewall-mpv-{os.getpid()}-{next(_ipc_counter)}.sock")
+
+
+class PlayerInstance:
+    """One xwinwrap + mpv pair and the monitors it covers"""
+
+    def __init__(self, geometry, monitor_names, unit, ipc_path):
+        self.geometry = geometry
+        self.monitor_names = monitor_names
+        self.unit = unit
+        self.ipc_path = ipc_path
+        self.client = MpvIpcClient(ipc_path)
+        self.paused = False
+
+    @property
+    def process(self):
+        return self.unit.process
+
+    def command(self, *args, timeout=2.0):
+        return self.client.command(*args, timeout=timeout)
+
 
 class LiveWallPlayer:
     def __init__(self):
         self.video_output = "gpu"
-        self.gpu_context = "x11vk"
-        self.gpu_api = "vulkan"
-        self.hwdec = "vulkan"
+        # "auto" funciona em qualquer máquina; o auto-tune escolhe valores específicos
+        self.gpu_context = "auto"
+        self.gpu_api = "auto"
+        self.hwdec = "auto"
         self.play_all_monitors = True
         self.selected_monitor = ""
         self.video_path = ""
-        self.pids = []
+        self.playback_mode = "per_monitor"
+        self.scale_to_monitor = False
+        self.max_fps = 0
+        self.monitor_caps = {}
+        self.instances = []
+        self.started_config = None
+        self.supervisor = None
+        self.on_processes_changed = None  # Chamado (com o player) quando os processos mudam (restart, standby)
+        self.standby = None  # No máximo um player pausado fora da tela com o próximo vídeo
+        self.start_paused = False
+        self.offscreen_offset = 0
+        self.cache_budget = 0  # Bytes de RAM para manter o loop inteiro em memória (0 = sempre streaming)
+        self.cache_mode = "stream"
+        self.cache_options = []
+        self.covered = None  # Monitores cobertos na última apply_coverage (None = desconhecido)
+        self.suspended = False  # Tudo pausado, independente da cobertura (ex: durante o auto-tune)
+        # apply_topology e apply_coverage chegam de threads diferentes e alteram as instâncias
+        self._lock = threading.RLock()
 
     def set_video_output(self, output):
         self.video_output = output
@@ -35,6 +116,59 @@ class LiveWallPlayer:
     def set_video_path(self, path):
         self.video_path = path
 
+    @property
+    def pids(self):
+        """PIDs of the xwinwrap processes (each one leads the process group of its mpv)"""
+        return [instance.unit.pid for instance in self.instances]
+
+    @property
+    def processes(self):
+        return [instance.process for instance in self.instances]
+
+    def process_records(self):
+        """PID file entries of the running instances (and of the standby)"""
+        records = [instance.unit.record() for instance in self.instances]
+        if self.standby is not None:
+            records += self.standby.process_records()
+        return records
+
+    def _processes_changed(self):
+        if self.on_processes_changed:
+            self.on_processes_changed(self)
+
+    def set_playback_mode(self, mode):
+        if mode not in PLAYBACK_MODES:
+            print(f"Modo de reprodução desconhecido: {mode}")
+            mode = "per_monitor"
+        self.playback_mode = mode
+
+    def set_cache_budget(self, budget_bytes):
+        self.cache_budget = max(0, int(budget_bytes or 0))
+
+    def instance_count(self, monitors):
+        if self.play_all_monitors and self.playback_mode=="span" and len(monitors) > 1:
+            return 1
+        return len(monitors) if self.play_all_monitors else min(1, len(monitors))
+
+    def cache_plan(self, video_path, instances):
+        """(mode, properties) of the loop cache for `video_path` played by `instances` mpv processes"""
+        try:
+            file_size = os.path.getsize(video_path)
+        except OSError:
+            file_size = 0
+        mode, cache_bytes = loop_cache_policy(file_size, instances, self.cache_budget)
+        if mode=="memory":
+            # Todo o arquivo fica no cache e o retorno ao início do loop é servido pelo cache de trás
+            properties = {"cache": "yes", "demuxer-seekable-cache": "yes",
+                          "demuxer-max-bytes": str(cache_bytes), "demuxer-max-back-bytes": str(cache_bytes)}
+            print(f"Cache de loop: memória ({cache_bytes / 2**20:.0f} MB x {instances} instância(s)) "
+                  f"para {os.path.basename(video_path)}")
+        else:
+            properties = {}
+            print(f"Cache de loop: streaming ({file_size / 2**20:.0f} MB x {instances} instância(s) "
+                  f"não cabe em {self.cache_budget / 2**20:.0f} MB)")
+        return mode, properties
+
     def calculate_aspect(self, width, height):
         gcd_value = self.gcd(width, height)
         return f"{width // gcd_value}:{height // gcd_value}"
@@ -45,39 +179,521 @@ class LiveWallPlayer:
             a, b = b, a % b
         return a
 
-    def _screen(self, geometry, aspect):
+    def set_playback_caps(self, scale_to_monitor, max_fps, monitor_caps=None):
+        """Default caps plus per-monitor overrides ({name: {"scale_to_monitor": bool, "max_fps": int}})"""
+        self.scale_to_monitor = bool(scale_to_monitor)
+        self.max_fps = int(max_fps or 0)
+        self.monitor_caps = dict(monitor_caps or {})
+
+    def caps_for(self, monitor):
+        """(scale_to_monitor, max_fps) of a monitor; max_fps 0 means uncapped"""
+        caps = self.monitor_caps.get(monitor.name, {})
+        return (bool(caps.get("scale_to_monitor", self.scale_to_monitor)),
+                int(caps.get("max_fps", self.max_fps) or 0))
+
+    @staticmethod
+    def fps_cap_filter(max_fps):
+        """Drop frames closer than 1/max_fps to the last kept one; never duplicates frames.
+
+        lt(t, prev_selected_t) restarts the selection when the file loops.
+        """
+        interval = 0.95 / max_fps  # Tolerância para timestamps arredondados
+        return f"select='isnan(prev_selected_t)+lt(t,prev_selected_t)+gte(t-prev_selected_t,{interval:.6f})'"
+
+    @staticmethod
+    def scale_cap_filter(width, height):
+        """Downscale to cover the monitor (the VO panscan crops the rest); never upscales"""
+        return f"scale=w='min(iw,{width})':h='min(ih,{height})':force_original_aspect_ratio=increase"
+
+    def video_filters(self, monitor):
+        scale_to_monitor, max_fps = self.caps_for(monitor)
+        filters = []
+        # Descarta frames antes de escalar, para não escalar frames que não serão exibidos
+        if max_fps:
+            filters.append(self.fps_cap_filter(max_fps))
+        if scale_to_monitor:
+            filters.append(self.scale_cap_filter(monitor.width, monitor.height))
+        return ",".join(filters)
+
+    @staticmethod
+    def copy_back_hwdec(hwdec):
+        """hwdec variant that copies frames back to RAM, required by video filters"""
+        if hwdec in ("", "no") or hwdec.endswith("-copy"):
+            return hwdec
+        if hwdec in ("auto", "auto-safe", "yes"):
+            return "auto-copy"
+        return f"{hwdec}-copy"
+
+    @staticmethod
+    def bounding_box(monitors):
+        """(x, y, width, height) of the desktop area covered by the monitors"""
+        left = min(m.x for m in monitors)
+        top = min(m.y for m in monitors)
+        right = max(m.x + m.width for m in monitors)
+        bottom = max(m.y + m.height for m in monitors)
+        return left, top, right - left, bottom - top
+
+    @staticmethod
+    def span_filter_graph(monitors, box, max_fps=0):
+        """lavfi graph that fills each monitor rectangle of a spanning canvas from one decode.
+
+        Every monitor gets its own scaled and center-cropped copy of the
+        frame (the same result as --panscan=1.0 on a window of that size).
+        """
+        left, top, width, height = box
+        count = len(monitors)
+        head = f"{LiveWallPlayer.fps_cap_filter(max_fps)}," if max_fps else ""
+        chains = [f"[vid1]{head}split=" + str(count) + "".join(f"[s{i}]" for i in range(count))]
+        for i, m in enumerate(monitors):
+            chains.append(
+                f"[s{i}]scale={m.width}:{m.height}:force_original_aspect_ratio=increase,"
+                f"crop={m.width}:{m.height},setsar=1[m{i}]"
+            )
+
+        first = monitors[0]
+        canvas = "vo" if count==1 else "c0"
+        chains.append(f"[m0]pad={width}:{height}:{first.x - left}:{first.y - top}:color=black[{canvas}]")
+        for i in range(1, count):
+            m = monitors[i]
+            output = "vo" if i==count - 1 else f"c{i}"
+            chains.append(f"[c{i - 1}][m{i}]overlay={m.x - left}:{m.y - top}[{output}]")
+        return ";".join(chains)
+
+    def target_monitors(self, monitors=None):
+        """Monitors the wallpaper will be shown on with the current settings"""
+        monitors = LiveWallTopology.shared().monitors() if monitors is None else monitors
+        if self.play_all_monitors:
+            return monitors
+        return [m for m in monitors if m.name==self.selected_monitor]
+
+    def render_config(self, monitors=None):
+        """Everything that requires new mpv processes when it changes"""
+        monitors = self.target_monitors() if monitors is None else monitors
+        return (
+            self.video_output, self.gpu_context, self.gpu_api, self.hwdec,
+            self.playback_mode if self.play_all_monitors else "per_monitor",
+            tuple((m.name, m.x, m.y, m.width, m.height, self.caps_for(m)) for m in monitors)
+        )
+
+    @staticmethod
+    def offset_geometry(geometry, dx):
+        size, x, y = geometry.split("+")
+        return f"{size}+{int(x) + dx}+{y}"
+
+    def _screen(self, geometry, aspect, hwdec=None, mpv_options=(), monitor_names=()):
+        ipc_path = ipc_socket_path()
+        if self.start_paused:
+            mpv_options = ["--pause", *mpv_options]
         cmd = [
-            "xwinwrap", "-fdt", "-ni", "-nf", "-un", "-o", "1.0", "-d", "-g", geometry,
+            "xwinwrap", "-fdt", "-ni", "-nf", "-un", "-o", "1.0",
+            "-g", self.offset_geometry(geometry, self.offscreen_offset),
             "--", "mpv", "--fullscreen", "--no-config", "--no-stop-screensaver",
-            f"--vo={self.video_output}", f"--hwdec={self.hwdec}",
+            f"--vo={self.video_output}", f"--hwdec={hwdec or self.hwdec}",
             f"--gpu-api={self.gpu_api}", f"--gpu-context={self.gpu_context}",
             "--loop-file", f"--geometry={geometry}", "--panscan=1.0", "--no-audio",
-            "--no-osd-bar", "-wid", "WID", "--no-input-default-bindings", self.video_path
+            "--no-osd-bar", f"--input-ipc-server={ipc_path}", *self.cache_options, *mpv_options,
+            "-wid", "WID", "--no-input-default-bindings", self.video_path
         ]
-        process = subprocess.Popen(cmd)
-        return process.pid
+        # Sem -d: o xwinwrap continua sendo filho deste processo e pode ser supervisionado
+        unit = SupervisedProcess(cmd, name=f"xwinwrap {geometry}")
+        unit.spawn()
+        self.instances.append(PlayerInstance(geometry, tuple(monitor_names), unit, ipc_path))
+        return unit.pid
 
     def process_monitor(self, monitor):
         width, height = monitor.width, monitor.height
         geometry = f"{width}x{height}+{monitor.x}+{monitor.y}"
         aspect = self.calculate_aspect(width, height)
-        pid = self._screen(geometry, aspect)
-        self.pids.append(pid)
+        filters = self.video_filters(monitor)
+        if filters:
+            # Filtros rodam na CPU: frames decodificados em hardware precisam ser copiados de volta
+            self._screen(geometry, aspect, hwdec=self.copy_back_hwdec(self.hwdec),
+                         mpv_options=[f"--vf=lavfi=[{filters}]"], monitor_names=[monitor.name])
+        else:
+            self._screen(geometry, aspect, monitor_names=[monitor.name])
+
+    def process_span(self, monitors):
+        """One xwinwrap window over the bounding box of all monitors, decoded once"""
+        box = self.bounding_box(monitors)
+        left, top, width, height = box
+        geometry = f"{width}x{height}+{left}+{top}"
+        aspect = self.calculate_aspect(width, height)
+        # Um único decode: vale o menor limite de fps entre os monitores
+        max_fps = min((self.caps_for(m)[1] for m in monitors if self.caps_for(m)[1]), default=0)
+        graph = self.span_filter_graph(monitors, box, max_fps)
+        # Os filtros rodam na CPU: frames decodificados em hardware precisam ser copiados de volta
+        self._screen(geometry, aspect, hwdec=self.copy_back_hwdec(self.hwdec),
+                     mpv_options=[f"--lavfi-complex={graph}"], monitor_names=[m.name for m in monitors])
+
+    def start(self, monitors=None):
+        with self._lock:
+            self._start(monitors)
+            # As instâncias novas começam tocando, mesmo em monitores cobertos
+            self._reapply_coverage()
 
-    def start(self):
-        monitors = get_monitors()
+    def _start(self, monitors=None):
+        monitors = self.target_monitors(monitors)
+        self.started_config = self.render_config(monitors)
+        self.cache_mode, properties = self.cache_plan(self.video_path, self.instance_count(monitors))
+        self.cache_options = [f"--{name}={value}" for name, value in properties.items()]
         if self.play_all_monitors:
-            for monitor in monitors:
-                self.process_monitor(monitor)
+            if self.playback_mode=="span" and len(monitors) > 1:
+                self.process_span(monitors)
+            else:
+                for monitor in monitors:
+                    self.process_monitor(monitor)
         else:
-            selected_monitor = next(
-                (m for m in monitors if m.name == self.selected_monitor), None
-            )
-            if selected_monitor:
-                self.process_monitor(selected_monitor)
+            if monitors:
+                self.process_monitor(monitors[0])
             else:
                 print("Monitor selecionado não encontrado")
                 return
+        self.supervise()
+
+    def supervise(self):
+        """Restart instances that crash while this process is running"""
+        if self.supervisor is None:
+            self.supervisor = ProcessSupervisor(on_restart=self._on_unit_restarted)
+        for instance in self.instances:
+            if instance.unit not in self.supervisor.units:
+                self.supervisor.add(instance.unit)
+        self.supervisor.start()
+
+    def _on_unit_restarted(self, unit):
+        with self._lock:
+            instances = list(self.instances)
+        for instance in instances:
+            if instance.unit is not unit or not instance.paused:
+                continue
+            # O novo mpv começa tocando; a primeira tentativa pode usar o socket do processo antigo
+            for _ in range(2):
+                try:
+                    instance.command("set_property", "pause", True, timeout=5.0)
+                    break
+                except MpvIpcError:
+                    continue
+        self._processes_changed()
+
+    def clone(self):
+        """Player with the same configuration and no running instances"""
+        player = LiveWallPlayer()
+        for attr in ("video_output", "gpu_context", "gpu_api", "hwdec", "play_all_monitors", "selected_monitor",
+                     "video_path", "playback_mode", "scale_to_monitor", "max_fps", "monitor_caps", "cache_budget"):
+            setattr(player, attr, getattr(self, attr))
+        return player
+
+    def standby_fits(self, video_path, min_free=STANDBY_MIN_FREE_BYTES):
+        """
+        True if a copy of the running instances playing `video_path` still
+        leaves `min_free` bytes available.
+        """
+        available = ProcStats.mem_available()
+        if available is None:
+            return False
+        needed = ProcStats.sample_tree(self.pids).rss_bytes
+        # O cache de loop do novo vídeo ainda não está no RSS: cada instância pode ocupar até cache_bytes
+        try:
+            file_size = os.path.getsize(video_path)
+        except OSError:
+            file_size = 0
+        instances = len(self.instances)
+        _, cache_bytes = loop_cache_policy(file_size, instances, self.cache_budget)
+        needed += cache_bytes * instances
+        return available - needed >= min_free
+
+    def prepare_standby(self, video_path, min_free=STANDBY_MIN_FREE_BYTES):
+        """
+        Preload `video_path` in paused instances placed outside the screen.
+
+        Only one standby exists at a time; it replaces the previous one.
+        Returns True if the standby is loading or ready.
+        """
+        video_path = os.path.abspath(video_path)
+        if self.standby is not None and os.path.abspath(self.standby.video_path)==video_path:
+            return True
+        self.discard_standby()
+        if not self.instances or os.path.abspath(self.video_path)==video_path:
+            return False
+        if xdisplay is None:
+            return False
+        if not self.standby_fits(video_path, min_free):
+            print("Pouca memória disponível; standby não criado")
+            return False
+
+        standby = self.clone()
+        standby.set_video_path(video_path)
+        standby.start_paused = True
+        # À direita de todos os monitores: mapeada, renderizando, mas invisível
+        standby.offscreen_offset = self.bounding_box(LiveWallTopology.shared().monitors())[2]
+        standby.on_processes_changed = lambda _: self._processes_changed()
+        standby.start()
+        if standby.started_config!=self.started_config:
+            # Os monitores mudaram desde que as instâncias atuais foram iniciadas
+            standby.stop_in_background()
+            return False
+        self.standby = standby
+        self._processes_changed()
+        return True
+
+    def discard_standby(self):
+        if self.standby is not None:
+            self.standby.stop_in_background()
+            self.standby = None
+            self._processes_changed()
+
+    @staticmethod
+    def window_id(instance, timeout=2.0):
+        """X11 window xwinwrap created for an instance (the -wid argument of its mpv)"""
+        pid = int(instance.command("get_property", "pid", timeout=timeout))
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            args = f.read().split(b"\0")
+        return int(args[args.index(b"-wid") + 1], 0)
+
+    def promote_standby(self, video_path, timeout=0.2):
+        """
+        Swap the standby for `video_path` in place of the running instances.
+
+        The standby windows are moved onto the monitors above the current
+        ones and resumed; only then are the old instances stopped, so the
+        switch has no gap. Doesn't wait for a standby still loading: returns
+        False (and drops the standby) if it isn't ready or can't be used, and
+        the caller falls back to load_video().
+        """
+        standby = self.standby
+        if standby is None or os.path.abspath(standby.video_path)!=os.path.abspath(video_path):
+            return False
+        self.standby = None
+
+        try:
+            # Chamado na thread da GUI: só consulta o estado, com timeouts curtos de IPC
+            if not standby.is_playing(timeout):
+                raise MpvIpcError("standby ainda não está pronto")
+            windows = [(self.window_id(instance, timeout), instance) for instance in standby.instances]
+            display = xdisplay.Display()
+            try:
+                for wid, instance in windows:
+                    _, x, y = instance.geometry.split("+")
+                    display.create_resource_object("window", wid).configure(
+                        x=int(x), y=int(y), stack_mode=X.Above)
+                # flush em vez de sync: não espera a resposta do servidor X
+                display.flush()
+            finally:
+                display.close()
+            standby.set_paused(False)
+        except Exception as e:
+            print(f"Erro ao promover standby: {e}")
+            standby.stop_in_background()
+            self._processes_changed()
+            return False
+
+        for instance in standby.instances:
+            # Um restart pelo supervisor deve abrir a janela já no lugar e tocando
+            command = [arg for arg in instance.unit.command if arg!="--pause"]
+            command[command.index("-g") + 1] = instance.geometry
+            if standby.supervisor is not None:
+                # O supervisor pode estar reiniciando a unidade com o comando antigo
+                standby.supervisor.set_command(instance.unit, command)
+            else:
+                instance.unit.command = command
+
+        with self._lock:
+            old_instances, old_supervisor = self.instances, self.supervisor
+            self.instances, self.supervisor = standby.instances, standby.supervisor
+            if self.supervisor is not None:
+                self.supervisor.on_restart = self._on_unit_restarted
+            self.video_path = standby.video_path
+            self.cache_mode = standby.cache_mode
+            standby.instances, standby.supervisor = old_instances, old_supervisor
+            self._reapply_coverage()
+        # As instâncias antigas saem em segundo plano, já cobertas pelas novas
+        standby.stop_in_background()
+        self._processes_changed()
+        return True
+
+    def can_reuse(self, config):
+        """True if the running instances were started with `config` and still answer IPC"""
+        if not self.instances or config!=self.started_config:
+            return False
+        try:
+            for instance in self.instances:
+                instance.command("get_property", "pid", timeout=0.5)
+        except MpvIpcError:
+            return False
+        return True
+
+    def load_video(self, video_path):
+        """Switch every running instance to another video without respawning"""
+        self.cache_mode, properties = self.cache_plan(video_path, len(self.instances))
+        for instance in self.instances:
+            # Os limites do cache valem para o próximo arquivo aberto
+            for name, value in (properties or STREAM_CACHE_PROPERTIES).items():
+                instance.command("set_property", name, value)
+            instance.command("loadfile", os.path.abspath(video_path), "replace")
+            # Instâncias pausadas por oclusão continuam pausadas
+            instance.command("set_property", "pause", instance.paused)
+        self.video_path = video_path
+
+    def set_paused(self, paused, monitor_names=None):
+        """Pause or resume the instances showing any of `monitor_names` (all by default)"""
+        for instance in self.instances:
+            if monitor_names is not None and not set(instance.monitor_names) & set(monitor_names):
+                continue
+            try:
+                instance.command("set_property", "pause", bool(paused))
+                instance.paused = bool(paused)
+            except MpvIpcError as e:
+                print(f"Erro ao alterar pausa em {instance.geometry}: {e}")
+
+    def apply_coverage(self, covered):
+        """Pause the instances whose monitors are all covered and resume the others"""
+        with self._lock:
+            self.covered = set(covered)
+            self._apply_coverage()
+
+    def set_suspended(self, suspended):
+        """
+        Pause every instance whatever the coverage (ex: while auto-tune
+        measures), or go back to pausing only the covered monitors.
+        """
+        with self._lock:
+            self.suspended = bool(suspended)
+            self._apply_coverage()
+
+    def _reapply_coverage(self):
+        # O monitor de oclusão só avisa quando a cobertura muda
+        if self.covered is not None or self.suspended:
+            self._apply_coverage()
+
+    def _apply_coverage(self):
+        covered = self.covered or set()
+        for instance in self.instances:
+            paused = self.suspended or (bool(instance.monitor_names) and set(instance.monitor_names) <= covered)
+            if paused==instance.paused:
+                continue
+            try:
+                instance.command("set_property", "pause", paused)
+                instance.paused = paused
+                print(f"{'Pausando' if paused else 'Retomando'} wallpaper em {', '.join(instance.monitor_names)}")
+            except MpvIpcError as e:
+                print(f"Erro ao alterar pausa em {instance.geometry}: {e}")
+
+    def is_playing(self, timeout=0.2):
+        """True if every instance already plays the current video (doesn't wait for it to start)"""
+        expected = os.path.abspath(self.video_path)
+        try:
+            for instance in self.instances:
+                if not instance.unit.running():
+                    return False
+                path = instance.command("get_property", "path", timeout=timeout)
+                # Indisponível (erro) enquanto o arquivo ainda está abrindo
+                position = instance.command("get_property", "playback-time", timeout=timeout)
+                if not path or os.path.abspath(path)!=expected or position is None:
+                    return False
+        except MpvIpcError:
+            return False
+        return True
+
+    def wait_until_playing(self, timeout=10.0):
+        """Wait until every instance plays the current video; returns False on timeout"""
+        expected = os.path.abspath(self.video_path)
+        deadline = time.monotonic() + timeout
+        for instance in self.instances:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not instance.unit.running():
+                    return False
+                try:
+                    if not instance.client.connected:
+                        # O socket só existe depois que o mpv inicializa
+                        instance.client.connect(min(remaining, 0.5))
+                    path = instance.client.get_property("path")
+                    position = instance.client.get_property("playback-time")
+                    if path and os.path.abspath(path)==expected and position is not None:
+                        break
+                    # Sem polling: o mpv envia playback-restart quando começa a reproduzir
+                    instance.client.wait_event("playback-restart", max(0.0, deadline - time.monotonic()))
+                except MpvIpcError:
+                    continue
+        return True
+
+    def mpv_pids(self):
+        """PIDs of the running mpv processes (children of the xwinwrap processes), asked over IPC"""
+        pids = []
+        for instance in self.instances:
+            try:
+                pids.append(int(instance.command("get_property", "pid")))
+            except (MpvIpcError, TypeError, ValueError):
+                continue
+        return pids
+
+    def apply_topology(self, old, new, diff):
+        """Start, stop or restart only the instances affected by a monitor layout change"""
+        with self._lock:
+            if self.started_config is None:
+                return
+            self._apply_topology(new, diff)
+            self._reapply_coverage()
+        self._processes_changed()
+
+    def _apply_topology(self, new, diff):
+        # As janelas do standby foram posicionadas para o layout antigo
+        self.discard_standby()
+        monitors = self.target_monitors(new)
+
+        if self.play_all_monitors and self.playback_mode=="span":
+            # Uma única instância cobre todos os monitores: precisa ser recriada
+            self._stop_instances(list(self.instances))
+            self._start(new)
+            return
+
+        targets = {m.name for m in monitors}
+        changed = {m.name for m in diff.removed + diff.moved}
+        self._stop_instances([instance for instance in self.instances
+                              if set(instance.monitor_names) & changed or not set(instance.monitor_names) <= targets])
+
+        running = {name for instance in self.instances for name in instance.monitor_names}
+        self.cache_mode, properties = self.cache_plan(self.video_path, self.instance_count(monitors))
+        self.cache_options = [f"--{name}={value}" for name, value in properties.items()]
+        for monitor in monitors:
+            if monitor.name not in running:
+                self.process_monitor(monitor)
+        self.started_config = self.render_config(monitors)
+        self.supervise()
+
+    def _stop_instances(self, instances, timeout=3.0):
+        """Quit the given instances through IPC, then SIGTERM/SIGKILL what is still running"""
+        with self._lock:
+            for instance in instances:
+                if self.supervisor is not None:
+                    self.supervisor.remove(instance.unit)
+                if instance.unit.running():
+                    instance.client.quit()
+            for instance in instances:
+                instance.unit.terminate(timeout)
+                try:
+                    os.unlink(instance.ipc_path)
+                except OSError:
+                    pass
+                if instance in self.instances:
+                    self.instances.remove(instance)
+
+    def stop(self, timeout=3.0):
+        """Quit every instance and the standby"""
+        if self.standby is not None:
+            self.standby.stop(timeout)
+            self.standby = None
+        with self._lock:
+            supervisor, self.supervisor = self.supervisor, None
+        if supervisor is not None:
+            # Fora do lock: a thread do supervisor pode estar esperando por ele em _on_unit_restarted
+            supervisor.close()
+        with self._lock:
+            self._stop_instances(list(self.instances), timeout)
+            self.started_config = None
+
+    def stop_in_background(self, timeout=3.0):
+        """stop() on the ProcessReaper thread; the player must not be used afterwards"""
+        ProcessReaper.shared().submit(lambda: self.stop(timeout))
 
     def get_pids_json(self):
         return json.dumps({"pids": self.pids})
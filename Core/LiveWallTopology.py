@@ -0,0 +1,176 @@
+import select
+import threading
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+from screeninfo import get_monitors
+
+try:
+    from Xlib import display as xdisplay
+    from Xlib.ext import randr
+except ImportError:  # python-xlib é opcional: sem ele a topologia é verificada periodicamente
+    xdisplay = None
+
+
+class MonitorInfo(NamedTuple):
+    """Name and geometry of a monitor (same attributes as screeninfo.Monitor)"""
+    name: str
+    x: int
+    y: int
+    width: int
+    height: int
+
+
+class TopologyDiff(NamedTuple):
+    added: List[MonitorInfo]
+    removed: List[MonitorInfo]
+    moved: List[MonitorInfo]  # Mesmo nome, nova posição ou resolução
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.moved)
+
+
+def read_monitors() -> List[MonitorInfo]:
+    """Current layout, straight from screeninfo"""
+    try:
+        return [MonitorInfo(str(m.name), m.x, m.y, m.width, m.height) for m in get_monitors()]
+    except Exception as e:
+        print(f"Erro ao listar monitores: {e}")
+        return []
+
+
+def diff_layouts(old: List[MonitorInfo], new: List[MonitorInfo]) -> TopologyDiff:
+    old_by_name = {m.name: m for m in old}
+    new_by_name = {m.name: m for m in new}
+    return TopologyDiff(
+        added=[m for m in new if m.name not in old_by_name],
+        removed=[m for m in old if m.name not in new_by_name],
+        moved=[m for m in new if m.name in old_by_name and old_by_name[m.name]!=m]
+    )
+
+
+class LiveWallTopology:
+    """
+    Cached monitor layout, refreshed on RandR change events.
+
+    Listeners receive (old, new, diff) from the watcher thread whenever
+    the layout actually changes. Without python-xlib (or RandR) the layout
+    is re-read every `poll_interval` seconds instead.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    # Um hotplug gera vários eventos (output, crtc, screen); espera eles pararem
+    DEBOUNCE = 0.3
+
+    def __init__(self, poll_interval: float = 5.0, display_name: Optional[str] = None):
+        self.poll_interval = poll_interval
+        self.display_name = display_name
+        self._monitors: Optional[List[MonitorInfo]] = None
+        self._listeners: List[Callable] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def shared(cls) -> "LiveWallTopology":
+        """Topology instance shared by the whole application"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def monitors(self) -> List[MonitorInfo]:
+        """Cached layout; read once on first use"""
+        with self._lock:
+            if self._monitors is None:
+                self._monitors = read_monitors()
+            return list(self._monitors)
+
+    def monitor_names(self) -> List[str]:
+        return [m.name for m in self.monitors()]
+
+    def add_listener(self, listener: Callable[[List[MonitorInfo], List[MonitorInfo], TopologyDiff], None]):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def refresh(self) -> TopologyDiff:
+        """Re-read the layout and notify the listeners if it changed"""
+        new = read_monitors()
+        with self._lock:
+            old = self._monitors if self._monitors is not None else new
+            self._monitors = new
+            listeners = list(self._listeners)
+        diff = diff_layouts(old, new)
+        if diff:
+            print(f"Monitores alterados: +{[m.name for m in diff.added]} -{[m.name for m in diff.removed]} "
+                  f"~{[m.name for m in diff.moved]}")
+            for listener in listeners:
+                try:
+                    listener(old, new, diff)
+                except Exception as e:
+                    print(f"Erro ao aplicar mudança de monitores: {e}")
+        return diff
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self.monitors()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="monitor-topology", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self.poll_interval + 1)
+            self._thread = None
+
+    def _open_randr(self):
+        if xdisplay is None:
+            return None
+        try:
+            display = xdisplay.Display(self.display_name)
+            if not display.has_extension("RANDR"):
+                display.close()
+                return None
+            root = display.screen().root
+            root.xrandr_select_input(randr.RRScreenChangeNotifyMask | randr.RROutputChangeNotifyMask |
+                                     randr.RRCrtcChangeNotifyMask)
+            display.flush()
+            return display
+        except Exception as e:
+            print(f"RandR indisponível, verificando monitores a cada {self.poll_interval:.0f}s: {e}")
+            return None
+
+    def _run(self):
+        display = self._open_randr()
+        try:
+            while not self._stop.is_set():
+                if display is None:
+                    self._stop.wait(self.poll_interval)
+                    if not self._stop.is_set():
+                        self.refresh()
+                    continue
+
+                readable, _, _ = select.select([display.fileno()], [], [], 1.0)
+                if not readable and not display.pending_events():
+                    continue
+                # Agrupa a rajada de eventos de um hotplug em uma única releitura
+                deadline = time.monotonic() + self.DEBOUNCE
+                while time.monotonic() < deadline:
+                    while display.pending_events():
+                        display.next_event()
+                    select.select([display.fileno()], [], [], max(0.0, deadline - time.monotonic()))
+                while display.pending_events():
+                    display.next_event()
+                self.refresh()
+        finally:
+            if display is not None:
+                display.close()
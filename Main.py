@@ -1,11 +1,14 @@
+import os
 import sys
 import time
-import subprocess
+import signal
 from PyQt6.QtWidgets import QApplication
 from Widgets.Widgets import  SettingsDialogWidget, MyLiveWallWidget
 from Core.LiveWallPIDManager import LiveWallPIDManager
 from Core.LiveWallPlayer import  LiveWallPlayer
 from Core.LiveWallState import  LiveWallState
+from Core.LiveWallOcclusion import OcclusionMonitor
+from Core.LiveWallTopology import LiveWallTopology
 
 
 if __name__ == "__main__":
@@ -23,26 +26,37 @@ if __name__ == "__main__":
         player.set_hwdec(settings["hwdec"])
         player.set_selected_monitor(settings["selected_monitor"])
         player.set_play_all_monitors(settings["play_all_monitors"])
+        player.set_playback_mode(settings["playback_mode"])
+        player.set_playback_caps(settings["scale_to_monitor"], settings["max_fps"], settings["monitor_caps"])
+        player.set_cache_budget(settings["loop_cache_mb"] * 2**20)
         player.set_video_path(state["video_path"])
+        # Salvar informações dos processos; atualizadas quando o supervisor reinicia uma instância
+        player.on_processes_changed = lambda p: process_manager.save_process_info(os.getpid(), p.process_records())
         player.start()
-        time.sleep(1)
+        process_manager.save_process_info(os.getpid(), player.process_records())
 
-        # Obter PIDs dos processos xwinwrap
-        child_pids = []
-        try:
-            ps_output = subprocess.check_output(['pgrep', 'xwinwrap']).decode()
-            child_pids = [int(pid) for pid in ps_output.splitlines()]
-        except subprocess.CalledProcessError:
-            pass
+        # kill_processes (ex: a interface trocando o wallpaper) encerra este processo com SIGTERM
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        # Monitores conectados, removidos ou movidos reiniciam só as instâncias afetadas
+        topology = LiveWallTopology.shared()
+        topology.add_listener(player.apply_topology)
+        topology.start()
 
-        # Salvar informações dos processos
-        process_manager.save_process_info(0, child_pids)
+        # Pausa os monitores cobertos por janelas em tela cheia
+        occlusion_monitor = OcclusionMonitor(player.apply_coverage, topology.monitors)
+        if settings["pause_when_covered"]:
+            occlusion_monitor.start()
         try:
-            # Manter o modo headless ativo até o encerramento manual
+            # Manter o modo headless ativo (supervisionando o player) até o encerramento
             while True:
                 time.sleep(1)
         except KeyboardInterrupt:
             print("Headless mode terminated by user.")
+        finally:
+            occlusion_monitor.stop()
+            topology.stop()
+            player.stop()
         sys.exit(0)
     else:
         app = QApplication(sys.argv)
@@ -0,0 +1,154 @@
+import os
+from PyQt6.QtCore import pyqtSignal, QObject, QFileSystemWatcher, QTimer
+from Utility import Util
+
+RESCAN_DELAY_MS = 300
+SETTLE_DELAY_MS = 1000  # Intervalo entre as verificações de um arquivo novo que ainda muda
+
+
+class LibraryWatcher(QObject):
+    """Incremental scanner of a video folder.
+
+    Keeps the videos of every scanned directory and watches them with
+    QFileSystemWatcher (inotify on Linux). When a directory changes only
+    that directory is listed again and the difference is emitted, so the
+    grid can add or remove single tiles instead of rebuilding.
+
+    Files accepted by `is_ignored` (ex: partial outputs of the transcode
+    queue) are left out of the listing. A new file is only emitted once its
+    size and mtime are the same in two scans in a row, so files still being
+    copied don't get a thumbnail of their first megabytes.
+    """
+    videos_added = pyqtSignal(list)
+    videos_removed = pyqtSignal(list)
+
+    def __init__(self, recursive=False, parent=None, is_ignored=None):
+        super().__init__(parent)
+        self.recursive = recursive
+        self.is_ignored = is_ignored
+        self.video_dir = ""
+        self.entries = {}  # diretório -> conjunto de vídeos
+        self.pending_dirs = set()
+        self.unsettled = {}  # vídeo novo -> (tamanho, mtime) da última verificação
+
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+
+        # Agrupa rajadas de eventos (cópias, renomeações em lote)
+        self.rescan_timer = QTimer(self)
+        self.rescan_timer.setSingleShot(True)
+        self.rescan_timer.timeout.connect(self.rescan_pending)
+
+    def videos(self):
+        return sorted(path for paths in self.entries.values() for path in paths)
+
+    def set_directory(self, video_dir, recursive=None):
+        """Scan a new folder from scratch and start watching it"""
+        if recursive is not None:
+            self.recursive = recursive
+        if self.watcher.directories():
+            self.watcher.removePaths(self.watcher.directories())
+        self.video_dir = video_dir
+        self.entries = {}
+        self.pending_dirs.clear()
+        self.unsettled.clear()
+        self._scan_tree(video_dir)
+        return self.videos()
+
+    def _list(self, directory):
+        videos, subdirs = Util.list_videos(directory)
+        if self.is_ignored:
+            videos = [video for video in videos if not self.is_ignored(video)]
+        return videos, subdirs
+
+    def _scan_tree(self, directory):
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            videos, subdirs = self._list(current)
+            self.entries[current] = set(videos)
+            self.watcher.addPath(current)
+            if self.recursive:
+                pending.extend(subdirs)
+
+    def _forget_tree(self, directory):
+        prefix = os.path.join(directory, "")
+        removed = []
+        for path in [d for d in self.entries if d==directory or d.startswith(prefix)]:
+            removed.extend(self.entries.pop(path))
+            self.watcher.removePath(path)
+        for path in [p for p in self.unsettled if p.startswith(prefix)]:
+            del self.unsettled[path]
+        return removed
+
+    def _settled(self, directory, candidates):
+        """
+        The new videos of `candidates` whose size and mtime didn't change since
+        the previous scan. The others are kept out of entries until they do.
+        """
+        settled = []
+        for path in candidates:
+            try:
+                stat = os.stat(path)
+                signature = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                signature = None
+            if signature is not None and self.unsettled.get(path)==signature:
+                del self.unsettled[path]
+                settled.append(path)
+            else:
+                self.unsettled[path] = signature
+                self.entries[directory].discard(path)
+        return settled
+
+    def on_directory_changed(self, directory):
+        self.pending_dirs.add(directory)
+        self.rescan_timer.start(RESCAN_DELAY_MS)
+
+    def rescan(self):
+        """Re-list every watched directory and emit the differences"""
+        self.pending_dirs.update(self.entries.keys())
+        self.rescan_pending()
+
+    def rescan_pending(self):
+        added, removed = [], []
+        for directory in sorted(self.pending_dirs):
+            if directory not in self.entries:
+                continue
+            if not os.path.isdir(directory):
+                removed.extend(self._forget_tree(directory))
+                continue
+
+            videos, subdirs = self._list(directory)
+            current = set(videos)
+            previous = self.entries[directory]
+            removed.extend(previous - current)
+            self.entries[directory] = current
+            for path in [p for p in self.unsettled if os.path.dirname(p)==directory and p not in current]:
+                del self.unsettled[path]
+            added.extend(self._settled(directory, current - previous))
+
+            if self.recursive:
+                known_children = [d for d in self.entries if os.path.dirname(d)==directory]
+                for subdir in known_children:
+                    if subdir not in subdirs:
+                        removed.extend(self._forget_tree(subdir))
+                for subdir in subdirs:
+                    if subdir not in self.entries:
+                        before = set(self.entries)
+                        self._scan_tree(subdir)
+                        for new_dir in set(self.entries) - before:
+                            added.extend(self._settled(new_dir, list(self.entries[new_dir])))
+        self.pending_dirs.clear()
+
+        # Arquivos ainda sendo copiados: o diretório é verificado de novo até pararem de mudar
+        recheck = {os.path.dirname(path) for path in self.unsettled} & set(self.entries)
+        if recheck:
+            self.pending_dirs.update(recheck)
+            self.rescan_timer.start(SETTLE_DELAY_MS)
+
+        # Renomeações chegam como remoção + adição
+        if removed:
+            self.videos_removed.emit(sorted(removed))
+        if added:
+            self.videos_added.emit(sorted(added))
@@ -1,68 +1,380 @@
-from PyQt6.QtCore import pyqtSignal, QThread
+from PyQt6.QtCore import pyqtSignal, QThread, QObject
 from Utility import  Util
+from Utility import PlaybackAutoTune
+from Utility import Preprocess
+from Core.LiveWallMetadataIndex import LiveWallMetadataIndex
+import collections
+import heapq
+import itertools
+import json
+import os
+import threading
 
 
-class GifLoader(QThread):
-    thumbnail_ready = pyqtSignal(str, str)  # Sinal para enviar o caminho do vídeo e as miniaturas
+# Prioridades dos jobs de miniatura (menor valor = executa primeiro)
+PRIORITY_CURRENT = 0  # vídeo selecionado / em reprodução
+PRIORITY_VISIBLE = 1  # tile visível no viewport
+PRIORITY_OFFSCREEN = 2  # tile fora da área visível
 
-    def __init__(self, video_path):
+TRANSCODE_QUEUE_PATH = os.path.expanduser("~/.cache/MyLiveWall/transcode_queue.json")
+
+
+def default_thumbnail_workers():
+    """Number of thumbnail workers used when the settings don't define one"""
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+class ThumbnailWorker(QThread):
+    """Worker thread that executes jobs taken from a ThumbnailScheduler"""
+
+    def __init__(self, scheduler):
         super().__init__()
-        self.video_path = video_path
+        self.scheduler = scheduler
 
     def run(self):
-        # Carregar miniaturas
-        preview_path = Util.get_linux_thumbnail_preview(self.video_path)
-        self.thumbnail_ready.emit(self.video_path, preview_path)
+        while True:
+            video_path = self.scheduler.next_job()
+            if video_path is None:
+                return
+            self.scheduler.run_job(video_path)
 
-class ImageLoader(QThread):
-    thumbnail_ready = pyqtSignal(str, str)  # Sinal para enviar o caminho do vídeo e as miniaturas
 
-    def __init__(self, video_path):
+class ThumbnailScheduler(QObject):
+    """Shared, bounded pool that analyzes videos by priority.
+
+    Every video gets one analyze job, which delivers the thumbnail, the
+    preview and the metadata of the video from a single decode. Jobs can be
+    re-prioritized while queued (visible tiles first) and are dropped when
+    their tile goes away.
+    """
+    thumbnail_ready = pyqtSignal(str, str)  # Caminho do vídeo e da miniatura
+    preview_ready = pyqtSignal(str, str)  # Caminho do vídeo e do GIF de preview
+    metadata_ready = pyqtSignal(str, object)  # Caminho do vídeo e VideoProbe
+    idle = pyqtSignal()  # Fila vazia e nenhum job em execução
+
+    def __init__(self, max_workers=None):
         super().__init__()
-        self.video_path = video_path
+        self.max_workers = max(1, int(max_workers or default_thumbnail_workers()))
+        self._condition = threading.Condition()
+        self._heap = []
+        self._pending = {}  # video_path -> (sequência da entrada válida no heap, prioridade)
+        self._counter = itertools.count()
+        self._workers = []
+        self._running = 0
+        self._stopping = False
 
-    def run(self):
-        # Carregar miniaturas
-        thumbnail_path = Util.get_linux_thumbnail(self.video_path)
-        self.thumbnail_ready.emit(self.video_path, thumbnail_path)
+    def _ensure_workers(self):
+        if self._workers or self._stopping:
+            return
+        for _ in range(self.max_workers):
+            worker = ThumbnailWorker(self)
+            worker.start()
+            self._workers.append(worker)
 
+    def _push(self, video_path, priority):
+        # Entradas antigas no heap ficam obsoletas e são descartadas em next_job
+        sequence = next(self._counter)
+        self._pending[video_path] = (sequence, priority)
+        heapq.heappush(self._heap, (priority, sequence, video_path))
 
+    def submit(self, video_path, priority=PRIORITY_OFFSCREEN):
+        """Queue the analyze job of a video"""
+        with self._condition:
+            self._push(video_path, priority)
+            self._condition.notify_all()
+        self._ensure_workers()
 
-import os
-import subprocess
+    def set_priority(self, video_path, priority):
+        """Change the priority of a job that is still queued"""
+        with self._condition:
+            pending = self._pending.get(video_path)
+            if pending is None or pending[1]==priority:
+                return
+            self._push(video_path, priority)
+            self._condition.notify_all()
+
+    def cancel(self, video_path):
+        """Drop the queued job of a video"""
+        with self._condition:
+            self._pending.pop(video_path, None)
 
+    def clear(self):
+        """Drop every queued job (running jobs finish normally)"""
+        with self._condition:
+            self._heap.clear()
+            self._pending.clear()
 
-class ProcessVideo(QThread):
-    video_processed = pyqtSignal(bool, str)  # Sinal para enviar o caminho do vídeo e as miniaturas
+    def pending_count(self):
+        with self._condition:
+            return len(self._pending)
+
+    def next_job(self):
+        """Block until a job is available; returns None when stopping"""
+        with self._condition:
+            while not self._stopping:
+                while self._heap:
+                    _, sequence, video_path = heapq.heappop(self._heap)
+                    pending = self._pending.get(video_path)
+                    if pending and pending[0]==sequence:
+                        del self._pending[video_path]
+                        self._running += 1
+                        return video_path
+                self._condition.wait()
+            return None
+
+    def run_job(self, video_path):
+        try:
+            thumbnail_path = Util.get_cached_linux_thumbnail(video_path)
+            if thumbnail_path:
+                self.thumbnail_ready.emit(video_path, thumbnail_path)
+            preview_path = Util.get_gif_path(video_path)
+            if preview_path:
+                self.preview_ready.emit(video_path, preview_path)
+
+            if thumbnail_path and preview_path:
+                # Arquivos alterados são revalidados pelo MetadataRevalidator
+                probe = LiveWallMetadataIndex.shared().get(video_path)
+            elif preview_path:
+                # Só falta o poster: basta a extração por keyframe, sem decodificar o vídeo
+                thumbnail_path = Util.generate_thumbnail(video_path)
+                if thumbnail_path:
+                    self.thumbnail_ready.emit(video_path, thumbnail_path)
+                probe = LiveWallMetadataIndex.shared().probe(video_path)
+            else:
+                # A análise decodifica o vídeo de qualquer forma: o poster sai da mesma passada
+                probe = LiveWallMetadataIndex.shared().probe(video_path)
+                result = Util.analyze_video_cached(video_path, probe, with_poster=not thumbnail_path) if probe else None
+                if result:
+                    poster_path, new_preview_path, _ = result
+                    if not thumbnail_path and poster_path:
+                        self.thumbnail_ready.emit(video_path, poster_path)
+                    if new_preview_path:
+                        self.preview_ready.emit(video_path, new_preview_path)
+
+            if probe is not None:
+                self.metadata_ready.emit(video_path, probe)
+        except Exception as e:
+            print(f"Erro ao carregar miniatura de {video_path}: {e}")
+        finally:
+            with self._condition:
+                self._running -= 1
+                drained = self._running==0 and not self._pending
+            if drained:
+                self.idle.emit()
+
+    def stop(self):
+        """Stop the workers, waiting for the jobs already running"""
+        with self._condition:
+            self._stopping = True
+            self._heap.clear()
+            self._pending.clear()
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.wait()
+        self._workers.clear()
+
+
+
+class TranscodeJob:
+    """One preprocessing job of a TranscodeQueue"""
+    __slots__ = ("video_path", "output_path", "processes", "cancelled", "lock")
 
     def __init__(self, video_path):
-        super().__init__()
         self.video_path = video_path
+        self.output_path = Preprocess.output_path_for(video_path)
+        self.processes = []  # Um encoder, ou um por pedaço no encode paralelo
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def attach(self, process):
+        """Called by Preprocess.run_encode with each encoder it starts"""
+        with self.lock:
+            self.processes = [p for p in self.processes if p.poll() is None] + [process]
+        if self.cancelled:
+            self.terminate()
+
+    def terminate(self):
+        with self.lock:
+            processes = list(self.processes)
+        for process in processes:
+            if process.poll() is None:
+                # Com SIGTERM o ffmpeg ainda esvazia o encoder; a saída parcial é descartada de qualquer forma
+                process.kill()
+
+
+class TranscodeWorker(QThread):
+    """Worker thread that executes jobs taken from a TranscodeQueue"""
+
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
 
     def run(self):
-        print(f"Preprocessing video: {self.video_path}")
-        output_path = os.path.splitext(self.video_path)[0] + "_processed.mp4"
-        print(f"Preprocessed video: {output_path}")
+        while True:
+            job = self.queue.next_job()
+            if job is None:
+                return
+            self.queue.run_job(job)
+
+
+class TranscodeQueue(QObject):
+    """Shared preprocessing queue with a limit of parallel encodes.
+
+    Jobs run in submission order, at most `max_parallel` at a time. The
+    queued and running videos are saved to disk, so jobs interrupted by
+    closing the app are resumed by resume() on the next start.
+    """
+    job_progress = pyqtSignal(str, object)  # Caminho do vídeo e Preprocess.EncodeProgress
+    job_finished = pyqtSignal(str, bool, str)  # Caminho original, sucesso e caminho final
+    job_cancelled = pyqtSignal(str)
+
+    def __init__(self, max_parallel=1, encode_options=None, queue_path=TRANSCODE_QUEUE_PATH):
+        super().__init__()
+        self.max_parallel = max(1, int(max_parallel))
+        # Argumentos extras de Preprocess.preprocess_video (max_fps, seamless_loop, crossfade)
+        self.encode_options = dict(encode_options or {})
+        self.queue_path = queue_path
+        self._condition = threading.Condition()
+        self._queue = collections.deque()
+        self._running = {}  # video_path -> TranscodeJob
+        self._workers = []
+        self._stopping = False
+
+    def set_max_parallel(self, max_parallel):
+        with self._condition:
+            self.max_parallel = max(1, int(max_parallel))
+            self._condition.notify_all()
+        self._ensure_workers()
+
+    def _ensure_workers(self):
+        # Workers a mais ficam parados em next_job enquanto o limite estiver cheio
+        while len(self._workers) < self.max_parallel and not self._stopping:
+            worker = TranscodeWorker(self)
+            worker.start()
+            self._workers.append(worker)
+
+    def _save(self):
+        """Persist the running and queued videos (called with the lock held)"""
+        try:
+            os.makedirs(os.path.dirname(self.queue_path), exist_ok=True)
+            tmp_path = self.queue_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"jobs": list(self._running) + list(self._queue)}, f, indent=4)
+            os.replace(tmp_path, self.queue_path)
+        except OSError as e:
+            print(f"Erro ao salvar fila de pré-processamento: {e}")
+
+    def resume(self):
+        """Queue again the jobs left by the previous session; returns their paths"""
+        try:
+            with open(self.queue_path) as f:
+                video_paths = json.load(f).get("jobs", [])
+        except (OSError, json.JSONDecodeError, AttributeError):
+            return []
+        return [video_path for video_path in video_paths if os.path.isfile(video_path) and self.submit(video_path)]
+
+    def submit(self, video_path):
+        """Queue the preprocessing of a video; False if it is already queued or running"""
+        with self._condition:
+            if self._stopping or video_path in self._running or video_path in self._queue:
+                return False
+            self._queue.append(video_path)
+            self._save()
+            self._condition.notify_all()
+        self._ensure_workers()
+        return True
+
+    def is_active(self, video_path):
+        with self._condition:
+            return video_path in self._running or video_path in self._queue
+
+    def is_output(self, path):
+        """True for the partial output of a queued or running job"""
+        if not path.endswith(Preprocess.OUTPUT_SUFFIX):
+            return False
+        with self._condition:
+            return any(Preprocess.output_path_for(video_path)==path
+                       for video_path in itertools.chain(self._running, self._queue))
+
+    def cancel(self, video_path):
+        """Drop a queued job or kill the encoder of a running one"""
+        with self._condition:
+            if video_path in self._queue:
+                self._queue.remove(video_path)
+                self._save()
+                cancelled = True
+            else:
+                job = self._running.get(video_path)
+                if job is None:
+                    return
+                # run_job remove a saída parcial e emite job_cancelled quando o encoder sair
+                job.cancelled = True
+                job.terminate()
+                cancelled = False
+        if cancelled:
+            self.job_cancelled.emit(video_path)
+
+    def next_job(self):
+        """Block until a job can start; returns None when stopping"""
+        with self._condition:
+            while not self._stopping:
+                if self._queue and len(self._running) < self.max_parallel:
+                    job = TranscodeJob(self._queue.popleft())
+                    self._running[job.video_path] = job
+                    return job
+                self._condition.wait()
+            return None
+
+    def run_job(self, job):
+        video_path = job.video_path
+        final_path = video_path
+        ok = False
         try:
-            subprocess.run([
-                './ffmpeg',
-                '-y',
-                '-hwaccel', 'vulkan',
-                '-init_hw_device', 'vulkan=gpu:0',
-                '-filter_hw_device', 'gpu',
-                '-i', self.video_path,
-                '-c:v', 'hevc_nvenc',
-                '-preset', 'p7',
-                '-rc', 'vbr',
-                '-b:v', '5M',
-                '-metadata', f'preprocessed="yes"',
-                '-movflags', '+use_metadata_tags',
-                output_path
-            ], check=True)
-            self.video_processed.emit(True, output_path)
-        except subprocess.CalledProcessError as e:
-            self.video_processed.emit(False, output_path)
+            ok = Preprocess.preprocess_video(video_path, job.output_path,
+                                             on_progress=lambda progress: self.job_progress.emit(video_path, progress),
+                                             on_start=job.attach, cancelled=lambda: job.cancelled,
+                                             # Os núcleos são divididos entre os jobs simultâneos
+                                             workers=Preprocess.chunk_workers(self.max_parallel),
+                                             **self.encode_options)
+            if ok and not job.cancelled:
+                final_path = Preprocess.replace_source(video_path, job.output_path)
+            elif ok:
+                # Cancelado depois que o encode terminou: o _processed.mp4 não deve ficar na pasta
+                try:
+                    os.remove(job.output_path)
+                except FileNotFoundError:
+                    pass
+        except Exception as e:
+            print(f"Erro ao pré-processar {video_path}: {e}")
+            ok = False
+        finally:
+            with self._condition:
+                del self._running[video_path]
+                stopping = self._stopping
+                if not stopping:
+                    # Ao fechar o app os jobs interrompidos continuam salvos para o próximo início
+                    self._save()
+                self._condition.notify_all()
+
+        if stopping:
+            return
+        if job.cancelled:
+            self.job_cancelled.emit(video_path)
+        else:
+            self.job_finished.emit(video_path, ok, final_path)
 
+    def stop(self):
+        """Kill the running encodes and stop the workers; pending jobs stay saved"""
+        with self._condition:
+            self._stopping = True
+            self._save()
+            for job in self._running.values():
+                job.cancelled = True
+                job.terminate()
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.wait()
+        self._workers.clear()
 
 
 class CheckProcessedVideo(QThread):
@@ -73,34 +385,66 @@ class CheckProcessedVideo(QThread):
         self.video_path = video_path
 
     def run(self):
-        # Carregar miniaturas
-        cmd = [
-            './ffprobe',
-            '-v', 'error',
-            '-show_entries', 'format_tags=preprocessed',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            self.video_path
-        ]
+        probe = LiveWallMetadataIndex.shared().probe(self.video_path)
+        self.video_checked.emit(probe is not None and probe.preprocessed)
+
+
+class MetadataRevalidator(QThread):
+    """Background pass that re-probes only new or changed files of a library"""
+    metadata_ready = pyqtSignal(str, object)  # Caminho do vídeo e VideoProbe
+
+    def __init__(self, video_dir, video_paths):
+        super().__init__()
+        self.video_dir = video_dir
+        self.video_paths = list(video_paths)
+
+    def run(self):
+        index = LiveWallMetadataIndex.shared()
+        index.prune_missing(self.video_dir)
+        for video_path in index.stale_paths(self.video_paths):
+            if self.isInterruptionRequested():
+                return
+            probe = index.probe(video_path)
+            if probe is not None:
+                self.metadata_ready.emit(video_path, probe)
+
+
+class PaletteWorker(QThread):
+    """Background job that delivers the accent palette of a wallpaper"""
+    palette_ready = pyqtSignal(str, object)  # Caminho do vídeo e ColorAnalysis.Palette
+
+    def __init__(self, video_path):
+        super().__init__()
+        self.video_path = video_path
+
+    def run(self):
+        index = LiveWallMetadataIndex.shared()
+        palette = Util.get_cached_palette(self.video_path, index)
+        if palette is None:
+            try:
+                palette = Util.generate_palette(self.video_path, index)
+            except Exception as e:
+                print(f"Erro ao calcular paleta de {self.video_path}: {e}")
+                return
+        if palette is not None:
+            self.palette_ready.emit(self.video_path, palette)
+
+
+class AutoTuneWorker(QThread):
+    """Benchmarks the playback configurations in the background"""
+    progress = pyqtSignal(str)  # Linha de progresso
+    tuned = pyqtSignal(object)  # Melhor resultado (dict) ou None
+
+    def __init__(self, video_path, settings):
+        super().__init__()
+        self.video_path = video_path
+        self.settings = settings
+
+    def run(self):
         try:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                check=True
-            )
-
-            # Adicione estes prints para debug
-            comp = result.stdout.replace('\r', '').replace('\n', '').strip()
-            comp2 = '"yes"'
-            # print(f"Conteúdo exato: '{comp}'")  # Com aspas para ver espaços invisíveis
-            # print(f"Bytes da string: {[ord(c) for c in comp]}")
-            # print(f"Bytes da string: {[ord(c) for c in comp2]}")
-            # print(f"Comprimento: {len(comp)}")
-            # print(f"Comprimento: {len(comp2)}")
-
-            if result.returncode==0 and comp==comp2:
-                self.video_checked.emit(True)
-            else:
-                self.video_checked.emit(False)
-        except subprocess.CalledProcessError:
-            self.video_checked.emit(False)
+            best, _ = PlaybackAutoTune.tune(self.video_path, self.settings, progress=self.progress.emit,
+                                            should_stop=self.isInterruptionRequested)
+        except Exception as e:
+            print(f"Erro no auto-tune: {e}")
+            best = None
+        self.tuned.emit(best)
@@ -0,0 +1,429 @@
+import colorsys
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+DOMINANT_SIZE = (50, 50)
+VIBRANT_SIZE = (100, 100)
+PALETTE_SIZE = (100, 100)
+PALETTE_SEED = 0
+PALETTE_BITS = 5  # Bits por canal dos bins de cor agrupados antes do k-means
+PALETTE_INIT = 3  # Inicializações k-means++; fica a de menor inércia
+PALETTE_MAX_ITER = 50
+# Tolerâncias de validate_palettes em relação ao KMeans do scikit-learn.
+# Execuções do próprio KMeans com sementes diferentes variam 5-9% em inércia.
+MAX_INERTIA_RATIO = 1.05
+MAX_PALETTE_DISTANCE = 12.0
+# Abaixo desta razão o agrupamento é tão bom quanto o de referência e pode escolher outras cores
+TIED_INERTIA_RATIO = 1.02
+VIBRANT_MIN_SATURATION = 100  # Escala 0-255
+VIBRANT_MIN_VALUE = 100  # Escala 0-255
+
+Color = Tuple[int, int, int]
+FrameSource = Union[str, bytes, bytearray, memoryview, np.ndarray]
+
+# Parâmetros que identificam uma paleta persistida; mudar invalida as antigas
+PALETTE_PARAMS = {"dominant_size": list(DOMINANT_SIZE), "vibrant_size": list(VIBRANT_SIZE),
+                  "palette_size": list(PALETTE_SIZE), "seed": PALETTE_SEED, "colors": 3,
+                  "bits": PALETTE_BITS, "init": PALETTE_INIT}
+
+
+@dataclass
+class Palette:
+    """Accent colors of a video frame."""
+    dominant: Color
+    dominant_colors: List[Color] = field(default_factory=list)
+    vibrant: List[Color] = field(default_factory=list)
+
+    @property
+    def accent(self) -> Color:
+        """Most vibrant color, or the dominant one for dull frames"""
+        return self.vibrant[0] if self.vibrant else self.dominant
+
+    def to_dict(self) -> dict:
+        return {"dominant": list(self.dominant),
+                "dominant_colors": [list(color) for color in self.dominant_colors],
+                "vibrant": [list(color) for color in self.vibrant]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Palette":
+        return cls(dominant=tuple(data["dominant"]),
+                   dominant_colors=[tuple(color) for color in data.get("dominant_colors", [])],
+                   vibrant=[tuple(color) for color in data.get("vibrant", [])])
+
+
+def read_raw_frame(stream: BinaryIO, width: int, height: int) -> Optional[bytes]:
+    """Read exactly one rgb24 frame from a pipe (ex: ffmpeg -f rawvideo -pix_fmt rgb24 pipe:1)"""
+    frame_size = width * height * 3
+    chunks = []
+    remaining = frame_size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def load_frame(source: FrameSource, size: Tuple[int, int],
+               frame_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """
+    Load a frame as an (height, width, 3) uint8 array resized to `size`.
+
+    Args:
+        source: Image path, raw rgb24 bytes or an array already in memory
+        size (tuple): Analysis size (width, height)
+        frame_size (tuple, optional): Size (width, height) of raw bytes
+
+    Returns:
+        np.ndarray: RGB pixels
+    """
+    if isinstance(source, str):
+        image = Image.open(source).convert("RGB")
+    else:
+        if isinstance(source, np.ndarray):
+            frame = source
+        else:
+            if frame_size is None:
+                raise ValueError("frame_size é obrigatório para frames brutos")
+            width, height = frame_size
+            frame = np.frombuffer(source, dtype=np.uint8, count=width * height * 3).reshape(height, width, 3)
+        if frame.shape[1::-1]==tuple(size):
+            return frame
+        image = Image.fromarray(frame, "RGB")
+
+    # Mesmo redimensionamento do PIL usado pela análise original
+    return np.asarray(image.resize(size))
+
+
+def rgb_to_hsv(pixels: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized colorsys.rgb_to_hsv over an (N, 3) uint8 array, in the 0-1 range"""
+    rgb = pixels.astype(np.float64) / 255.0
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    maxc = rgb.max(axis=1)
+    minc = rgb.min(axis=1)
+    delta = maxc - minc
+    gray = delta==0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = np.where(gray, 0.0, delta / maxc)
+        rc = (maxc - r) / delta
+        gc = (maxc - g) / delta
+        bc = (maxc - b) / delta
+    h = np.where(r==maxc, bc - gc, np.where(g==maxc, 2.0 + rc - bc, 4.0 + gc - rc))
+    h = np.where(gray, 0.0, (h / 6.0) % 1.0)
+    return h, s, maxc
+
+
+def vibrant_colors(source: FrameSource, num_colors: int = 5,
+                   frame_size: Optional[Tuple[int, int]] = None) -> List[Color]:
+    """
+    Most vibrant colors of a frame, ranked by saturation and then value.
+
+    Only pixels with saturation and value above 100 (0-255 scale) are kept;
+    pixels with the same saturation and value keep their image order.
+    """
+    pixels = load_frame(source, VIBRANT_SIZE, frame_size).reshape(-1, 3)
+    _, s, v = rgb_to_hsv(pixels)
+    s, v = s * 255, v * 255
+
+    mask = (s > VIBRANT_MIN_SATURATION) & (v > VIBRANT_MIN_VALUE)
+    vibrant, s, v = pixels[mask], s[mask], v[mask]
+
+    # lexsort é estável: a última chave é a principal
+    order = np.lexsort((-v, -s))[:num_colors]
+    return [tuple(int(c) for c in pixel) for pixel in vibrant[order]]
+
+
+def dominant_color(source: FrameSource, frame_size: Optional[Tuple[int, int]] = None) -> Color:
+    """Most frequent color of a frame; ties go to the color seen first"""
+    pixels = load_frame(source, DOMINANT_SIZE, frame_size).reshape(-1, 3)
+    packed = (pixels[:, 0].astype(np.uint32) << 16) | (pixels[:, 1].astype(np.uint32) << 8) | pixels[:, 2]
+
+    colors, first_seen, counts = np.unique(packed, return_index=True, return_counts=True)
+    candidates = np.flatnonzero(counts==counts.max())
+    packed_color = int(colors[candidates[np.argmin(first_seen[candidates])]])
+    return (packed_color >> 16) & 0xFF, (packed_color >> 8) & 0xFF, packed_color & 0xFF
+
+
+def _squared_distances(points: np.ndarray, centers: np.ndarray,
+                       point_norms: Optional[np.ndarray] = None) -> np.ndarray:
+    """(len(points), len(centers)) matrix of squared euclidean distances"""
+    if point_norms is None:
+        point_norms = (points ** 2).sum(axis=1)
+    distances = point_norms[:, None] - 2.0 * points @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+    return np.maximum(distances, 0.0)
+
+
+def _binned_colors(pixels: np.ndarray, bits: int = PALETTE_BITS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Histogram of an (N, 3) uint8 array over `bits`-per-channel bins:
+    mean color of each occupied bin and how many pixels fell in it.
+    """
+    shift = 8 - bits
+    quantized = pixels.astype(np.int64) >> shift
+    bins = (quantized[:, 0] << (2 * bits)) | (quantized[:, 1] << bits) | quantized[:, 2]
+    bins, inverse, counts = np.unique(bins, return_inverse=True, return_counts=True)
+    # Média real dos pixels do bin, não o centro do bin
+    sums = np.stack([np.bincount(inverse, weights=pixels[:, channel], minlength=len(bins))
+                     for channel in range(3)], axis=1)
+    return sums / counts[:, None], counts.astype(np.float64)
+
+
+def _kmeans_plus_plus(data: np.ndarray, weights: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    """Greedy k-means++ seeding (the same scheme scikit-learn uses)"""
+    n_local_trials = 2 + int(np.log(k))
+    centers = np.empty((k, data.shape[1]))
+
+    first = np.searchsorted(np.cumsum(weights), rng.random() * weights.sum())
+    centers[0] = data[min(first, len(data) - 1)]
+    closest = _squared_distances(data, centers[:1])[:, 0]
+
+    for c in range(1, k):
+        potential = np.cumsum(closest * weights)
+        candidate_ids = np.searchsorted(potential, rng.random(n_local_trials) * potential[-1])
+        candidate_ids = np.minimum(candidate_ids, len(data) - 1)
+        candidate_distances = np.minimum(closest[:, None], _squared_distances(data, data[candidate_ids]))
+        best = np.argmin((candidate_distances * weights[:, None]).sum(axis=0))
+        centers[c] = data[candidate_ids[best]]
+        closest = candidate_distances[:, best]
+    return centers
+
+
+def _lloyd(data: np.ndarray, weights: np.ndarray, norms: np.ndarray, centers: np.ndarray,
+           max_iter: int, tolerance: float) -> Tuple[np.ndarray, np.ndarray, float]:
+    k = len(centers)
+    for _ in range(max_iter):
+        labels = _squared_distances(data, centers, norms).argmin(axis=1)
+        sizes = np.bincount(labels, weights=weights, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=weights * data[:, channel], minlength=k)
+                         for channel in range(data.shape[1])], axis=1)
+        # Cluster vazio mantém o centro anterior
+        new_centers = np.where(sizes[:, None] > 0, sums / np.maximum(sizes, 1)[:, None], centers)
+        shift = ((new_centers - centers) ** 2).sum()
+        centers = new_centers
+        if shift <= tolerance:
+            break
+
+    distances = _squared_distances(data, centers, norms)
+    labels = distances.argmin(axis=1)
+    sizes = np.bincount(labels, weights=weights, minlength=k)
+    inertia = float((distances[np.arange(len(data)), labels] * weights).sum())
+    return centers, sizes.astype(np.int64), inertia
+
+
+def kmeans(pixels: np.ndarray, k: int, seed: int = PALETTE_SEED, max_iter: int = PALETTE_MAX_ITER,
+           tol: float = 1e-4, n_init: int = PALETTE_INIT, bits: int = PALETTE_BITS) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Small vectorized Lloyd k-means over an (N, 3) array of colors.
+
+    The colors are first binned into a weighted histogram with `bits` per
+    channel, so the cost depends on the number of occupied bins (a few
+    thousand at most) rather than on the frame size or its noise.
+
+    Returns:
+        tuple: (centers (k, 3) float array, pixel count of each cluster, inertia over the bins)
+    """
+    data, weights = _binned_colors(pixels.reshape(-1, 3), bits)
+    k = min(k, len(data))
+
+    # Mesma tolerância relativa do scikit-learn: tol * variância média dos dados
+    mean = np.average(data, axis=0, weights=weights)
+    tolerance = tol * np.average((data - mean) ** 2, axis=0, weights=weights).mean()
+    norms = (data ** 2).sum(axis=1)
+
+    rng = np.random.default_rng(seed)
+    best = None
+    for _ in range(max(1, n_init)):
+        result = _lloyd(data, weights, norms, _kmeans_plus_plus(data, weights, k, rng), max_iter, tolerance)
+        if best is None or result[2] < best[2]:
+            best = result
+    return best
+
+
+def _palette(centers: np.ndarray, sizes: np.ndarray) -> List[Color]:
+    order = np.argsort(-sizes, kind="stable")
+    return [tuple(int(c) for c in center) for center in centers.astype(int)[order]]
+
+
+def dominant_colors(source: FrameSource, num_colors: int = 3,
+                    frame_size: Optional[Tuple[int, int]] = None, seed: int = PALETTE_SEED) -> List[Color]:
+    """Palette of a frame quantized with k-means, most frequent cluster first"""
+    pixels = load_frame(source, PALETTE_SIZE, frame_size).reshape(-1, 3)
+    centers, sizes, _ = kmeans(pixels, num_colors, seed)
+    return _palette(centers, sizes)
+
+
+def analyze_palette(source: FrameSource, frame_size: Optional[Tuple[int, int]] = None,
+                    num_colors: int = PALETTE_PARAMS["colors"]) -> Palette:
+    """Dominant color, k-means palette and vibrant colors of one frame"""
+    if not isinstance(source, (str, np.ndarray)):
+        # Decodifica os bytes uma única vez para as três análises
+        source = load_frame(source, frame_size, frame_size)
+    return Palette(
+        dominant=dominant_color(source),
+        dominant_colors=dominant_colors(source, num_colors),
+        vibrant=vibrant_colors(source, num_colors)
+    )
+
+
+def _loop_vibrant_colors(source: FrameSource, num_colors: int = 5,
+                         frame_size: Optional[Tuple[int, int]] = None) -> List[Color]:
+    """Reference per-pixel implementation, kept for validation and benchmarks"""
+    pixels = load_frame(source, VIBRANT_SIZE, frame_size).reshape(-1, 3)
+    vibrant_pixels = []
+    for r, g, b in pixels:
+        h, s, v = colorsys.rgb_to_hsv(r / 255.0, g / 255.0, b / 255.0)
+        s, v = s * 255, v * 255
+        if s > VIBRANT_MIN_SATURATION and v > VIBRANT_MIN_VALUE:
+            vibrant_pixels.append((r, g, b, s, v))
+    vibrant_pixels.sort(key=lambda x: (x[3], x[4]), reverse=True)
+    return [tuple(int(c) for c in pixel[:3]) for pixel in vibrant_pixels[:num_colors]]
+
+
+def _counter_dominant_color(source: FrameSource, frame_size: Optional[Tuple[int, int]] = None) -> Color:
+    """Reference Counter implementation, kept for validation and benchmarks"""
+    pixels = load_frame(source, DOMINANT_SIZE, frame_size).reshape(-1, 3)
+    most_common = Counter(map(tuple, pixels.tolist())).most_common(1)[0][0]
+    return tuple(int(c) for c in most_common)
+
+
+def _sklearn_palette(pixels: np.ndarray, num_colors: int) -> Tuple[List[Color], float]:
+    """Palette and inertia of the scikit-learn KMeans call previously used by the UI"""
+    from sklearn.cluster import KMeans
+
+    # n_init=10 era o padrão do scikit-learn usado pela UI (a partir da 1.4 o padrão virou 1)
+    kmeans_model = KMeans(n_clusters=num_colors, random_state=PALETTE_SEED, n_init=10)
+    kmeans_model.fit(pixels)
+    sizes = np.bincount(kmeans_model.labels_, minlength=num_colors)
+    return _palette(kmeans_model.cluster_centers_, sizes), float(kmeans_model.inertia_)
+
+
+def palette_distance(palette: List[Color], reference: List[Color]) -> float:
+    """Largest distance between a color of `reference` and the closest color of `palette`"""
+    if not palette or not reference:
+        return 0.0
+    distances = _squared_distances(np.array(reference, dtype=np.float64), np.array(palette, dtype=np.float64))
+    return float(np.sqrt(distances.min(axis=1).max()))
+
+
+def pixel_inertia(pixels: np.ndarray, centers: np.ndarray) -> float:
+    """Sum of squared distances of every pixel to its closest center"""
+    return float(_squared_distances(pixels.astype(np.float64), centers).min(axis=1).sum())
+
+
+def validate_palettes(sources: List[FrameSource], num_colors: int = 3,
+                      frame_size: Optional[Tuple[int, int]] = None) -> List[Tuple[str, float, float, bool]]:
+    """
+    Compare the built-in quantizer with scikit-learn KMeans on a fixture set.
+
+    A source passes when the inertia over its pixels is at most
+    MAX_INERTIA_RATIO times the KMeans one, and no KMeans color is farther
+    than MAX_PALETTE_DISTANCE from the palette unless the inertia ties with
+    KMeans (TIED_INERTIA_RATIO): frames with several equally good
+    clusterings may legitimately get other colors.
+
+    Returns:
+        list: (name, largest color distance, inertia relative to KMeans, passed) per source
+    """
+    results = []
+    for i, source in enumerate(sources):
+        name = source if isinstance(source, str) else f"fixture-{i}"
+        pixels = load_frame(source, PALETTE_SIZE, frame_size).reshape(-1, 3)
+        centers, sizes, _ = kmeans(pixels, num_colors)
+        reference, reference_inertia = _sklearn_palette(pixels, num_colors)
+        # Inércia sobre os pixels, não sobre os bins, para comparar com o KMeans
+        inertia = pixel_inertia(pixels, centers)
+        ratio = inertia / reference_inertia if reference_inertia else 1.0
+        distance = palette_distance(_palette(centers, sizes), reference)
+        passed = ratio <= MAX_INERTIA_RATIO and (distance <= MAX_PALETTE_DISTANCE or ratio <= TIED_INERTIA_RATIO)
+        results.append((name, distance, ratio, passed))
+    return results
+
+
+def fixture_frames(count: int = 8, seed: int = PALETTE_SEED) -> List[np.ndarray]:
+    """Synthetic 100x100 frames made of a few noisy color regions"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for _ in range(count):
+        base = rng.integers(0, 256, (int(rng.integers(2, 6)), 3))
+        # Regiões horizontais de tamanhos diferentes com ruído
+        bounds = np.sort(rng.integers(0, PALETTE_SIZE[1], len(base) - 1))
+        rows = np.searchsorted(bounds, np.arange(PALETTE_SIZE[1]), side="right")
+        frame = base[rows][:, None, :] + rng.normal(0, 12, (PALETTE_SIZE[1], PALETTE_SIZE[0], 3))
+        frames.append(np.clip(frame, 0, 255).astype(np.uint8))
+    return frames
+
+
+def _benchmark(function, args, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(*args)
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Analisa as cores de um frame')
+    parser.add_argument('source', help='Imagem de entrada, ou - para ler um frame rgb24 bruto do stdin')
+    parser.add_argument('--raw-size', help='Tamanho do frame bruto (LxA), ex: 100x100')
+    parser.add_argument('--colors', type=int, default=3, help='Número de cores vibrantes')
+    parser.add_argument('--benchmark', action='store_true',
+        help='Compara a versão vetorizada com a implementação por pixel')
+    parser.add_argument('--repeat', type=int, default=20, help='Repetições do benchmark')
+    parser.add_argument('--validate', action='store_true',
+        help='Compara a paleta com o KMeans do scikit-learn (fixtures sintéticas + a entrada)')
+
+    args = parser.parse_args()
+
+    frame_size = None
+    if args.source=='-':
+        if not args.raw_size:
+            parser.error('--raw-size é obrigatório ao ler do stdin')
+        frame_size = tuple(int(n) for n in args.raw_size.lower().split('x'))
+        source = read_raw_frame(sys.stdin.buffer, *frame_size)
+        if source is None:
+            parser.error('frame incompleto no stdin')
+    else:
+        # Decodifica uma única vez para medir só a análise
+        source = np.asarray(Image.open(args.source).convert("RGB"))
+
+    print(f"Cor predominante: {dominant_color(source, frame_size)}")
+    print(f"Cores vibrantes (R, G, B): {vibrant_colors(source, args.colors, frame_size)}")
+    print(f"Cores predominantes: {dominant_colors(source, args.colors, frame_size)}")
+
+    if args.benchmark:
+        for name, fast, slow, extra in (
+                ("dominant_color", dominant_color, _counter_dominant_color, ()),
+                ("vibrant_colors", vibrant_colors, _loop_vibrant_colors, (args.colors,))):
+            fast_ms, fast_result = _benchmark(fast, (source, *extra, frame_size), args.repeat)
+            slow_ms, slow_result = _benchmark(slow, (source, *extra, frame_size), args.repeat)
+            status = "idêntico" if fast_result==slow_result else "DIFERENTE"
+            print(f"{name}: {fast_ms:.2f} ms vetorizado, {slow_ms:.2f} ms por pixel "
+                  f"({slow_ms / fast_ms:.1f}x), resultado {status}")
+        palette_ms, _ = _benchmark(dominant_colors, (source, args.colors, frame_size), args.repeat)
+        print(f"dominant_colors: {palette_ms:.2f} ms")
+
+    if args.validate:
+        try:
+            import sklearn  # noqa: F401
+        except ImportError:
+            parser.error('scikit-learn não está instalado; a validação precisa dele como referência')
+        results = validate_palettes(fixture_frames() + [args.source if frame_size is None else source],
+                                    args.colors, frame_size)
+        for name, distance, ratio, passed in results:
+            print(f"{name}: distância máxima para o KMeans = {distance:.1f}, inércia relativa = {ratio:.3f} "
+                  f"{'ok' if passed else 'FORA DA TOLERÂNCIA'}")
+        if not all(passed for *_, passed in results):
+            sys.exit(1)
+
+
+if __name__=="__main__":
+    main()
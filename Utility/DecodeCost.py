@@ -0,0 +1,81 @@
+import os
+import subprocess
+from dataclasses import dataclass
+from typing import Optional
+
+FFMPEG = './ffmpeg'
+
+
+@dataclass
+class DecodeCost:
+    """CPU spent decoding a video, measured from the rusage of the decoder."""
+    frames: int
+    cpu_seconds: float
+    wall_seconds: float
+
+    @property
+    def ms_per_frame(self) -> float:
+        return 1000 * self.cpu_seconds / self.frames if self.frames else 0.0
+
+
+def measure_decode(video_path: str, duration: Optional[float] = None, hwaccel: Optional[str] = None,
+                   ffmpeg=FFMPEG) -> Optional[DecodeCost]:
+    """
+    Decode the video stream (no output) and measure its CPU time per frame.
+
+    `duration` limits the decode to the first seconds; `hwaccel` (ex: vaapi)
+    decodes the way mpv does with hwdec. The CPU time comes from wait4(),
+    so it counts every decoder thread and nothing else.
+    """
+    command = [ffmpeg, '-v', 'error', '-nostats']
+    if hwaccel:
+        command += ['-hwaccel', hwaccel]
+    command += ['-i', video_path]
+    if duration:
+        command += ['-t', str(duration)]
+    command += ['-map', '0:v:0', '-f', 'null', '-progress', 'pipe:1', '-']
+
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    except OSError as e:
+        print(f"Erro ao medir decodificação de {video_path}: {e}")
+        return None
+
+    frames = 0
+    wall_seconds = 0.0
+    for line in process.stdout:
+        key, _, value = line.strip().partition("=")
+        if key=="frame" and value.isdigit():
+            frames = int(value)
+        elif key=="out_time_us" and value.isdigit():
+            wall_seconds = int(value) / 1e6
+    process.stdout.close()
+    # wait4 em vez de wait(): devolve o rusage só deste processo
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode!=0 or not frames:
+        print(f"Falha ao decodificar {video_path}")
+        return None
+    return DecodeCost(frames, usage.ru_utime + usage.ru_stime, wall_seconds)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Mede o custo de CPU por frame da decodificação de vídeos')
+    parser.add_argument('videos', nargs='+', help='Vídeos a comparar (ex: original e pré-processado)')
+    parser.add_argument('--duration', type=float, help='Decodifica só os primeiros segundos')
+    parser.add_argument('--hwaccel', help='Decodificação em hardware (ex: vaapi, cuda)')
+
+    args = parser.parse_args()
+
+    print(f"{'vídeo':<40} {'frames':>8} {'CPU s':>8} {'CPU ms/frame':>13}")
+    for video_path in args.videos:
+        cost = measure_decode(video_path, args.duration, args.hwaccel)
+        if cost is not None:
+            print(f"{os.path.basename(video_path)[:40]:<40} {cost.frames:>8} {cost.cpu_seconds:>8.2f} "
+                  f"{cost.ms_per_frame:>13.2f}")
+
+
+if __name__=="__main__":
+    main()
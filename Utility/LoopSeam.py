@@ -0,0 +1,97 @@
+import os
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+FFMPEG = './ffmpeg'
+PROBE_SIZE = 16  # Frames reduzidos a 16x16 em cinza: o pipe não pesa na medição
+
+
+@dataclass
+class SeamReport:
+    """Frame intervals of a looped decode, at the seams and elsewhere."""
+    frames_per_loop: int
+    median_ms: float  # Intervalo típico entre frames dentro do loop
+    seam_ms: float  # Intervalo médio entre o último frame e o primeiro do loop seguinte
+    worst_seam_ms: float
+
+    @property
+    def spike_ms(self) -> float:
+        return self.seam_ms - self.median_ms
+
+
+def frame_arrivals(video_path: str, loops: int, hwaccel: Optional[str] = None, ffmpeg=FFMPEG) -> List[float]:
+    """
+    Decode the video `loops` times in a row as fast as possible and return
+    the moment each frame came out of the decoder.
+
+    -stream_loop seeks back to the start and flushes the decoder at the end
+    of every cycle, like mpv's --loop-file.
+    """
+    command = [ffmpeg, '-v', 'error', '-nostats']
+    if hwaccel:
+        command += ['-hwaccel', hwaccel]
+    command += [
+        '-stream_loop', str(loops - 1), '-i', video_path, '-map', '0:v:0',
+        '-vf', f'scale={PROBE_SIZE}:{PROBE_SIZE},format=gray',
+        # Um frame por escrita: o tempo de chegada é o tempo de decodificação
+        '-f', 'rawvideo', '-flush_packets', '1', 'pipe:1'
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, bufsize=0)
+    frame = bytearray(PROBE_SIZE * PROBE_SIZE)
+    view = memoryview(frame)
+    arrivals = []
+    while True:
+        received = 0
+        while received < len(frame):
+            count = process.stdout.readinto(view[received:])
+            if not count:
+                break
+            received += count
+        if received < len(frame):
+            break
+        arrivals.append(time.perf_counter())
+    process.stdout.close()
+    process.wait()
+    return arrivals
+
+
+def measure_seam(video_path: str, loops: int = 6, hwaccel: Optional[str] = None) -> Optional[SeamReport]:
+    """Frame-time spike at the loop seam of a video (None if it couldn't be decoded)"""
+    arrivals = frame_arrivals(video_path, loops, hwaccel)
+    frames_per_loop = len(arrivals) // loops
+    if frames_per_loop < 2 or len(arrivals)!=frames_per_loop * loops:
+        print(f"Falha ao decodificar {video_path} em loop")
+        return None
+
+    intervals = [(b - a) * 1000 for a, b in zip(arrivals, arrivals[1:])]
+    # intervals[i] vai do frame i ao i + 1; a emenda fica entre o último frame de um ciclo e o primeiro do próximo
+    seam_indexes = {cycle * frames_per_loop - 1 for cycle in range(1, loops)}
+    seams = [intervals[i] for i in sorted(seam_indexes)]
+    # O primeiro ciclo inclui a abertura do decoder
+    steady = [value for i, value in enumerate(intervals[frames_per_loop:], frames_per_loop) if i not in seam_indexes]
+    return SeamReport(frames_per_loop, statistics.median(steady), statistics.mean(seams), max(seams))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Mede o pico de tempo de frame na emenda do loop')
+    parser.add_argument('videos', nargs='+', help='Vídeos a comparar (ex: original e pré-processado em loop)')
+    parser.add_argument('--loops', type=int, default=6, help='Ciclos decodificados por vídeo')
+    parser.add_argument('--hwaccel', help='Decodificação em hardware (ex: vaapi), como o mpv com hwdec')
+
+    args = parser.parse_args()
+
+    print(f"{'vídeo':<40} {'frames':>7} {'mediana ms':>11} {'emenda ms':>10} {'pior ms':>8} {'pico ms':>8}")
+    for video_path in args.videos:
+        report = measure_seam(video_path, max(3, args.loops), args.hwaccel)
+        if report is not None:
+            print(f"{os.path.basename(video_path)[:40]:<40} {report.frames_per_loop:>7} {report.median_ms:>11.2f} "
+                  f"{report.seam_ms:>10.2f} {report.worst_seam_ms:>8.2f} {report.spike_ms:>8.2f}")
+
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,278 @@
+import os
+import subprocess
+import time
+from typing import Callable, List, Optional
+
+from Core.LiveWallMpvIpc import MpvIpcClient, MpvIpcError
+from Core.LiveWallPlayer import LiveWallPlayer, ipc_socket_path
+from Utility import ProcStats
+from Utility.PlaybackBenchmark import stop_player
+
+# Saídas que o wallpaper consegue usar, da mais para a menos capaz
+VO_CANDIDATES = ("gpu-next", "gpu", "xv", "x11")
+GPU_VOS = ("gpu-next", "gpu")
+# Contextos X11 e a API que cada um exige
+CONTEXT_APIS = {"x11vk": "vulkan", "x11egl": "opengl", "x11": "opengl"}
+HWDEC_CANDIDATES = ("vaapi", "nvdec", "vdpau", "vulkan")
+
+# Acima disso (frames descartados por segundo) a configuração não é considerada fluida
+DROP_TOLERANCE = 0.5
+
+TUNED_KEYS = ("vo", "gpu_context", "gpu_api", "hwdec")
+
+
+def mpv_option_values(option: str) -> List[str]:
+    """Values mpv accepts for an option (same parsing as the settings dialog)"""
+    try:
+        result = subprocess.run(["mpv", f"--{option}=help"], stdout=subprocess.PIPE, text=True)
+        return [line.split()[0] for line in result.stdout.splitlines()[1:] if line.strip()]
+    except Exception as e:
+        print(f"Erro ao listar opções para {option}: {e}")
+        return []
+
+
+def candidate_configs(output="desktop") -> List[dict]:
+    """
+    Viable vo/gpu-context/gpu-api/hwdec combinations on this machine.
+
+    Software decoding (hwdec "no") comes first for every output so a broken
+    output can be skipped before trying its hardware decoders.
+    """
+    hwdecs = [h for h in HWDEC_CANDIDATES if h in set(mpv_option_values("hwdec"))]
+
+    if output=="null":
+        # Sem saída de vídeo só o decode é comparado; frames de hardware precisam voltar à RAM
+        return [{"vo": "null", "gpu_context": "auto", "gpu_api": "auto", "hwdec": hwdec}
+                for hwdec in ["no"] + [LiveWallPlayer.copy_back_hwdec(h) for h in hwdecs]]
+
+    vos = set(mpv_option_values("vo"))
+    contexts = set(mpv_option_values("gpu-context"))
+    configs = []
+    for vo in VO_CANDIDATES:
+        if vo not in vos:
+            continue
+        if vo in GPU_VOS:
+            for context, api in CONTEXT_APIS.items():
+                if context not in contexts:
+                    continue
+                for hwdec in ["no"] + hwdecs:
+                    configs.append({"vo": vo, "gpu_context": context, "gpu_api": api, "hwdec": hwdec})
+        else:
+            for hwdec in ["no"] + [LiveWallPlayer.copy_back_hwdec(h) for h in hwdecs]:
+                configs.append({"vo": vo, "gpu_context": "auto", "gpu_api": "auto", "hwdec": hwdec})
+    return configs
+
+
+class _DesktopRun:
+    """Candidate rendered the same way as the wallpaper (xwinwrap on one monitor)"""
+
+    def __init__(self, video_path, config, settings):
+        self.player = LiveWallPlayer()
+        self.player.set_video_output(config["vo"])
+        self.player.set_gpu_context(config["gpu_context"])
+        self.player.set_gpu_api(config["gpu_api"])
+        self.player.set_hwdec(config["hwdec"])
+        monitors = self.player.target_monitors()
+        # O maior monitor é o caso mais caro
+        largest = max(monitors, key=lambda m: m.width * m.height, default=None)
+        self.player.set_selected_monitor(largest.name if largest else "")
+        self.player.set_playback_caps(settings["scale_to_monitor"], settings["max_fps"], settings["monitor_caps"])
+        self.player.set_video_path(video_path)
+        self.player.start()
+
+    @property
+    def client(self):
+        return self.player.instances[0].client if self.player.instances else None
+
+    def wait_until_playing(self, timeout):
+        return bool(self.player.instances) and self.player.wait_until_playing(timeout)
+
+    def pids(self):
+        return self.player.mpv_pids()
+
+    def stop(self):
+        stop_player(self.player)
+
+
+class _NullRun:
+    """Candidate decoded by a bare mpv with --vo=null (no display needed)"""
+
+    def __init__(self, video_path, config, settings):
+        self.video_path = os.path.abspath(video_path)
+        self.ipc_path = ipc_socket_path()
+        self.process = subprocess.Popen([
+            "mpv", "--no-config", "--vo=null", f"--hwdec={config['hwdec']}", "--loop-file",
+            "--no-audio", f"--input-ipc-server={self.ipc_path}", self.video_path
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.client = MpvIpcClient(self.ipc_path)
+
+    def wait_until_playing(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                return False
+            try:
+                if self.client.get_property("playback-time") is not None:
+                    return True
+            except MpvIpcError:
+                pass
+            time.sleep(0.01)
+        return False
+
+    def pids(self):
+        return [self.process.pid]
+
+    def stop(self):
+        self.client.quit()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        try:
+            os.unlink(self.ipc_path)
+        except OSError:
+            pass
+
+
+def _drop_count(client):
+    total = 0
+    for name in ("frame-drop-count", "decoder-frame-drop-count"):
+        try:
+            total += int(client.get_property(name, 0) or 0)
+        except (MpvIpcError, TypeError, ValueError):
+            pass
+    return total
+
+
+def run_candidate(video_path, config, settings, warmup=2.0, duration=5.0, output="desktop", timeout=10.0):
+    """
+    Play the video with one configuration and measure it.
+
+    Returns:
+        dict: the configuration plus cpu_percent, rss_mean, rss_peak,
+              drops_per_second and hwdec_current, or None when the
+              configuration doesn't play (or silently fell back to
+              software decoding)
+    """
+    run = (_NullRun if output=="null" else _DesktopRun)(video_path, config, settings)
+    try:
+        if not run.wait_until_playing(timeout):
+            return None
+        client = run.client
+        hwdec_current = client.get_property("hwdec-current", "no") or "no"
+        if config["hwdec"]!="no" and hwdec_current=="no":
+            # O mpv caiu para decode em software: o resultado duplicaria o de hwdec=no
+            return None
+        time.sleep(warmup)
+        pids = run.pids()
+        if not pids:
+            return None
+        drops_before = _drop_count(client)
+        result = ProcStats.measure(pids, duration)
+        drops = _drop_count(client) - drops_before
+    except MpvIpcError:
+        return None
+    finally:
+        run.stop()
+
+    result.update(config)
+    result["hwdec_current"] = hwdec_current
+    result["drops_per_second"] = max(0, drops) / duration if duration else 0.0
+    return result
+
+
+def score(result):
+    """Sort key: smooth playback first, then CPU time, then memory"""
+    return (result["drops_per_second"] > DROP_TOLERANCE, result["cpu_percent"], result["rss_mean"])
+
+
+def tune(video_path, settings, warmup=2.0, duration=5.0, output="desktop",
+         progress: Optional[Callable[[str], None]] = None,
+         should_stop: Optional[Callable[[], bool]] = None):
+    """
+    Benchmark every viable configuration and return (best, results).
+
+    `best` is None when nothing played. CPU usage only counts the mpv
+    processes; GPU time isn't measured, which is why smooth playback (no
+    dropped frames) is ranked before CPU.
+    """
+    progress = progress or print
+    configs = candidate_configs(output)
+    results = []
+    broken_outputs = set()
+    for i, config in enumerate(configs, 1):
+        if should_stop and should_stop():
+            break
+        output_key = (config["vo"], config["gpu_context"])
+        label = f"vo={config['vo']} gpu-context={config['gpu_context']} hwdec={config['hwdec']}"
+        if output_key in broken_outputs:
+            progress(f"[{i}/{len(configs)}] {label}: ignorado (saída indisponível)")
+            continue
+
+        progress(f"[{i}/{len(configs)}] {label}...")
+        result = run_candidate(video_path, config, settings, warmup, duration, output)
+        if result is None:
+            if config["hwdec"]=="no":
+                broken_outputs.add(output_key)
+            progress(f"[{i}/{len(configs)}] {label}: não reproduziu")
+            continue
+        results.append(result)
+        progress(f"[{i}/{len(configs)}] {label}: CPU {result['cpu_percent']:.1f}%  "
+                 f"RSS {result['rss_mean'] / 2**20:.0f} MB  drops {result['drops_per_second']:.2f}/s")
+
+    results.sort(key=score)
+    return (results[0] if results else None), results
+
+
+def apply_result(settings, result):
+    """Settings updated with the tuned configuration"""
+    settings = dict(settings)
+    settings.update({key: result[key] for key in TUNED_KEYS})
+    return settings
+
+
+def main():
+    import argparse
+    from Core.LiveWallPIDManager import LiveWallPIDManager
+    from Widgets.Widgets import SettingsDialogWidget
+
+    parser = argparse.ArgumentParser(description='Escolhe a configuração de reprodução mais leve para esta máquina')
+    parser.add_argument('input_video', help='Vídeo usado no teste')
+    parser.add_argument('--output', choices=("desktop", "null"),
+        default="desktop" if os.environ.get("DISPLAY") else "null",
+        help='desktop: renderiza como o wallpaper; null: só decodifica (sem display)')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Segundos antes de começar a medir')
+    parser.add_argument('--duration', type=float, default=5.0, help='Segundos de medição por configuração')
+    parser.add_argument('--dry-run', action='store_true', help='Não grava a melhor configuração')
+
+    args = parser.parse_args()
+
+    settings = SettingsDialogWidget.load_settings()
+
+    # O wallpaper atual competiria pela CPU/GPU e distorceria a medição
+    LiveWallPIDManager().kill_processes()
+
+    best, results = tune(args.input_video, settings, args.warmup, args.duration, args.output)
+    if best is None:
+        print("Nenhuma configuração conseguiu reproduzir o vídeo")
+        raise SystemExit(1)
+
+    print(f"{'vo':<10} {'gpu-context':<12} {'gpu-api':<8} {'hwdec':<12} {'em uso':<12} "
+          f"{'CPU %':>8} {'RSS médio':>12} {'drops/s':>8}")
+    for result in results:
+        print(f"{result['vo']:<10} {result['gpu_context']:<12} {result['gpu_api']:<8} {result['hwdec']:<12} "
+              f"{result['hwdec_current']:<12} {result['cpu_percent']:>8.1f} "
+              f"{result['rss_mean'] / 2**20:>9.1f} MB {result['drops_per_second']:>8.2f}")
+
+    if args.output=="null":
+        # Sem saída de vídeo só o hwdec foi comparado; vo/contexto continuam os atuais
+        best = dict(best, vo=settings["vo"], gpu_context=settings["gpu_context"], gpu_api=settings["gpu_api"],
+                    hwdec=best["hwdec"].removesuffix("-copy") if settings["vo"] in GPU_VOS else best["hwdec"])
+    print(f"Melhor: {', '.join(f'{key}={best[key]}' for key in TUNED_KEYS)}")
+    if not args.dry_run and SettingsDialogWidget.write_settings(apply_result(settings, best)):
+        print("Configuração gravada em settings.json")
+
+
+if __name__=="__main__":
+    main()
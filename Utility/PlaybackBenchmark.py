@@ -0,0 +1,119 @@
+import time
+
+from Core.LiveWallPlayer import LiveWallPlayer, PLAYBACK_MODES
+from Utility import ProcStats
+
+
+def start_player(video_path, settings, mode):
+    """Start the wallpaper on every monitor with the given playback mode"""
+    player = LiveWallPlayer()
+    player.set_video_output(settings["vo"])
+    player.set_gpu_context(settings["gpu_context"])
+    player.set_gpu_api(settings["gpu_api"])
+    player.set_hwdec(settings["hwdec"])
+    player.set_play_all_monitors(True)
+    player.set_playback_mode(mode)
+    player.set_playback_caps(settings["scale_to_monitor"], settings["max_fps"], settings["monitor_caps"])
+    player.set_cache_budget(settings["loop_cache_mb"] * 2**20)
+    player.set_video_path(video_path)
+    player.start()
+    return player
+
+
+def stop_player(player, timeout=5):
+    """Terminate the xwinwrap/mpv process groups started by a player"""
+    player.stop(timeout)
+
+
+def run_mode(video_path, settings, mode, warmup, duration):
+    """Play the video in one mode and measure the CPU and memory of its processes"""
+    player = start_player(video_path, settings, mode)
+    try:
+        player.wait_until_playing()
+        time.sleep(warmup)
+        instances = len(player.instances)
+        # Os grupos xwinwrap incluem os processos mpv
+        result = ProcStats.measure(player.pids, duration)
+    finally:
+        stop_player(player)
+    result["instances"] = instances
+    return result
+
+
+def measure_switch_latency(video_paths, settings, mode, rounds=5, timeout=15.0):
+    """
+    Time wallpaper switches until every instance plays the new file.
+
+    Returns:
+        dict: list of latencies in milliseconds for "respawn" (quit and start
+              new xwinwrap/mpv processes, as before) and "ipc" (loadfile on the
+              running instances)
+    """
+    latencies = {"respawn": [], "ipc": []}
+
+    player = start_player(video_paths[0], settings, mode)
+    player.wait_until_playing(timeout)
+    for i in range(1, rounds + 1):
+        video_path = video_paths[i % len(video_paths)]
+        start = time.perf_counter()
+        stop_player(player)
+        player = start_player(video_path, settings, mode)
+        if player.wait_until_playing(timeout):
+            latencies["respawn"].append((time.perf_counter() - start) * 1000)
+
+    for i in range(1, rounds + 1):
+        video_path = video_paths[i % len(video_paths)]
+        start = time.perf_counter()
+        player.load_video(video_path)
+        if player.wait_until_playing(timeout):
+            latencies["ipc"].append((time.perf_counter() - start) * 1000)
+    stop_player(player)
+    return latencies
+
+
+def main():
+    import argparse
+    from Core.LiveWallPIDManager import LiveWallPIDManager
+    from Widgets.Widgets import SettingsDialogWidget
+
+    parser = argparse.ArgumentParser(description='Compara CPU e memória dos modos de reprodução multi-monitor')
+    parser.add_argument('input_video', help='Vídeo usado no teste')
+    parser.add_argument('--modes', nargs='+', choices=PLAYBACK_MODES, default=list(PLAYBACK_MODES),
+        help='Modos a comparar')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Segundos antes de começar a medir')
+    parser.add_argument('--duration', type=float, default=20.0, help='Segundos de medição por modo')
+    parser.add_argument('--switch-to', metavar='VIDEO',
+        help='Mede a latência de troca entre input_video e VIDEO (respawn x IPC) em vez de CPU/RSS')
+    parser.add_argument('--rounds', type=int, default=5, help='Trocas medidas por método')
+
+    args = parser.parse_args()
+
+    settings = SettingsDialogWidget.load_settings()
+
+    # O wallpaper atual competiria pela GPU e distorceria a medição
+    LiveWallPIDManager().kill_processes()
+
+    if args.switch_to:
+        latencies = measure_switch_latency([args.input_video, args.switch_to], settings,
+                                           settings["playback_mode"], args.rounds)
+        for method, values in latencies.items():
+            if values:
+                print(f"{method:<8} média {sum(values) / len(values):8.1f} ms  "
+                      f"mín {min(values):8.1f} ms  máx {max(values):8.1f} ms  ({len(values)} trocas)")
+            else:
+                print(f"{method:<8} nenhuma troca concluída")
+        return
+
+    results = {}
+    for mode in args.modes:
+        print(f"Medindo {mode}...")
+        results[mode] = run_mode(args.input_video, settings, mode, args.warmup, args.duration)
+
+    print(f"{'modo':<12} {'instâncias':>10} {'processos':>10} {'CPU %':>8} {'RSS médio':>12} {'RSS pico':>12}")
+    for mode, result in results.items():
+        print(f"{mode:<12} {result['instances']:>10} {result['processes']:>10} {result['cpu_percent']:>8.1f} "
+              f"{result['rss_mean'] / 2**20:>9.1f} MB {result['rss_peak'] / 2**20:>9.1f} MB")
+
+
+if __name__=="__main__":
+    main()
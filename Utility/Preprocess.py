@@ -0,0 +1,753 @@
+import json
+import math
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable, List, Optional
+
+from Utility.DecodeCost import measure_decode
+from Utility.LoopSeam import measure_seam
+from Utility.VideoAnalyzer import VideoProbe, probe_video
+
+FFMPEG = './ffmpeg'
+CACHE_PATH = os.path.expanduser("~/.cache/MyLiveWall/encoders.json")
+PROFILE_PATH = os.path.expanduser("~/.cache/MyLiveWall/wallpaper_profile.json")
+VAAPI_DEVICE = "/dev/dri/renderD128"
+
+# Do melhor para o pior: hardware primeiro, depois software
+ENCODER_PREFERENCE = ("hevc_nvenc", "h264_nvenc", "hevc_vaapi", "h264_vaapi", "libx265", "libx264", "libsvtav1")
+
+# Bits por pixel por frame que mantêm um loop de wallpaper sem artefatos visíveis
+BITS_PER_PIXEL = {"hevc": 0.05, "h264": 0.08, "av1": 0.04}
+MIN_BITRATE = 1_000_000
+MAX_FPS = 60
+SAMPLE_SECONDS = 5.0  # Trecho codificado por candidato no benchmark de perfis
+MAX_CROSSFADE = 2.0  # Segundos; os primeiros frames ficam em memória até a transição
+
+# Encode em pedaços paralelos (só encoders de software, que deixam núcleos ociosos em vídeos longos)
+CHUNKED_MIN_DURATION = 60.0  # Abaixo disso um encode único já é curto
+CHUNK_THREADS = 4  # Threads de encoder por pedaço
+CHUNKS_PER_WORKER = 2  # Pedaços menores equilibram a carga entre os workers
+MIN_CHUNK_SECONDS = 10.0
+
+# Níveis (nome, máx. macroblocos por frame, máx. macroblocos/s) do H.264
+H264_LEVELS = (("3.1", 3600, 108000), ("4.1", 8192, 245760), ("4.2", 8704, 522240),
+               ("5.1", 36864, 983040), ("5.2", 36864, 2073600), ("6.2", 139264, 16711680))
+# Níveis (nome, máx. amostras de luma por frame, máx. amostras/s) do HEVC
+HEVC_LEVELS = (("4.1", 2228224, 133693440), ("5.1", 8912896, 534773760),
+               ("5.2", 8912896, 1069547520), ("6.2", 35651584, 4278190080))
+
+
+@dataclass
+class EncodeTargets:
+    """Output resolution, frame rate and bitrate of a preprocessing job."""
+    width: int
+    height: int
+    fps: float
+    bitrate: int
+
+
+@dataclass
+class EncodeProgress:
+    """Progress of a running encode, parsed from ffmpeg -progress."""
+    percent: float
+    fps: float
+    eta: Optional[float]  # Segundos restantes, None enquanto a velocidade é desconhecida
+
+    def describe(self) -> str:
+        text = f"{self.percent:.0f}% · {self.fps:.0f} fps"
+        if self.eta is not None:
+            minutes, seconds = divmod(int(self.eta), 60)
+            text += f" · ETA {minutes}:{seconds:02d}"
+        return text
+
+
+@dataclass(frozen=True)
+class WallpaperProfile:
+    """Decoder-side settings of a preprocessing encode."""
+    name: str
+    bframes: int
+    refs: int
+    gop_seconds: float
+    fast_decode: bool = False  # tune fastdecode do x264/x265 (no H.264: CAVLC, sem deblock nem weighted prediction)
+
+
+# Todos em 8 bits 4:2:0; o melhor para esta máquina é escolhido com --benchmark
+WALLPAPER_PROFILES = {
+    "balanced": WallpaperProfile("balanced", bframes=3, refs=3, gop_seconds=2.0),
+    "low-refs": WallpaperProfile("low-refs", bframes=0, refs=1, gop_seconds=5.0),
+    "fast-decode": WallpaperProfile("fast-decode", bframes=0, refs=1, gop_seconds=5.0, fast_decode=True),
+}
+DEFAULT_PROFILE = "fast-decode"
+
+
+@dataclass
+class LoopPlan:
+    """Frame counts of a seamless loop encode."""
+    frames: int  # Frames da saída: o loop nunca termina em um frame parcial
+    crossfade_frames: int  # Últimos frames misturados com os primeiros (0 = sem transição)
+
+
+def loop_plan(probe: VideoProbe, fps: float, crossfade: float = 0.0) -> LoopPlan:
+    """
+    Whole-frame length of a loop encode at `fps`.
+
+    With a crossfade the last frames fade into the first ones, so the output
+    starts `crossfade` seconds into the source and the end of every cycle
+    already shows the start of the next.
+    """
+    total = max(1, int(probe.duration * fps))
+    crossfade_frames = min(round(min(crossfade, MAX_CROSSFADE) * fps), total // 3)
+    return LoopPlan(total - crossfade_frames, crossfade_frames)
+
+
+def encoder_codec(encoder: str) -> str:
+    if "hevc" in encoder or "x265" in encoder:
+        return "hevc"
+    if "av1" in encoder:
+        return "av1"
+    return "h264"
+
+
+def _ffmpeg_fingerprint(ffmpeg=FFMPEG):
+    """Size and mtime of the ffmpeg binary: a new build invalidates the cache"""
+    try:
+        stat = os.stat(ffmpeg)
+        return [os.path.abspath(ffmpeg), stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        return None
+
+
+def listed_encoders(ffmpeg=FFMPEG) -> List[str]:
+    """Video encoders compiled into ffmpeg"""
+    try:
+        result = subprocess.run([ffmpeg, '-hide_banner', '-encoders'], capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"Erro ao listar encoders do ffmpeg: {e}")
+        return []
+    encoders = []
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        # Linhas de encoder: " V....D libx264   descrição"
+        if len(parts) >= 2 and len(parts[0])==6 and parts[0].startswith("V"):
+            encoders.append(parts[1])
+    return encoders
+
+
+def encoder_works(encoder: str, ffmpeg=FFMPEG) -> bool:
+    """Encode a few frames of a test pattern: listed encoders may still lack the hardware"""
+    command = [ffmpeg, '-v', 'error', '-f', 'lavfi', '-i', 'testsrc2=size=640x360:rate=30:duration=0.2']
+    if encoder.endswith("_vaapi"):
+        if not os.path.exists(VAAPI_DEVICE):
+            return False
+        command += ['-vaapi_device', VAAPI_DEVICE, '-vf', 'format=nv12,hwupload']
+    command += ['-c:v', encoder, '-f', 'null', '-']
+    try:
+        subprocess.run(command, capture_output=True, check=True, timeout=30)
+        return True
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+        return False
+
+
+def detect_encoders(ffmpeg=FFMPEG, refresh=False) -> List[str]:
+    """
+    Working encoders in order of preference, probed once per ffmpeg build.
+
+    The result is cached in ~/.cache/MyLiveWall/encoders.json.
+    """
+    fingerprint = _ffmpeg_fingerprint(ffmpeg)
+    if not refresh and fingerprint is not None:
+        try:
+            with open(CACHE_PATH) as f:
+                cached = json.load(f)
+            if cached.get("ffmpeg")==fingerprint:
+                return cached["encoders"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            pass
+
+    listed = set(listed_encoders(ffmpeg))
+    encoders = [encoder for encoder in ENCODER_PREFERENCE if encoder in listed and encoder_works(encoder, ffmpeg)]
+
+    if fingerprint is not None:
+        try:
+            os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+            with open(CACHE_PATH, 'w') as f:
+                json.dump({"ffmpeg": fingerprint, "encoders": encoders}, f, indent=4)
+        except OSError as e:
+            print(f"Erro ao salvar cache de encoders: {e}")
+    return encoders
+
+
+def largest_monitor():
+    """(width, height) of the largest connected monitor, None if unknown"""
+    from Core.LiveWallTopology import LiveWallTopology
+    monitors = LiveWallTopology.shared().monitors()
+    if not monitors:
+        return None
+    monitor = max(monitors, key=lambda m: m.width * m.height)
+    return monitor.width, monitor.height
+
+
+def encode_targets(probe: VideoProbe, encoder: str, monitor=None, max_fps=0) -> EncodeTargets:
+    """
+    Resolution, frame rate and bitrate for a wallpaper encode.
+
+    The output covers the largest monitor (the player crops the rest) and
+    never upscales; frames above the playback cap (`max_fps`) would be
+    decoded only to be dropped, so they are dropped here. The bitrate
+    follows the pixel rate and never exceeds the source.
+    """
+    width, height = probe.width, probe.height
+    if monitor and width and height:
+        scale = max(monitor[0] / width, monitor[1] / height)
+        if scale < 1:
+            width, height = round(width * scale), round(height * scale)
+    # Encoders de 4:2:0 exigem dimensões pares
+    width, height = max(2, width - width % 2), max(2, height - height % 2)
+
+    fps = min(probe.fps or 30.0, max_fps or MAX_FPS, MAX_FPS)
+    bitrate = int(width * height * fps * BITS_PER_PIXEL[encoder_codec(encoder)])
+    if probe.bitrate:
+        bitrate = min(bitrate, probe.bitrate)
+    return EncodeTargets(width, height, fps, max(MIN_BITRATE, bitrate))
+
+
+def codec_level(codec: str, targets: EncodeTargets) -> Optional[str]:
+    """Lowest level of the codec that fits the output (decoders size their buffers by it)"""
+    if codec=="h264":
+        frame = math.ceil(targets.width / 16) * math.ceil(targets.height / 16)
+        levels = H264_LEVELS
+    elif codec=="hevc":
+        frame = targets.width * targets.height
+        levels = HEVC_LEVELS
+    else:
+        return None
+    return next((name for name, max_frame, max_rate in levels
+                 if frame <= max_frame and frame * targets.fps <= max_rate), None)
+
+
+def profile_options(encoder: str, targets: EncodeTargets, profile: WallpaperProfile,
+                    closed_gop: bool = False) -> List[str]:
+    """Codec profile, level, GOP, B-frame and reference options of a wallpaper profile"""
+    codec = encoder_codec(encoder)
+    level = codec_level(codec, targets)
+    gop = max(1, round(targets.fps * profile.gop_seconds))
+
+    if encoder=="libx265":
+        params = ["log-level=error", f"keyint={gop}", f"min-keyint={gop}", "scenecut=0",
+                  f"bframes={profile.bframes}", f"ref={profile.refs}"]
+        if level:
+            params.append(f"level-idc={level}")
+        if closed_gop:
+            params.append("open-gop=0")
+        options = ['-profile:v', 'main', '-x265-params', ":".join(params)]
+    elif encoder=="libsvtav1":
+        options = ['-g', str(gop)]
+        if closed_gop:
+            options += ['-svtav1-params', 'irefresh-type=2']
+    else:
+        options = ['-profile:v', 'high' if codec=="h264" else 'main', '-g', str(gop),
+                   '-bf', str(profile.bframes), '-refs', str(profile.refs)]
+        if level:
+            options += ['-level:v', level]
+        if encoder=="libx264":
+            options += ['-keyint_min', str(gop), '-sc_threshold', '0']
+        if closed_gop:
+            options += ['-flags', '+cgop']
+
+    if profile.fast_decode and encoder in ("libx264", "libx265"):
+        options += ['-tune', 'fastdecode']
+    return options
+
+
+def crossfade_graph(filters: str, loop: LoopPlan, fps: float) -> str:
+    """filter_complex of a crossfaded loop: body, then the tail fading into the head"""
+    total, fade = loop.frames + loop.crossfade_frames, loop.crossfade_frames
+    # trim perde a taxa de quadros que o xfade e o muxer exigem; fps a restaura
+    return (f"[0:v]{filters},split=3[body][tail][head];"
+            f"[body]trim=start_frame={fade}:end_frame={total - fade},setpts=PTS-STARTPTS[body_trim];"
+            f"[tail]trim=start_frame={total - fade}:end_frame={total},setpts=PTS-STARTPTS,fps={fps:g}[tail_trim];"
+            f"[head]trim=start_frame=0:end_frame={fade},setpts=PTS-STARTPTS,fps={fps:g}[head_trim];"
+            f"[tail_trim][head_trim]xfade=transition=fade:duration={fade / fps:.6f}:offset=0[seam];"
+            f"[body_trim][seam]concat=n=2:v=1:a=0,fps={fps:g}")
+
+
+def build_command(video_path: str, output_path: str, encoder: str, targets: EncodeTargets,
+                  ffmpeg=FFMPEG, profile: Optional[WallpaperProfile] = None,
+                  duration: Optional[float] = None, loop: Optional[LoopPlan] = None) -> List[str]:
+    """
+    ffmpeg command line for one preprocessing job.
+
+    `duration` encodes only the first seconds. With `loop` the output is
+    trimmed to whole frames in closed GOPs without B-frames, so the first
+    frame is a keyframe presented at 0 and mpv's seek back at the end of
+    every cycle doesn't depend on frames of the previous GOP.
+    """
+    profile = profile or WALLPAPER_PROFILES[DEFAULT_PROFILE]
+    if loop:
+        profile = replace(profile, bframes=0)
+    scale = f"scale={targets.width}:{targets.height}"
+    fps = f"fps={targets.fps:g}"
+    upload = ",format=nv12,hwupload" if encoder.endswith("_vaapi") else ""
+    command = [ffmpeg, '-y', '-v', 'error']
+    if encoder.endswith("_vaapi"):
+        command += ['-vaapi_device', VAAPI_DEVICE]
+    command += ['-i', video_path]
+    if duration:
+        command += ['-t', str(duration)]
+
+    if loop and loop.crossfade_frames:
+        command += ['-filter_complex', f"{crossfade_graph(f'{fps},{scale}', loop, targets.fps)}{upload}[v]",
+                    '-map', '[v]']
+    else:
+        command += ['-vf', f"{fps},{scale}{upload}"]
+    if not upload:
+        command += ['-pix_fmt', 'yuv420p']
+    if loop:
+        command += ['-frames:v', str(loop.frames)]
+
+    rate = ['-b:v', str(targets.bitrate), '-maxrate', str(int(targets.bitrate * 1.5)),
+            '-bufsize', str(targets.bitrate * 2)]
+    if encoder.endswith("_nvenc"):
+        command += ['-c:v', encoder, '-preset', 'p7', '-rc', 'vbr', *rate]
+    elif encoder.endswith("_vaapi"):
+        command += ['-c:v', encoder, '-rc_mode', 'VBR', *rate]
+    elif encoder=="libx265":
+        command += ['-c:v', encoder, '-preset', 'medium', *rate]
+    elif encoder=="libsvtav1":
+        command += ['-c:v', encoder, '-preset', '8', '-b:v', str(targets.bitrate)]
+    else:
+        command += ['-c:v', encoder, '-preset', 'slow', *rate]
+    command += profile_options(encoder, targets, profile, closed_gop=loop is not None)
+
+    return command + output_options(encoder) + [output_path]
+
+
+def output_options(encoder: str) -> List[str]:
+    """Container options every preprocessed file shares (ex: the preprocessed tag)"""
+    options = ['-tag:v', 'hvc1'] if encoder_codec(encoder)=="hevc" else []
+    return options + [
+        # O wallpaper toca sem áudio
+        '-an',
+        '-metadata', f'preprocessed="yes"',
+        '-movflags', '+use_metadata_tags+faststart'
+    ]
+
+
+OUTPUT_SUFFIX = "_processed.mp4"
+
+
+def output_path_for(video_path: str) -> str:
+    return os.path.splitext(video_path)[0] + OUTPUT_SUFFIX
+
+
+def replace_source(video_path: str, output_path: str) -> str:
+    """Put a finished encode in place of its source; returns the new path (always .mp4)"""
+    renamed_path = os.path.splitext(video_path)[0] + ".mp4"
+    os.replace(output_path, renamed_path)
+    if renamed_path!=video_path:
+        os.remove(video_path)
+    return renamed_path
+
+
+def parse_progress(values: dict, duration: float) -> EncodeProgress:
+    """EncodeProgress from one block of ffmpeg -progress key=value pairs"""
+    def number(key, suffix=""):
+        try:
+            return float(values.get(key, "").removesuffix(suffix))
+        except ValueError:  # "N/A" no início do encode
+            return 0.0
+
+    position = number("out_time_us") / 1e6
+    speed = number("speed", "x")
+    if values.get("progress")=="end":
+        return EncodeProgress(100.0, number("fps"), 0.0)
+    percent = min(100.0, 100.0 * position / duration) if duration else 0.0
+    eta = max(0.0, duration - position) / speed if duration and speed > 0 else None
+    return EncodeProgress(percent, number("fps"), eta)
+
+
+def run_encode(command: List[str], duration: float,
+               on_progress: Optional[Callable[[EncodeProgress], None]] = None,
+               on_start: Optional[Callable[[subprocess.Popen], None]] = None) -> bool:
+    """
+    Run an ffmpeg command built by build_command, reporting its progress.
+
+    The encoder runs in its own process group so that a cancellation can
+    terminate it (see TranscodeQueue.cancel) through `on_start`.
+    """
+    # -progress antes do arquivo de saída: blocos key=value terminados por progress=continue/end
+    command = command[:-1] + ['-progress', 'pipe:1', '-nostats', command[-1]]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, start_new_session=True)
+    if on_start:
+        on_start(process)
+    values = {}
+    for line in process.stdout:
+        key, _, value = line.strip().partition("=")
+        values[key] = value
+        if key=="progress":
+            if on_progress:
+                on_progress(parse_progress(values, duration))
+            values = {}
+    return process.wait()==0
+
+
+def chunk_workers(parallel_jobs: int = 1) -> int:
+    """
+    Chunks encoded at the same time by one job: one per CHUNK_THREADS cores,
+    shared among the `parallel_jobs` jobs that may run at once.
+    """
+    return max(1, (os.cpu_count() or 1) // CHUNK_THREADS // max(1, parallel_jobs))
+
+
+def use_chunks(encoder: str, probe: VideoProbe, loop: Optional[LoopPlan], workers: int) -> bool:
+    # Encoders de hardware têm poucas sessões; o loop precisa do vídeo inteiro em um só grafo
+    return (loop is None and encoder.startswith("lib") and probe.duration >= CHUNKED_MIN_DURATION
+            and workers >= 2)
+
+
+def split_at_keyframes(video_path: str, chunk_dir: str, chunk_seconds: float,
+                       on_start: Optional[Callable[[subprocess.Popen], None]] = None, ffmpeg=FFMPEG):
+    """
+    Cut the video stream (no re-encode) into pieces of about `chunk_seconds`.
+
+    The segment muxer only cuts at keyframes, so every piece decodes on its
+    own. Like run_encode, ffmpeg gets its own process group and is handed
+    to `on_start` so a cancellation can kill it. Returns [(path, duration)].
+    """
+    list_path = os.path.join(chunk_dir, "sources.csv")
+    command = [
+        ffmpeg, '-v', 'error', '-i', video_path, '-map', '0:v:0', '-c', 'copy',
+        '-f', 'segment', '-segment_time', f"{chunk_seconds:.3f}", '-reset_timestamps', '1',
+        '-segment_list', list_path, '-segment_list_type', 'csv',
+        os.path.join(chunk_dir, "source%04d.mkv")
+    ]
+    process = subprocess.Popen(command, start_new_session=True)
+    if on_start:
+        on_start(process)
+    if process.wait()!=0:
+        raise subprocess.CalledProcessError(process.returncode, command)
+    chunks = []
+    with open(list_path) as f:
+        for line in f:
+            # nome,início,fim
+            name, start, end = line.strip().rsplit(",", 2)
+            chunks.append((os.path.join(chunk_dir, name), float(end) - float(start)))
+    return chunks
+
+
+def concat_chunks(chunk_paths: List[str], output_path: str, encoder: str, ffmpeg=FFMPEG) -> bool:
+    """Join encoded chunks without re-encoding (concat demuxer + stream copy)"""
+    list_path = os.path.join(os.path.dirname(chunk_paths[0]), "encoded.txt")
+    with open(list_path, 'w') as f:
+        for path in chunk_paths:
+            escaped = path.replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    command = [ffmpeg, '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_path,
+               '-map', '0:v', '-c', 'copy'] + output_options(encoder) + [output_path]
+    try:
+        subprocess.run(command, check=True)
+        return True
+    except (subprocess.CalledProcessError, OSError) as e:
+        print(f"Falha ao juntar os pedaços de {output_path}: {e}")
+        return False
+
+
+def run_chunked(video_path: str, output_path: str, encoder: str, targets: EncodeTargets,
+                profile: WallpaperProfile, duration: float,
+                on_progress: Optional[Callable[[EncodeProgress], None]] = None,
+                on_start: Optional[Callable[[subprocess.Popen], None]] = None,
+                cancelled: Optional[Callable[[], bool]] = None, workers: Optional[int] = None) -> bool:
+    """
+    Encode a long video in parallel pieces cut at keyframes and join them.
+
+    Each piece runs the same build_command as a whole-file encode, so the
+    joined file has the same codec settings and tags. `on_start` receives
+    every encoder process (a cancellation must kill all of them).
+    """
+    workers = workers or chunk_workers()
+    chunk_seconds = max(MIN_CHUNK_SECONDS, duration / (workers * CHUNKS_PER_WORKER))
+    # Diretório oculto ao lado da saída: o LibraryWatcher ignora entradas com ponto
+    with tempfile.TemporaryDirectory(prefix=".mylivewall-chunks-",
+                                     dir=os.path.dirname(os.path.abspath(output_path))) as chunk_dir:
+        try:
+            sources = split_at_keyframes(video_path, chunk_dir, chunk_seconds, on_start)
+        except (subprocess.CalledProcessError, OSError, ValueError) as e:
+            if not (cancelled and cancelled()):
+                print(f"Falha ao dividir {video_path} em keyframes: {e}")
+            return False
+        if cancelled and cancelled():
+            return False
+        print(f"Codificando {len(sources)} pedaços com {workers} workers")
+
+        total = sum(chunk_duration for _, chunk_duration in sources) or duration
+        done = [0.0] * len(sources)
+        speeds = [0.0] * len(sources)
+        lock = threading.Lock()
+        failed = threading.Event()
+        started = time.monotonic()
+
+        def report(index, progress):
+            with lock:
+                done[index] = sources[index][1] * progress.percent / 100
+                speeds[index] = progress.fps if progress.percent < 100 else 0.0
+                encoded = sum(done)
+                elapsed = time.monotonic() - started
+                eta = elapsed * (total - encoded) / encoded if encoded else None
+                summary = EncodeProgress(min(100.0, 100 * encoded / total), sum(speeds), eta)
+            if on_progress:
+                on_progress(summary)
+
+        def encode(index):
+            if failed.is_set() or (cancelled and cancelled()):
+                return None
+            source, chunk_duration = sources[index]
+            chunk_output = os.path.join(chunk_dir, f"encoded{index:04d}.mp4")
+            command = build_command(source, chunk_output, encoder, targets, profile=profile)
+            command = command[:-1] + ['-threads', str(CHUNK_THREADS), command[-1]]
+            if run_encode(command, chunk_duration, lambda progress: report(index, progress), on_start):
+                return chunk_output
+            failed.set()
+            return None
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outputs = list(pool.map(encode, range(len(sources))))
+        if not all(outputs) or (cancelled and cancelled()):
+            return False
+        return concat_chunks(outputs, output_path, encoder)
+
+
+def load_profile_choice():
+    """(encoder, profile name) chosen by the last benchmark; (None, DEFAULT_PROFILE) without one"""
+    try:
+        with open(PROFILE_PATH) as f:
+            choice = json.load(f)
+        if choice["profile"] in WALLPAPER_PROFILES:
+            return choice.get("encoder"), choice["profile"]
+    except (OSError, json.JSONDecodeError, KeyError, TypeError):
+        pass
+    return None, DEFAULT_PROFILE
+
+
+def save_profile_choice(encoder: str, profile: str):
+    try:
+        os.makedirs(os.path.dirname(PROFILE_PATH), exist_ok=True)
+        with open(PROFILE_PATH, 'w') as f:
+            json.dump({"encoder": encoder, "profile": profile}, f, indent=4)
+    except OSError as e:
+        print(f"Erro ao salvar perfil de pré-processamento: {e}")
+
+
+def benchmark_profiles(video_path: str, encoders: Optional[List[str]] = None, monitor=None, max_fps=0,
+                       hwaccel: Optional[str] = None, sample_seconds=SAMPLE_SECONDS,
+                       progress: Optional[Callable[[str], None]] = None):
+    """
+    Encode the first seconds of a video with every encoder/profile pair and
+    measure how much CPU each output costs to decode.
+
+    Only the first working encoder of each codec is tried. Returns
+    (original, results): the DecodeCost of the same seconds of the source
+    and a list of dicts (encoder, profile, cost, size) sorted by CPU
+    milliseconds per frame, cheapest first.
+    """
+    progress = progress or print
+    probe = probe_video(video_path)
+    if probe is None:
+        return None, []
+    monitor = monitor or largest_monitor()
+    encoders = encoders or detect_encoders()
+    per_codec = {}
+    for encoder in encoders:
+        per_codec.setdefault(encoder_codec(encoder), encoder)
+
+    original = measure_decode(video_path, sample_seconds, hwaccel)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="mylivewall-profiles-") as tmp_dir:
+        for encoder in per_codec.values():
+            targets = encode_targets(probe, encoder, monitor, max_fps)
+            for profile in WALLPAPER_PROFILES.values():
+                if profile.fast_decode and encoder not in ("libx264", "libx265"):
+                    continue  # Sem tune fastdecode o resultado repetiria "low-refs"
+                label = f"{encoder} {profile.name}"
+                output_path = os.path.join(tmp_dir, f"{encoder}-{profile.name}.mp4")
+                command = build_command(video_path, output_path, encoder, targets, profile=profile,
+                                        duration=sample_seconds)
+                if not run_encode(command, sample_seconds):
+                    progress(f"{label}: falha ao codificar")
+                    continue
+                cost = measure_decode(output_path, hwaccel=hwaccel)
+                if cost is None:
+                    continue
+                results.append({"encoder": encoder, "profile": profile.name, "cost": cost,
+                                "size": os.path.getsize(output_path)})
+                progress(f"{label}: {cost.ms_per_frame:.2f} ms de CPU por frame")
+
+    results.sort(key=lambda result: result["cost"].ms_per_frame)
+    return original, results
+
+
+def preprocess_video(video_path: str, output_path: Optional[str] = None, encoder: Optional[str] = None,
+                     monitor=None, on_progress: Optional[Callable[[EncodeProgress], None]] = None,
+                     on_start: Optional[Callable[[subprocess.Popen], None]] = None,
+                     cancelled: Optional[Callable[[], bool]] = None, profile: Optional[str] = None,
+                     max_fps=0, seamless_loop=False, crossfade=0.0, chunked: Optional[bool] = None,
+                     workers: Optional[int] = None) -> bool:
+    """
+    Encode `video_path` for playback as a wallpaper.
+
+    Uses the encoder and profile picked by benchmark_profiles (if it ran)
+    and falls back to the next working encoder if one fails on this input.
+    `seamless_loop` (optionally with a `crossfade` in seconds) encodes for
+    mpv's --loop-file, see build_command. Long videos are encoded in
+    parallel chunks with software encoders (`chunked` None = automatic,
+    see use_chunks), at most `workers` at a time (default: chunk_workers();
+    callers running several jobs at once pass their share). Returns True on success; on failure or cancellation
+    the partial output is removed.
+    """
+    output_path = output_path or output_path_for(video_path)
+    workers = workers or chunk_workers()
+    probe = probe_video(video_path)
+    if probe is None:
+        return False
+    monitor = monitor or largest_monitor()
+
+    chosen_encoder, chosen_profile = load_profile_choice()
+    wallpaper_profile = WALLPAPER_PROFILES[profile or chosen_profile]
+    encoders = [encoder] if encoder else detect_encoders()
+    if not encoder and chosen_encoder in encoders:
+        encoders = [chosen_encoder] + [e for e in encoders if e!=chosen_encoder]
+    if not encoders:
+        print("Nenhum encoder de vídeo disponível no ffmpeg")
+        return False
+
+    for candidate in encoders:
+        if cancelled and cancelled():
+            break
+        targets = encode_targets(probe, candidate, monitor, max_fps)
+        loop = loop_plan(probe, targets.fps, crossfade) if seamless_loop else None
+        print(f"Preprocessing {video_path} com {candidate} ({wallpaper_profile.name}): "
+              f"{targets.width}x{targets.height} @ {targets.fps:g} fps, {targets.bitrate / 1e6:.1f} Mbps"
+              + (f", loop de {loop.frames} frames" if loop else ""))
+        try:
+            duration = loop.frames / targets.fps if loop else probe.duration
+            if use_chunks(candidate, probe, loop, workers) if chunked is None else chunked and loop is None:
+                ok = run_chunked(video_path, output_path, candidate, targets, wallpaper_profile, duration,
+                                 on_progress, on_start, cancelled, workers)
+            else:
+                command = build_command(video_path, output_path, candidate, targets, profile=wallpaper_profile,
+                                        loop=loop)
+                ok = run_encode(command, duration, on_progress, on_start)
+            if ok:
+                return True
+            print(f"Falha ao codificar com {candidate}")
+        except OSError as e:
+            print(f"Falha ao codificar com {candidate}: {e}")
+
+    try:
+        os.remove(output_path)
+    except FileNotFoundError:
+        pass
+    return False
+
+
+def print_costs(original, results):
+    print(f"{'encoder':<12} {'perfil':<12} {'CPU ms/frame':>13} {'vs original':>12} {'tamanho':>10}")
+    if original is not None:
+        print(f"{'original':<12} {'':<12} {original.ms_per_frame:>13.2f} {'':>12} {'':>10}")
+    for result in results:
+        ms_per_frame = result["cost"].ms_per_frame
+        ratio = f"{100 * ms_per_frame / original.ms_per_frame:.0f}%" if original and original.ms_per_frame else "-"
+        print(f"{result['encoder']:<12} {result['profile']:<12} {ms_per_frame:>13.2f} {ratio:>12} "
+              f"{result['size'] / 2**20:>7.1f} MB")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Pré-processa vídeos para uso como wallpaper')
+    parser.add_argument('input_video', nargs='?', help='Vídeo a processar')
+    parser.add_argument('--output', help='Arquivo de saída (padrão: <nome>_processed.mp4)')
+    parser.add_argument('--encoder', help='Força um encoder (ex: libx264)')
+    parser.add_argument('--profile', choices=WALLPAPER_PROFILES, help='Força um perfil de decodificação')
+    parser.add_argument('--monitor', help='Resolução alvo, ex: 1920x1080 (padrão: maior monitor conectado)')
+    parser.add_argument('--max-fps', type=float, default=0, help='Limite de fps da saída (0 = até 60)')
+    parser.add_argument('--loop', action='store_true',
+        help='Codifica para loop sem emenda (GOP fechado, keyframe no frame 0, frames inteiros)')
+    parser.add_argument('--crossfade', type=float, default=0.0,
+        help=f'Com --loop, funde os últimos segundos com os primeiros (máx. {MAX_CROSSFADE:g}s)')
+    parser.add_argument('--chunks', choices=("auto", "on", "off"), default="auto",
+        help='Codifica em pedaços paralelos (auto: vídeos longos com encoder de software)')
+    parser.add_argument('--list-encoders', action='store_true', help='Mostra os encoders que funcionam nesta máquina')
+    parser.add_argument('--refresh', action='store_true', help='Ignora o cache de encoders')
+    parser.add_argument('--benchmark', action='store_true',
+        help='Compara o custo de decodificação de cada encoder/perfil e grava o mais leve')
+    parser.add_argument('--verify', action='store_true',
+        help='Depois de codificar, compara o custo de decodificação do original e da saída')
+    parser.add_argument('--hwaccel', help='Mede a decodificação em hardware (ex: vaapi), como o mpv com hwdec')
+    parser.add_argument('--dry-run', action='store_true', help='Só mostra o comando do ffmpeg (ou não grava o perfil)')
+
+    args = parser.parse_args()
+
+    encoders = detect_encoders(refresh=args.refresh)
+    if args.list_encoders or not args.input_video:
+        print(f"Encoders disponíveis (ordem de preferência): {', '.join(encoders) or 'nenhum'}")
+        encoder, profile = load_profile_choice()
+        print(f"Perfil em uso: {profile}" + (f" com {encoder}" if encoder else ""))
+        return
+
+    monitor = tuple(int(v) for v in args.monitor.split('x')) if args.monitor else None
+    if args.benchmark:
+        original, results = benchmark_profiles(args.input_video, [args.encoder] if args.encoder else encoders,
+                                               monitor, args.max_fps, args.hwaccel)
+        if not results:
+            print("Nenhum encoder/perfil conseguiu codificar o vídeo")
+            raise SystemExit(1)
+        print_costs(original, results)
+        best = results[0]
+        print(f"Mais leve: {best['encoder']} {best['profile']}")
+        if not args.dry_run:
+            save_profile_choice(best["encoder"], best["profile"])
+            print(f"Perfil gravado em {PROFILE_PATH}")
+        return
+
+    if args.dry_run:
+        probe = probe_video(args.input_video)
+        if probe is None or not (args.encoder or encoders):
+            raise SystemExit(1)
+        chosen_encoder, chosen_profile = load_profile_choice()
+        encoder = args.encoder or (chosen_encoder if chosen_encoder in encoders else encoders[0])
+        targets = encode_targets(probe, encoder, monitor or largest_monitor(), args.max_fps)
+        loop = loop_plan(probe, targets.fps, args.crossfade) if args.loop else None
+        print(" ".join(build_command(args.input_video, args.output or output_path_for(args.input_video),
+                                     encoder, targets, profile=WALLPAPER_PROFILES[args.profile or chosen_profile],
+                                     loop=loop)))
+        return
+
+    output_path = args.output or output_path_for(args.input_video)
+    ok = preprocess_video(args.input_video, output_path, args.encoder, monitor,
+                          on_progress=lambda progress: print(f"\r{progress.describe()}", end="", flush=True),
+                          profile=args.profile, max_fps=args.max_fps, seamless_loop=args.loop,
+                          crossfade=args.crossfade, chunked={"on": True, "off": False}.get(args.chunks))
+    print()
+    if ok and args.verify:
+        original = measure_decode(args.input_video, hwaccel=args.hwaccel)
+        output = measure_decode(output_path, hwaccel=args.hwaccel)
+        if original and output:
+            print(f"CPU por frame: original {original.ms_per_frame:.2f} ms, "
+                  f"pré-processado {output.ms_per_frame:.2f} ms "
+                  f"({100 * output.ms_per_frame / original.ms_per_frame:.0f}%)")
+        if args.loop:
+            for label, path in (("original", args.input_video), ("pré-processado", output_path)):
+                seam = measure_seam(path, hwaccel=args.hwaccel)
+                if seam is not None:
+                    print(f"Emenda do loop ({label}): {seam.seam_ms:.2f} ms contra {seam.median_ms:.2f} ms "
+                          f"entre frames (pico {seam.spike_ms:+.2f} ms)")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__=="__main__":
+    main()
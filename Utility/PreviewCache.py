@@ -0,0 +1,174 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from typing import Callable, Optional
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cache/my_gif_cache")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+TEMP_PREFIX = ".tmp-"
+
+
+class PreviewCache:
+    """Content-addressed cache for thumbnails and GIF previews.
+
+    Entries are keyed on the video path, size and mtime plus the parameters
+    used to generate them, so a replaced or re-encoded file never reuses a
+    stale entry. Writes are atomic and the total size is kept under a byte
+    budget by evicting the least recently used entries; a running total of
+    the cache size means the directory is only walked when it goes over.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.stores = 0
+        self.total_bytes = None  # Tamanho do cache, medido no primeiro enforce_budget e mantido a cada store
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def shared(cls) -> "PreviewCache":
+        """Cache instance shared by the whole application"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def set_max_bytes(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.enforce_budget()
+
+    @staticmethod
+    def make_key(video_path: str, kind: str, params: dict) -> str:
+        """Build the cache key of a video for the given generation parameters"""
+        stat = os.stat(video_path)
+        payload = json.dumps({
+            "path": os.path.abspath(video_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "kind": kind,
+            "params": params
+        }, sort_keys=True)
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def entry_path(self, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{ext}")
+
+    def lookup(self, video_path: str, kind: str, params: dict, ext: str) -> Optional[str]:
+        """Return the cached entry, or None on a miss"""
+        try:
+            path = self.entry_path(self.make_key(video_path, kind, params), ext)
+        except OSError:
+            return None
+
+        if os.path.exists(path):
+            try:
+                # mtime marca o último uso para a política LRU
+                os.utime(path)
+            except OSError:
+                pass
+            with self._lock:
+                self.hits += 1
+            return path
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def store(self, video_path: str, kind: str, params: dict, ext: str,
+              producer: Callable[[str], object]) -> Optional[str]:
+        """Generate an entry through `producer(temp_path)` and publish it atomically.
+
+        The producer writes to a temporary file inside the cache directory,
+        which is renamed to its final name only if it is non-empty.
+        """
+        try:
+            final_path = self.entry_path(self.make_key(video_path, kind, params), ext)
+        except OSError:
+            return None
+
+        fd, temp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, suffix=ext, dir=self.cache_dir)
+        os.close(fd)
+        try:
+            producer(temp_path)
+            if os.path.exists(temp_path) and os.path.getsize(temp_path) > 0:
+                size = os.path.getsize(temp_path)
+                try:
+                    # Uma entrada regenerada substitui a anterior
+                    replaced = os.path.getsize(final_path)
+                except OSError:
+                    replaced = 0
+                os.replace(temp_path, final_path)
+                with self._lock:
+                    self.stores += 1
+                    if self.total_bytes is not None:
+                        self.total_bytes += size - replaced
+                    over_budget = self.total_bytes is None or self.total_bytes > self.max_bytes
+                if over_budget:
+                    self.enforce_budget()
+                return final_path
+            return None
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def enforce_budget(self):
+        """Evict least recently used entries until the cache fits the budget.
+
+        Walks the whole directory, which also resets the running total.
+        """
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.is_file() or entry.name.startswith(TEMP_PREFIX):
+                        continue
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except OSError as e:
+            print(f"Erro ao verificar cache: {e}")
+            return
+
+        if total > self.max_bytes:
+            total = self._evict(entries, total)
+        with self._lock:
+            self.total_bytes = total
+
+    def _evict(self, entries, total):
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+                self.evicted_bytes += size
+        return total
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters since the cache was created"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes
+            }
@@ -0,0 +1,119 @@
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+@dataclass
+class TreeSample:
+    """CPU time and memory of a set of process trees at one instant."""
+    timestamp: float
+    cpu_seconds: float
+    rss_bytes: int
+    pids: List[int] = field(default_factory=list)
+
+
+def _read_stat(pid: int) -> Optional[tuple]:
+    """(ppid, utime + stime in seconds) from /proc/<pid>/stat"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # O nome do processo pode conter espaços e parênteses
+    fields = data[data.rindex(")") + 2:].split()
+    return int(fields[1]), (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def rss_bytes(pid: int) -> int:
+    """Resident memory of a process, 0 if it is gone"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def mem_available() -> Optional[int]:
+    """MemAvailable from /proc/meminfo in bytes, None if it can't be read"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def children_map() -> Dict[int, List[int]]:
+    """Children of every running process, keyed by parent pid"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        stat = _read_stat(int(entry))
+        if stat is not None:
+            children.setdefault(stat[0], []).append(int(entry))
+    return children
+
+
+def process_tree(root_pids: Iterable[int], children: Optional[Dict[int, List[int]]] = None) -> List[int]:
+    """The given pids plus all their descendants"""
+    children = children if children is not None else children_map()
+    pids = []
+    seen = set()
+    pending = list(root_pids)
+    while pending:
+        pid = pending.pop()
+        if pid in seen:
+            continue
+        seen.add(pid)
+        pids.append(pid)
+        pending.extend(children.get(pid, []))
+    return pids
+
+
+def sample_tree(root_pids: Iterable[int]) -> TreeSample:
+    """Total CPU time and RSS of the trees rooted at `root_pids`"""
+    pids = process_tree(root_pids)
+    cpu_seconds = 0.0
+    rss = 0
+    alive = []
+    for pid in pids:
+        stat = _read_stat(pid)
+        if stat is None:
+            continue
+        alive.append(pid)
+        cpu_seconds += stat[1]
+        rss += rss_bytes(pid)
+    return TreeSample(time.monotonic(), cpu_seconds, rss, alive)
+
+
+def measure(root_pids: Iterable[int], duration: float, interval: float = 0.5) -> dict:
+    """
+    Sample process trees for `duration` seconds.
+
+    Returns:
+        dict: cpu_percent (of one core), rss_mean and rss_peak in bytes,
+              and the largest number of processes seen
+    """
+    root_pids = list(root_pids)
+    first = sample_tree(root_pids)
+    samples = [first]
+    deadline = first.timestamp + duration
+    while time.monotonic() < deadline:
+        time.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        samples.append(sample_tree(root_pids))
+
+    last = samples[-1]
+    elapsed = last.timestamp - first.timestamp
+    return {
+        "cpu_percent": (last.cpu_seconds - first.cpu_seconds) / elapsed * 100 if elapsed else 0.0,
+        "rss_mean": sum(sample.rss_bytes for sample in samples) / len(samples),
+        "rss_peak": max(sample.rss_bytes for sample in samples),
+        "processes": max(len(sample.pids) for sample in samples)
+    }
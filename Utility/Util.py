@@ -1,13 +1,27 @@
 import sys
 import os
 import subprocess
-import tempfile
 import hashlib
+import tempfile
 import urllib.parse
 from PIL import Image
-from pathlib import Path
-from typing import List, Optional, Tuple
-from dataclasses import dataclass
+from Utility import VideoToGif
+from Utility import VideoAnalyzer
+from Utility import ColorAnalysis
+from Utility.PreviewCache import PreviewCache, TEMP_PREFIX
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".webm")
+
+# Tamanho dos tiles do grid; miniaturas já são geradas prontas para exibição
+TILE_SIZE = (320, 180)
+
+# Parâmetros de geração usados também na chave do cache
+THUMBNAIL_PARAMS = {"timestamp": "00:00:01", "size": list(TILE_SIZE), "mode": "keyframe"}
+PREVIEW_PARAMS = {"size": [150, 100], "fps": 10, "frame_skip": 5, "sample_duration": 3.0}
+TILE_PARAMS = {"size": list(TILE_SIZE)}
+# Poster e frame de cores saem da mesma decodificação do preview
+POSTER_PARAMS = {"preview": PREVIEW_PARAMS, "size": list(TILE_SIZE)}
+COLOR_PARAMS = {"preview": PREVIEW_PARAMS, "size": list(VideoAnalyzer.COLOR_FRAME_SIZE)}
 
 # Cores inspiradas no Pop!_OS
 COLORS = {
@@ -30,6 +44,34 @@ def get_file_path(file_name):
             base_path = os.path.dirname(os.path.abspath(__file__))
         return os.path.join(base_path, file_name)
 
+def list_videos(directory):
+    """Videos and subdirectories directly inside a directory (one os.scandir pass)"""
+    videos, subdirs = [], []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.name.lower().endswith(VIDEO_EXTENSIONS) and entry.is_file():
+                    videos.append(entry.path)
+    except OSError as e:
+        print(f"Erro ao listar {directory}: {e}")
+    return videos, subdirs
+
+def scan_videos(video_dir, recursive=False):
+    """Videos under a directory, optionally descending into subdirectories"""
+    videos = []
+    pending = [video_dir]
+    while pending:
+        directory = pending.pop()
+        found, subdirs = list_videos(directory)
+        videos.extend(found)
+        if recursive:
+            pending.extend(subdirs)
+    return sorted(videos)
+
 def get_thumbnail_path(file_path):
     """Get the thumbnail path from the freedesktop thumbnail cache"""
     file_uri = f"file://{urllib.parse.quote(os.path.abspath(file_path))}"
@@ -49,44 +91,55 @@ def get_thumbnail_path(file_path):
 
     return None
 
-def get_gif_path(file_path):
-    """Get the thumbnail path from the freedesktop thumbnail cache"""
-    cache_dir = os.path.expanduser("~/.cache/my_gif_cache")
-
-    if not os.path.exists(cache_dir):
-        os.makedirs(cache_dir)
-
-    file_hash = hashlib.md5(os.path.abspath(file_path).encode()).hexdigest()
-    gif_cache_path = os.path.join(cache_dir, f"{file_hash}.gif")
-
-    # Check if the cached GIF already exists
-    if os.path.exists(gif_cache_path):
-        return gif_cache_path
-
-    return None
-
-def generate_thumbnail(video_path):
-    """Generate a thumbnail using PIL and ffmpeg"""
-    try:
-        temp_thumb = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
-        temp_thumb_path = temp_thumb.name
-        temp_thumb.close()
-
-        command = [
-            './ffmpeg',
-            '-y',
-            '-i', video_path,
-            '-ss', '00:00:01',
+def get_gif_path(file_path, params=PREVIEW_PARAMS):
+    """Get the GIF preview path from the preview cache"""
+    return PreviewCache.shared().lookup(file_path, "preview", params, ".gif")
+
+def get_cached_thumbnail_path(file_path, params=THUMBNAIL_PARAMS):
+    """Get the generated thumbnail path from the preview cache"""
+    return PreviewCache.shared().lookup(file_path, "thumbnail", params, ".jpg")
+
+def get_poster_path(file_path, params=POSTER_PARAMS):
+    """Get the poster frame produced by analyze_video_cached"""
+    return PreviewCache.shared().lookup(file_path, "poster", params, ".jpg")
+
+def get_color_frame_path(file_path, params=COLOR_PARAMS):
+    """Get the raw RGB frame (rgb24) produced by analyze_video_cached"""
+    return PreviewCache.shared().lookup(file_path, "color", params, ".rgb")
+
+def tile_filter(width, height):
+    """ffmpeg filter that fits a frame into a tile, letterboxed with the background color"""
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:color={COLORS['bg_primary'].replace('#', '0x')}"
+    )
+
+def generate_thumbnail(video_path, params=THUMBNAIL_PARAMS):
+    """Generate a tile-sized thumbnail with ffmpeg.
+
+    In "keyframe" mode ffmpeg seeks the input to the keyframe nearest to the
+    timestamp and decodes keyframes only, which is much cheaper than decoding
+    up to the exact timestamp on long GOP/4K sources.
+    """
+    width, height = params["size"]
+
+    def extract(output_path):
+        command = ['./ffmpeg', '-v', 'error', '-y']
+        if params.get("mode")=="keyframe":
+            command += ['-skip_frame', 'nokey', '-noaccurate_seek', '-ss', params["timestamp"], '-i', video_path]
+        else:
+            command += ['-i', video_path, '-ss', params["timestamp"]]
+        command += [
             '-vframes', '1',
+            '-vf', tile_filter(width, height),
+            '-q:v', '3',
             '-f', 'image2',
-            temp_thumb_path
+            output_path
         ]
-
         subprocess.run(command, capture_output=True)
 
-        if os.path.exists(temp_thumb_path):
-            return temp_thumb_path
-
+    try:
+        return PreviewCache.shared().store(video_path, "thumbnail", params, ".jpg", extract)
     except Exception as e:
         print(f"Erro ao gerar thumbnail: {e}")
         return None
@@ -94,6 +147,10 @@ def generate_thumbnail(video_path):
 def aspect_ratio_size(image, target_width, target_height):
     """Redimensiona a imagem mantendo o aspect ratio"""
     original_width, original_height = image.size
+    return fit_size(original_width, original_height, target_width, target_height)
+
+def fit_size(original_width, original_height, target_width, target_height):
+    """Calcula o tamanho que cabe no alvo mantendo o aspect ratio"""
     aspect_ratio = original_width / original_height
 
     if original_width > original_height:
@@ -111,282 +168,162 @@ def aspect_ratio_size(image, target_width, target_height):
 
     return new_width, new_height
 
-def generate_thumbnail_gif(video_path, thumbnail_size=(150, 100)):
-    """Generate a thumbnail using PIL and ffmpeg"""
-    cache_dir = os.path.expanduser("~/.cache/my_gif_cache")
-    try:
-        file_hash = hashlib.md5(os.path.abspath(video_path).encode()).hexdigest()
-        gif_cache_path = os.path.join(cache_dir, f"{file_hash}.gif")
+def fit_thumbnail_to_tile(video_path, image_path, params=TILE_PARAMS):
+    """Letterbox an external thumbnail into a cached, tile-sized image.
 
-        image = Image.open(get_linux_thumbnail(video_path))
-        w, h = aspect_ratio_size(image, thumbnail_size[0], thumbnail_size[1])
+    Runs in the loader threads so the GUI only has to load a ready pixmap.
+    """
+    cache = PreviewCache.shared()
+    tile_params = dict(params, source=image_path)
+    cached_path = cache.lookup(video_path, "tile", tile_params, ".jpg")
+    if cached_path:
+        return cached_path
 
-        # subprocess.run(ffmpeg_command)
-        VideoToGif.VideoToGif.create_preview(video_path, width=w, output_gif=gif_cache_path, frame_skip=5, fps=10)
+    width, height = params["size"]
 
-        if os.path.exists(gif_cache_path):
-            return gif_cache_path
+    def fit(output_path):
+        image = Image.open(image_path).convert("RGB")
+        new_size = aspect_ratio_size(image, width, height)
+        resized_image = image.resize(new_size, Image.Resampling.LANCZOS)
+        background = Image.new('RGB', (width, height), COLORS['bg_primary'])
+        background.paste(resized_image, ((width - new_size[0]) // 2, (height - new_size[1]) // 2))
+        background.save(output_path, "JPEG", quality=90)
 
+    try:
+        return cache.store(video_path, "tile", tile_params, ".jpg", fit)
     except Exception as e:
-        print(f"Erro ao gerar thumbnail: {e}")
+        print(f"Erro ao ajustar thumbnail: {e}")
         return None
 
-def check_video_preprocessed(video_path):
-    cmd = [
-        './ffprobe',
-        '-v', 'error',
-        '-show_entries', 'format_tags=preprocessed',
-        '-of', 'default=noprint_wrappers=1:nokey=1',
-        video_path
-    ]
+def generate_thumbnail_gif(video_path, params=PREVIEW_PARAMS, probe=None):
+    """Generate a thumbnail using PIL and ffmpeg (`probe`: metadata already known, ex: from the index)"""
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
+        thumbnail_width, thumbnail_height = params["size"]
+        metadata = None
+        if probe and probe.width and probe.height:
+            w, h = fit_size(probe.width, probe.height, thumbnail_width, thumbnail_height)
+            metadata = VideoToGif.VideoMetadata(probe.duration, probe.width, probe.height, probe.fps)
+        else:
+            w = thumbnail_width
+
+        def create(output_gif):
+            VideoToGif.VideoToGif.create_preview(
+                video_path,
+                width=w,
+                output_gif=output_gif,
+                sample_duration=params["sample_duration"],
+                frame_skip=params["frame_skip"],
+                fps=params["fps"],
+                metadata=metadata
+            )
+
+        return PreviewCache.shared().store(video_path, "preview", params, ".gif", create)
+
+    except Exception as e:
+        print(f"Erro ao gerar thumbnail: {e}")
+        return None
+
+def analyze_video_cached(video_path, probe, with_poster=True):
+    """Produce poster, GIF preview and color frame with one decode and cache them.
+
+    `probe` is the metadata of the video (the caller reads it through the
+    metadata index). Returns (poster_path, preview_path, probe), or None if
+    the video could not be analyzed. The poster is skipped when
+    `with_poster` is False.
+    """
+    cache = PreviewCache.shared()
+
+    params = PREVIEW_PARAMS
+    if probe.width and probe.height:
+        preview_width, _ = fit_size(probe.width, probe.height, *params["size"])
+    else:
+        preview_width = params["size"][0]
+
+    with tempfile.TemporaryDirectory(prefix=TEMP_PREFIX, dir=cache.cache_dir) as temp_dir:
+        result = VideoAnalyzer.analyze_video(
+            video_path,
+            os.path.join(temp_dir, "poster.jpg") if with_poster else None,
+            os.path.join(temp_dir, "preview.gif"),
+            preview_width,
+            fps=params["fps"],
+            frame_skip=params["frame_skip"],
+            sample_duration=params["sample_duration"],
+            poster_filter=tile_filter(*POSTER_PARAMS["size"]),
+            probe=probe
         )
+        if result is None:
+            return None
+
+        poster_path = preview_path = None
+        if result.poster_path:
+            poster_path = cache.store(video_path, "poster", POSTER_PARAMS, ".jpg",
+                                      lambda path: os.replace(result.poster_path, path))
+        if result.preview_path:
+            preview_path = cache.store(video_path, "preview", params, ".gif",
+                                       lambda path: os.replace(result.preview_path, path))
+        if result.color_frame:
+            def write_color_frame(path):
+                with open(path, "wb") as f:
+                    f.write(result.color_frame)
+            cache.store(video_path, "color", COLOR_PARAMS, ".rgb", write_color_frame)
+
+    return poster_path, preview_path, probe
+
+def get_cached_palette(video_path, index):
+    """Palette persisted in the metadata `index` for this exact file, or None; never decodes the video"""
+    data = index.get_palette(video_path, ColorAnalysis.PALETTE_PARAMS)
+    return ColorAnalysis.Palette.from_dict(data) if data else None
+
+def generate_palette(video_path, index):
+    """Compute the palette of a video and persist it in the metadata `index`.
+
+    Uses the color frame left in the cache by analyze_video_cached when there
+    is one, otherwise decodes the same frame (the start of the preview
+    sample) into memory through a pipe.
+    """
+    frame_size = VideoAnalyzer.COLOR_FRAME_SIZE
+    frame = None
+    color_frame_path = get_color_frame_path(video_path)
+    if color_frame_path:
+        try:
+            with open(color_frame_path, "rb") as f:
+                frame = f.read()
+        except OSError:
+            frame = None
+    if not frame or len(frame) < frame_size[0] * frame_size[1] * 3:
+        # Mesmo instante do frame de cores da análise: a paleta não depende do estado do cache
+        probe = index.probe(video_path)
+        start_time = VideoAnalyzer.sample_start(probe.duration if probe else 0.0, PREVIEW_PARAMS["sample_duration"])
+        frame = VideoAnalyzer.capture_raw_frame(video_path, frame_size,
+                                                VideoToGif.VideoToGif.format_timecode(start_time))
+    if frame is None:
+        return None
 
-        # Adicione estes prints para debug
-        comp = result.stdout.replace('\r', '').replace('\n', '').strip()
-        comp2 = '"yes"'
-        print(f"Conteúdo exato: '{comp}'")  # Com aspas para ver espaços invisíveis
-        print(f"Bytes da string: {[ord(c) for c in comp]}")
-        print(f"Bytes da string: {[ord(c) for c in comp2]}")
-        print(f"Comprimento: {len(comp)}")
-        print(f"Comprimento: {len(comp2)}")
-
-        if result.returncode==0 and comp==comp2:
-            return True
-        else:
-            return False
-    except subprocess.CalledProcessError:
-        return False
+    palette = ColorAnalysis.analyze_palette(frame, frame_size)
+    index.put_palette(video_path, ColorAnalysis.PALETTE_PARAMS, palette.to_dict())
+    return palette
+
+def check_video_preprocessed(video_path, index):
+    """Check the preprocessed tag through the metadata `index`"""
+    probe = index.probe(video_path)
+    return probe is not None and probe.preprocessed
 
 def get_linux_thumbnail(video_path):
-    thumb_path = get_thumbnail_path(video_path)
-    if thumb_path and os.path.exists(thumb_path):
+    thumb_path = get_cached_linux_thumbnail(video_path)
+    if thumb_path:
         return thumb_path
     return generate_thumbnail(video_path)
 
+def get_cached_linux_thumbnail(video_path):
+    """Tile-ready thumbnail from the caches; never spawns ffmpeg"""
+    thumb_path = get_thumbnail_path(video_path)
+    if thumb_path and os.path.exists(thumb_path):
+        return fit_thumbnail_to_tile(video_path, thumb_path)
+    return get_cached_thumbnail_path(video_path) or get_poster_path(video_path)
+
 
-def get_linux_thumbnail_preview(video_path):
+def get_linux_thumbnail_preview(video_path, probe=None):
     thumb_path = get_gif_path(video_path)
     if thumb_path and os.path.exists(thumb_path):
         return thumb_path
-    return generate_thumbnail_gif(video_path)
-
-@dataclass
-class VideoMetadata:
-    """Classe para armazenar metadados do vídeo."""
-    duration: float
-    width: int
-    height: int
-    fps: float
-
-
-class VideoToGif:
-    """Classe estática para converter vídeos em GIFs previews otimizados."""
-
-    @staticmethod
-    def get_video_metadata(video_path: str) -> VideoMetadata:
-        """
-        Obtém metadados do vídeo usando FFprobe.
-
-        Args:
-            video_path (str): Caminho do vídeo
-
-        Returns:
-            VideoMetadata: Objeto contendo os metadados do vídeo
-        """
-        # Comando para obter formato do vídeo
-        format_cmd = [
-            "ffprobe",
-            "-v", "error",
-            "-select_streams", "v:0",
-            "-show_entries", "stream=width,height,r_frame_rate,duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            video_path
-        ]
-
-        try:
-            result = subprocess.run(format_cmd, capture_output=True, text=True)
-            width, height, fps_str, duration = result.stdout.strip().split('\n')
-
-            # Calcula FPS da fração retornada (ex: 30000/1001)
-            fps_num, fps_den = map(int, fps_str.split('/'))
-            fps = fps_num / fps_den
-
-            return VideoMetadata(
-                duration=float(duration),
-                width=int(width),
-                height=int(height),
-                fps=fps
-            )
-        except Exception as e:
-            print(f"Erro ao obter metadados: {str(e)}")
-            return VideoMetadata(0.0, 0, 0, 0.0)
-
-    @staticmethod
-    def format_timecode(seconds: float) -> str:
-        """
-        Formata o tempo em segundos para o formato aceito pelo FFmpeg.
-
-        Args:
-            seconds (float): Tempo em segundos
-
-        Returns:
-            str: Tempo formatado com ponto como separador decimal
-        """
-        return f"{seconds:.3f}".replace(',', '.')
-
-    @staticmethod
-    def calculate_time_range(
-            video_duration: float,
-            time_range: Optional[Tuple[float, float]],
-            sample_duration: float
-    ) -> Tuple[float, float]:
-        """
-        Calcula o intervalo de tempo efetivo para o GIF.
-
-        Args:
-            video_duration (float): Duração total do vídeo
-            time_range (tuple, optional): Tupla com (início, fim) em segundos
-            sample_duration (float): Duração desejada do trecho
-
-        Returns:
-            Tuple[float, float]: Tupla com (tempo_inicial, duração)
-        """
-        if time_range is None:
-            # Se não especificado, pega um trecho do meio do vídeo
-            middle_point = video_duration / 2
-            start_time = max(0, middle_point - (sample_duration / 2))
-            duration = min(sample_duration, video_duration - start_time)
-        else:
-            start_time, end_time = time_range
-            # Valida e ajusta o intervalo de tempo
-            start_time = max(0, min(start_time, video_duration))
-            end_time = min(end_time, video_duration)
-            duration = end_time - start_time
-
-        return start_time, duration
-
-    @staticmethod
-    def build_filter_complex(
-            frame_skip: int,
-            width: int,
-            fps: int
-    ) -> str:
-        """
-        Constrói a string de filtros complexos do FFmpeg.
-
-        Args:
-            frame_skip (int): Número de frames para pular
-            width (int): Largura desejada
-            fps (int): FPS desejado
-
-        Returns:
-            str: String de filtros complexos
-        """
-        return (
-            f"select='not(mod(n,{frame_skip}))',"
-            f"scale={width}:-1:flags=lanczos,"
-            f"fps={fps},"
-            f"split[s0][s1];"
-            f"[s0]palettegen=stats_mode=single[p];"
-            f"[s1][p]paletteuse=new=true"
-        )
-
-    @staticmethod
-    def create_preview(
-            input_video: str,
-            time_range: Optional[Tuple[float, float]] = None,
-            sample_duration: float = 3.0,
-            width: int = 480,
-            fps: int = 12,
-            frame_skip: int = 1,
-            output_gif: Optional[str] = None
-    ) -> bool:
-        """
-        Cria um GIF preview de um vídeo usando FFmpeg com otimizações.
-
-        Args:
-            input_video (str): Caminho do vídeo de entrada
-            time_range (tuple, optional): Tupla com (início, fim) em segundos
-            sample_duration (float): Duração do trecho em segundos
-            width (int): Largura do GIF em pixels
-            fps (int): Frames por segundo desejados
-            frame_skip (int): Número de frames para pular
-            output_gif (str, optional): Caminho do GIF de saída
-
-        Returns:
-            bool: True se a conversão foi bem sucedida
-        """
-        if not os.path.exists(input_video):
-            raise FileNotFoundError(f"Vídeo não encontrado: {input_video}")
-
-        if output_gif is None:
-            output_gif = str(Path(input_video).with_suffix('')) + "_preview.gif"
-
-        # Obtém metadados do vídeo
-        metadata = VideoToGif.get_video_metadata(input_video)
-
-        # Calcula intervalo de tempo
-        start_time, duration = VideoToGif.calculate_time_range(
-            metadata.duration, time_range, sample_duration
-        )
-        if (start_time==0 and duration==0):
-            duration = 3.0
-
-        # Constrói filtros
-        filter_complex = VideoToGif.build_filter_complex(frame_skip, width, fps)
-
-        # Monta comando FFmpeg
-        ffmpeg_command: List[str] = [
-            "./ffmpeg",
-            "-ss", VideoToGif.format_timecode(start_time),
-            "-t", VideoToGif.format_timecode(duration),
-            "-hwaccel", "auto",
-            "-threads", "0",
-            "-i", input_video,
-            "-vf", filter_complex,
-            "-y",
-            output_gif
-        ]
-
-        try:
-            # Executa FFmpeg
-            result = subprocess.run(
-                ffmpeg_command,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=True
-            )
-
-            if os.path.exists(output_gif):
-                print(f"GIF preview gerado com sucesso: {output_gif}")
-                print(f"Configurações utilizadas:")
-                print(f"- Intervalo: {start_time:.2f}s até {start_time + duration:.2f}s")
-                print(f"- Duração: {duration:.2f} segundos")
-                print(f"- Largura: {width} pixels")
-                print(f"- FPS: {fps}")
-                print(f"- Frame skip: {frame_skip} (1 a cada {frame_skip} frames)")
-
-                # Mostra comando executado para debug
-                print("\nComando FFmpeg executado:")
-                print(" ".join(ffmpeg_command))
-                return True
-            return False
-
-        except subprocess.CalledProcessError as e:
-            print(f"Erro ao executar FFmpeg:")
-            print(f"Código de erro: {e.returncode}")
-            print(f"Saída de erro:")
-            print(e.stderr)
-            print("\nComando que gerou o erro:")
-            print(" ".join(ffmpeg_command))
-            return False
-        except Exception as e:
-            print(f"Erro inesperado: {str(e)}")
-            return False
\ No newline at end of file
+    return generate_thumbnail_gif(video_path, probe=probe)
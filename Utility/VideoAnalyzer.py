@@ -0,0 +1,227 @@
+import json
+import os
+import subprocess
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from Utility.VideoToGif import VideoToGif
+
+COLOR_FRAME_SIZE = (100, 100)
+
+
+@dataclass
+class VideoProbe:
+    """Metadata of a video gathered by a single ffprobe call."""
+    duration: float
+    width: int
+    height: int
+    fps: float
+    codec: str = ""
+    bitrate: int = 0
+    pix_fmt: str = ""
+    tags: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def preprocessed(self) -> bool:
+        # O ffmpeg grava a tag com aspas: preprocessed="yes"
+        return self.tags.get("preprocessed", "").strip().strip('"')=="yes"
+
+
+@dataclass
+class AnalysisResult:
+    """Outputs of analyze_video."""
+    probe: VideoProbe
+    poster_path: Optional[str]
+    preview_path: Optional[str]
+    color_frame: Optional[bytes]
+    color_size: Tuple[int, int]
+
+
+def parse_frame_rate(rate: str) -> float:
+    """Convert an ffprobe rational (ex: 30000/1001) to float"""
+    try:
+        num, den = rate.split('/')
+        return int(num) / int(den) if int(den) else 0.0
+    except (ValueError, AttributeError):
+        try:
+            return float(rate)
+        except (TypeError, ValueError):
+            return 0.0
+
+
+def probe_video(video_path: str) -> Optional[VideoProbe]:
+    """Read stream metadata and container tags with one ffprobe JSON call"""
+    cmd = [
+        './ffprobe',
+        '-v', 'error',
+        '-select_streams', 'v:0',
+        '-show_entries',
+        'stream=codec_name,width,height,r_frame_rate,avg_frame_rate,duration,bit_rate,pix_fmt'
+        ':format=duration,bit_rate:format_tags',
+        '-of', 'json',
+        video_path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        data = json.loads(result.stdout)
+    except (subprocess.CalledProcessError, json.JSONDecodeError, OSError) as e:
+        print(f"Erro ao obter metadados de {video_path}: {e}")
+        return None
+
+    streams = data.get("streams") or [{}]
+    stream = streams[0]
+    container = data.get("format", {})
+
+    fps = parse_frame_rate(stream.get("avg_frame_rate", "0/0")) or parse_frame_rate(stream.get("r_frame_rate", "0/0"))
+    duration = stream.get("duration") or container.get("duration") or 0
+    bitrate = stream.get("bit_rate") or container.get("bit_rate") or 0
+    tags = {key.lower(): value for key, value in container.get("tags", {}).items()}
+
+    return VideoProbe(
+        duration=float(duration),
+        width=int(stream.get("width", 0)),
+        height=int(stream.get("height", 0)),
+        fps=fps,
+        codec=stream.get("codec_name", ""),
+        bitrate=int(bitrate),
+        pix_fmt=stream.get("pix_fmt", ""),
+        tags=tags
+    )
+
+
+def capture_raw_frame(video_path: str, size: Tuple[int, int] = COLOR_FRAME_SIZE,
+                      timestamp: str = "00:00:01") -> Optional[bytes]:
+    """Decode one frame straight into memory as rgb24 through a rawvideo pipe"""
+    width, height = size
+    frame_size = width * height * 3
+    for seek in (timestamp, "00:00:00"):
+        command = [
+            './ffmpeg',
+            '-v', 'error',
+            '-ss', seek,
+            '-i', video_path,
+            '-frames:v', '1',
+            '-vf', f'scale={width}:{height}',
+            '-f', 'rawvideo',
+            '-pix_fmt', 'rgb24',
+            'pipe:1'
+        ]
+        try:
+            result = subprocess.run(command, capture_output=True, check=True)
+        except (subprocess.CalledProcessError, OSError) as e:
+            print(f"Erro ao capturar frame de {video_path}: {e}")
+            return None
+        # Vídeos mais curtos que o timestamp não produzem frame; tenta o início
+        if len(result.stdout) >= frame_size:
+            return result.stdout[:frame_size]
+    return None
+
+def sample_start(duration: float, sample_duration: float) -> float:
+    """Start of the range analyze_video samples; its first frame is the color frame"""
+    start_time, _ = VideoToGif.calculate_time_range(duration, None, sample_duration)
+    return start_time
+
+
+def build_analysis_graph(preview_width: int, fps: int, frame_skip: int,
+                         color_size: Tuple[int, int], poster_filter: Optional[str] = None,
+                         with_poster: bool = True) -> str:
+    """Filter graph that splits one decode into poster, preview and color outputs"""
+    color_width, color_height = color_size
+    if with_poster:
+        poster_chain = f",{poster_filter}" if poster_filter else ""
+        head = (
+            "[0:v]split=3[poster_in][preview_in][color_in];"
+            f"[poster_in]trim=end_frame=1{poster_chain}[poster];"
+        )
+    else:
+        head = "[0:v]split=2[preview_in][color_in];"
+    return (
+        head +
+        f"[preview_in]select='not(mod(n,{frame_skip}))',"
+        f"scale={preview_width}:-1:flags=lanczos,"
+        f"fps={fps},"
+        "split[preview_s0][preview_s1];"
+        "[preview_s0]palettegen=stats_mode=single[preview_palette];"
+        "[preview_s1][preview_palette]paletteuse=new=true[preview];"
+        f"[color_in]trim=end_frame=1,scale={color_width}:{color_height},format=rgb24[color]"
+    )
+
+
+def analyze_video(
+        video_path: str,
+        poster_path: Optional[str],
+        preview_path: str,
+        preview_width: int,
+        fps: int = 10,
+        frame_skip: int = 5,
+        sample_duration: float = 3.0,
+        color_size: Tuple[int, int] = COLOR_FRAME_SIZE,
+        poster_filter: Optional[str] = None,
+        probe: Optional[VideoProbe] = None
+) -> Optional[AnalysisResult]:
+    """
+    Decode the sampled range of a video once and produce every derived output.
+
+    Args:
+        video_path (str): Input video
+        poster_path (str, optional): Where to write the still thumbnail (JPEG), None to skip it
+        preview_path (str): Where to write the animated preview (GIF)
+        preview_width (int): Width of the preview in pixels
+        fps (int): Preview frame rate
+        frame_skip (int): Keep one frame out of every `frame_skip`
+        sample_duration (float): Length of the sampled range in seconds
+        color_size (tuple): Size of the raw RGB frame used for color analysis
+        poster_filter (str, optional): Extra filter chain applied to the poster (ex: tile_filter)
+        probe (VideoProbe, optional): Metadata already known for the video
+
+    Returns:
+        AnalysisResult: Paths of the outputs and the raw RGB frame, or None on failure
+    """
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Vídeo não encontrado: {video_path}")
+
+    if probe is None:
+        probe = probe_video(video_path)
+        if probe is None:
+            return None
+
+    start_time, duration = VideoToGif.calculate_time_range(probe.duration, None, sample_duration)
+    if start_time==0 and duration==0:
+        duration = sample_duration
+
+    filter_complex = build_analysis_graph(preview_width, fps, frame_skip, color_size,
+                                          poster_filter, with_poster=poster_path is not None)
+    command: List[str] = [
+        './ffmpeg',
+        '-v', 'error',
+        '-y',
+        '-ss', VideoToGif.format_timecode(start_time),
+        '-t', VideoToGif.format_timecode(duration),
+        '-threads', '0',
+        '-i', video_path,
+        '-filter_complex', filter_complex
+    ]
+    if poster_path is not None:
+        command += ['-map', '[poster]', '-frames:v', '1', '-q:v', '2', '-f', 'image2', poster_path]
+    command += [
+        '-map', '[preview]', '-f', 'gif', preview_path,
+        '-map', '[color]', '-frames:v', '1', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'
+    ]
+
+    try:
+        result = subprocess.run(command, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"Erro ao analisar vídeo {video_path}:")
+        print(e.stderr.decode(errors="replace"))
+        return None
+
+    frame_size = color_size[0] * color_size[1] * 3
+    color_frame = result.stdout[:frame_size] if len(result.stdout) >= frame_size else None
+
+    return AnalysisResult(
+        probe=probe,
+        poster_path=poster_path if poster_path and os.path.exists(poster_path) else None,
+        preview_path=preview_path if os.path.exists(preview_path) else None,
+        color_frame=color_frame,
+        color_size=color_size
+    )
@@ -134,7 +134,8 @@ class VideoToGif:
             width: int = 480,
             fps: int = 12,
             frame_skip: int = 1,
-            output_gif: Optional[str] = None
+            output_gif: Optional[str] = None,
+            metadata: Optional[VideoMetadata] = None
     ) -> bool:
         """
         Cria um GIF preview de um vídeo usando FFmpeg com otimizações.
@@ -147,6 +148,7 @@ class VideoToGif:
             fps (int): Frames por segundo desejados
             frame_skip (int): Número de frames para pular
             output_gif (str, optional): Caminho do GIF de saída
+            metadata (VideoMetadata, optional): Metadados já conhecidos (ex: do índice do app), evita o FFprobe
 
         Returns:
             bool: True se a conversão foi bem sucedida
@@ -158,7 +160,8 @@ class VideoToGif:
             output_gif = str(Path(input_video).with_suffix('')) + "_preview.gif"
 
         # Obtém metadados do vídeo
-        metadata = VideoToGif.get_video_metadata(input_video)
+        if metadata is None:
+            metadata = VideoToGif.get_video_metadata(input_video)
 
         # Calcula intervalo de tempo
         start_time, duration = VideoToGif.calculate_time_range(
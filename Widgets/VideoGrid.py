@@ -0,0 +1,407 @@
+import os
+from typing import Dict, List, Optional
+
+from PyQt6.QtWidgets import QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+from PyQt6.QtGui import QColor, QIcon, QPainter, QPainterPath, QPixmap, QPixmapCache, QMovie
+from PyQt6.QtCore import (Qt, QAbstractListModel, QModelIndex, QRect, QRectF, QSize, QPoint, QTimer, QEvent,
+                          pyqtSignal)
+
+from Utility import Util
+
+TILE_WIDTH, TILE_HEIGHT = Util.TILE_SIZE
+NAME_HEIGHT = 45
+TILE_PADDING = 15
+PIXMAP_CACHE_KB = 64 * 1024  # Só as células visíveis mantêm pixmaps carregados
+
+PathRole = Qt.ItemDataRole.UserRole + 1
+ThumbnailRole = Qt.ItemDataRole.UserRole + 2
+PreviewRole = Qt.ItemDataRole.UserRole + 3
+PreprocessedRole = Qt.ItemDataRole.UserRole + 4
+PlayingRole = Qt.ItemDataRole.UserRole + 5
+ProcessingRole = Qt.ItemDataRole.UserRole + 6
+ProgressRole = Qt.ItemDataRole.UserRole + 7
+
+# Papel notificado quando cada atributo do VideoItem muda
+ITEM_ROLES = {
+    "thumbnail_path": ThumbnailRole,
+    "preview_path": PreviewRole,
+    "is_preprocessed": PreprocessedRole,
+    "is_playing": PlayingRole,
+    "is_processing": ProcessingRole,
+    "progress": ProgressRole
+}
+
+
+class VideoItem:
+    """State of one video in the grid model"""
+    __slots__ = ("video_path", "name", "thumbnail_path", "preview_path", "is_preprocessed", "is_playing",
+                 "is_processing", "progress")
+
+    def __init__(self, video_path, is_playing=False):
+        self.video_path = video_path
+        self.name = os.path.splitext(os.path.basename(video_path))[0]
+        self.thumbnail_path = None
+        self.preview_path = None
+        self.is_preprocessed = False
+        self.is_playing = is_playing
+        self.is_processing = False
+        self.progress = None  # Preprocess.EncodeProgress do job em execução
+
+
+class VideoListModel(QAbstractListModel):
+    """List model holding thumbnail, preview and preprocess state of every video"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items: List[VideoItem] = []
+        self.rows: Dict[str, int] = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        item = self.items[index.row()]
+        if role==Qt.ItemDataRole.DisplayRole:
+            return item.name
+        if role==PathRole:
+            return item.video_path
+        if role==ThumbnailRole:
+            return item.thumbnail_path
+        if role==PreviewRole:
+            return item.preview_path
+        if role==PreprocessedRole:
+            return item.is_preprocessed
+        if role==PlayingRole:
+            return item.is_playing
+        if role==ProcessingRole:
+            return item.is_processing
+        if role==ProgressRole:
+            return item.progress
+        if role==Qt.ItemDataRole.ToolTipRole and item.is_processing:
+            status = item.progress.describe() if item.progress else "Na fila"
+            return f"{status} (clique para cancelar)"
+        return None
+
+    def _reindex(self):
+        self.rows = {item.video_path: row for row, item in enumerate(self.items)}
+
+    def set_videos(self, video_paths, playing_path=None):
+        self.beginResetModel()
+        self.items = [VideoItem(path, is_playing=path==playing_path) for path in video_paths]
+        self._reindex()
+        self.endResetModel()
+
+    def add_videos(self, video_paths):
+        new_paths = [path for path in video_paths if path not in self.rows]
+        if not new_paths:
+            return
+        first = len(self.items)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_paths) - 1)
+        self.items.extend(VideoItem(path) for path in new_paths)
+        self._reindex()
+        self.endInsertRows()
+
+    def remove_videos(self, video_paths):
+        for row in sorted((self.rows[path] for path in video_paths if path in self.rows), reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.items[row]
+            self.endRemoveRows()
+        self._reindex()
+
+    def index_of(self, video_path) -> QModelIndex:
+        row = self.rows.get(video_path)
+        return self.index(row, 0) if row is not None else QModelIndex()
+
+    def item(self, video_path) -> Optional[VideoItem]:
+        row = self.rows.get(video_path)
+        return self.items[row] if row is not None else None
+
+    def _update(self, video_path, roles, **changes):
+        row = self.rows.get(video_path)
+        if row is None:
+            return
+        item = self.items[row]
+        for name, value in changes.items():
+            setattr(item, name, value)
+        index = self.index(row, 0)
+        self.dataChanged.emit(index, index, roles)
+
+    def apply_updates(self, updates):
+        """Apply many item changes at once and notify the view with a single dataChanged.
+
+        `updates` maps a video path to the attributes to change (ex: {"thumbnail_path": ...}).
+        """
+        changed_rows = []
+        roles = set()
+        for video_path, changes in updates.items():
+            row = self.rows.get(video_path)
+            if row is None:
+                continue
+            item = self.items[row]
+            for name, value in changes.items():
+                setattr(item, name, value)
+                roles.add(ITEM_ROLES[name])
+            changed_rows.append(row)
+
+        if changed_rows:
+            self.dataChanged.emit(self.index(min(changed_rows), 0), self.index(max(changed_rows), 0), list(roles))
+
+    def set_thumbnail(self, video_path, thumbnail_path):
+        self._update(video_path, [ThumbnailRole], thumbnail_path=thumbnail_path)
+
+    def set_preview(self, video_path, preview_path):
+        self._update(video_path, [PreviewRole], preview_path=preview_path)
+
+    def set_preprocessed(self, video_path, is_preprocessed):
+        self._update(video_path, [PreprocessedRole], is_preprocessed=is_preprocessed)
+
+    def set_processing(self, video_path, is_processing):
+        self._update(video_path, [ProcessingRole, ProgressRole], is_processing=is_processing, progress=None)
+
+    def set_progress(self, video_path, progress):
+        self._update(video_path, [ProgressRole], progress=progress)
+
+    def set_playing(self, video_path):
+        """Mark one video as playing (None stops all)"""
+        for item in self.items:
+            if item.is_playing and item.video_path!=video_path:
+                self._update(item.video_path, [PlayingRole], is_playing=False)
+        if video_path is not None:
+            self._update(video_path, [PlayingRole], is_playing=True)
+
+    def playing_path(self):
+        return next((item.video_path for item in self.items if item.is_playing), None)
+
+    def rename_video(self, old_path, new_path):
+        row = self.rows.pop(old_path, None)
+        if row is None:
+            return
+        item = self.items[row]
+        item.video_path = new_path
+        item.name = os.path.splitext(os.path.basename(new_path))[0]
+        self.rows[new_path] = row
+        index = self.index(row, 0)
+        self.dataChanged.emit(index, index, [PathRole, Qt.ItemDataRole.DisplayRole])
+
+
+class VideoTileDelegate(QStyledItemDelegate):
+    """Paints a video tile; pixmaps are loaded lazily for visible cells only"""
+    playback_toggled = pyqtSignal(str)
+    preprocess_requested = pyqtSignal(str)
+
+    def __init__(self, view):
+        super().__init__(view)
+        self.view = view
+        QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), PIXMAP_CACHE_KB))
+        self.play_icon = QIcon(Util.get_file_path("../play_icon.png"))
+        self.stop_icon = QIcon(Util.get_file_path("../stop_icon.png"))
+        self.success_icon = QIcon(Util.get_file_path("../success_icon.png"))
+        self.fail_icon = QIcon(Util.get_file_path("../fail_icon.png"))
+
+    def sizeHint(self, option, index):
+        return QSize(TILE_WIDTH + 2 * TILE_PADDING, TILE_HEIGHT + NAME_HEIGHT + 2 * TILE_PADDING)
+
+    @staticmethod
+    def tile_rect(rect):
+        return QRect(rect.x() + TILE_PADDING, rect.y() + TILE_PADDING, TILE_WIDTH, TILE_HEIGHT + NAME_HEIGHT)
+
+    @staticmethod
+    def preprocess_rect(tile):
+        return QRect(tile.right() - 36, tile.top() + 3, 33, 33)
+
+    @staticmethod
+    def play_rect(tile):
+        return QRect(tile.right() - 74, tile.top() + 3, 35, 35)
+
+    @staticmethod
+    def load_pixmap(path):
+        if not path:
+            return None
+        pixmap = QPixmapCache.find(path)
+        if pixmap is None or pixmap.isNull():
+            pixmap = QPixmap(path)
+            if pixmap.isNull():
+                return None
+            QPixmapCache.insert(path, pixmap)
+        return pixmap
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        tile = self.tile_rect(option.rect)
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        background = QPainterPath()
+        background.addRoundedRect(QRectF(tile), 10, 10)
+        painter.fillPath(background, QColor(Util.COLORS['selected'] if selected else Util.COLORS['bg_secondary']))
+
+        media_rect = QRect(tile.x(), tile.y(), TILE_WIDTH, TILE_HEIGHT)
+        movie = self.view.hover_movie if self.view.hover_row==index.row() else None
+        if movie is not None:
+            pixmap = movie.currentPixmap()
+        else:
+            pixmap = self.load_pixmap(index.data(ThumbnailRole))
+        if pixmap is not None and not pixmap.isNull():
+            if pixmap.width() > TILE_WIDTH or pixmap.height() > TILE_HEIGHT:
+                pixmap = pixmap.scaled(media_rect.size(), Qt.AspectRatioMode.KeepAspectRatio,
+                                       Qt.TransformationMode.SmoothTransformation)
+            x = media_rect.x() + (TILE_WIDTH - pixmap.width()) // 2
+            y = media_rect.y() + (TILE_HEIGHT - pixmap.height()) // 2
+            painter.drawPixmap(QPoint(x, y), pixmap)
+
+        name_rect = QRect(tile.x(), tile.y() + TILE_HEIGHT, TILE_WIDTH, NAME_HEIGHT)
+        painter.fillRect(name_rect, QColor(150, 150, 150, 50))
+        painter.setPen(QColor(Util.COLORS['text_secondary']))
+        painter.drawText(name_rect, Qt.AlignmentFlag.AlignCenter | Qt.TextFlag.TextWordWrap, index.data())
+
+        overlay = QColor(0, 0, 0, 150)
+        play_rect = self.play_rect(tile)
+        painter.fillRect(play_rect, overlay)
+        (self.stop_icon if index.data(PlayingRole) else self.play_icon).paint(painter, play_rect.adjusted(5, 5, -5, -5))
+
+        preprocess_rect = self.preprocess_rect(tile)
+        painter.fillRect(preprocess_rect, overlay)
+        if not index.data(ProcessingRole):
+            icon = self.success_icon if index.data(PreprocessedRole) else self.fail_icon
+            icon.paint(painter, preprocess_rect.adjusted(9, 9, -9, -9))
+        else:
+            progress = index.data(ProgressRole)
+            painter.setPen(QColor("white"))
+            painter.drawText(preprocess_rect, Qt.AlignmentFlag.AlignCenter,
+                             f"{progress.percent:.0f}%" if progress else "...")
+
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type()==QEvent.Type.MouseButtonRelease:
+            tile = self.tile_rect(option.rect)
+            pos = event.position().toPoint()
+            video_path = index.data(PathRole)
+            if self.play_rect(tile).contains(pos):
+                self.playback_toggled.emit(video_path)
+                return True
+            if self.preprocess_rect(tile).contains(pos):
+                # Durante o processamento o mesmo botão cancela o job
+                if not index.data(PreprocessedRole) or index.data(ProcessingRole):
+                    self.preprocess_requested.emit(video_path)
+                return True
+        return super().editorEvent(event, model, option, index)
+
+
+class VideoGridView(QListView):
+    """Virtualized grid of videos; only visible cells are painted or hold pixmaps"""
+    video_selected = pyqtSignal(str)
+    playback_toggled = pyqtSignal(str)
+    preprocess_requested = pyqtSignal(str)
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setMovement(QListView.Movement.Static)
+        self.setLayoutMode(QListView.LayoutMode.Batched)
+        self.setBatchSize(200)
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.setMouseTracking(True)
+        self.setStyleSheet(f"background-color: {Util.COLORS['bg_primary']}; border: none;")
+
+        self.hover_row = -1
+        self.hover_movie = None
+
+        self.delegate = VideoTileDelegate(self)
+        self.delegate.playback_toggled.connect(self.on_playback_toggled)
+        self.delegate.preprocess_requested.connect(self.preprocess_requested)
+        self.setItemDelegate(self.delegate)
+        self.clicked.connect(lambda index: self.video_selected.emit(index.data(PathRole)))
+
+        # Timer para delay do hover
+        self.hover_timer = QTimer(self)
+        self.hover_timer.setSingleShot(True)
+        self.hover_timer.timeout.connect(self.start_preview)
+        self.pending_hover_row = -1
+        model.modelAboutToBeReset.connect(self.stop_preview)
+        model.rowsAboutToBeRemoved.connect(self.stop_preview)
+
+    def on_playback_toggled(self, video_path):
+        self.select_video(video_path)
+        self.video_selected.emit(video_path)
+        self.playback_toggled.emit(video_path)
+
+    def select_video(self, video_path):
+        index = self.model().index_of(video_path)
+        if index.isValid():
+            self.setCurrentIndex(index)
+
+    def visible_paths(self) -> List[str]:
+        """Paths of the cells intersecting the viewport"""
+        model = self.model()
+        count = model.rowCount()
+        if count==0:
+            return []
+        viewport = self.viewport().rect()
+        # Células uniformes: a primeira linha visível sai da rolagem e da altura de uma linha do grid
+        origin = self.visualRect(model.index(0, 0))
+        columns = 1
+        while columns < count and self.visualRect(model.index(columns, 0)).top()==origin.top():
+            columns += 1
+        if columns < count:
+            line_height = self.visualRect(model.index(columns, 0)).top() - origin.top()
+        else:
+            line_height = origin.height()
+        first_line = max(0, (viewport.top() - origin.top()) // max(1, line_height))
+
+        paths = []
+        for row in range(first_line * columns, count):
+            rect = self.visualRect(model.index(row, 0))
+            # Rect inválido: o layout em lotes ainda não chegou nesta célula
+            if not rect.isValid() or rect.top() > viewport.bottom():
+                break
+            if rect.intersects(viewport):
+                paths.append(model.index(row, 0).data(PathRole))
+        return paths
+
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        index = self.indexAt(event.position().toPoint())
+        row = index.row() if index.isValid() else -1
+        if row!=self.pending_hover_row:
+            self.pending_hover_row = row
+            self.stop_preview()
+            if row >= 0:
+                self.hover_timer.start(500)
+
+    def leaveEvent(self, event):
+        self.hover_timer.stop()
+        self.pending_hover_row = -1
+        self.stop_preview()
+        super().leaveEvent(event)
+
+    def start_preview(self):
+        index = self.model().index(self.pending_hover_row, 0)
+        preview_path = index.data(PreviewRole) if index.isValid() else None
+        if not preview_path:
+            return
+        self.hover_row = index.row()
+        self.hover_movie = QMovie(preview_path)
+        self.hover_movie.frameChanged.connect(self.update_hover_cell)
+        self.hover_movie.start()
+
+    def update_hover_cell(self, _frame=None):
+        index = self.model().index(self.hover_row, 0)
+        if index.isValid():
+            self.viewport().update(self.visualRect(index))
+
+    def stop_preview(self, *args):
+        if self.hover_movie is not None:
+            self.hover_movie.stop()
+            self.hover_movie.deleteLater()
+            self.hover_movie = None
+            index = self.model().index(self.hover_row, 0)
+            self.hover_row = -1
+            if index.isValid():
+                self.viewport().update(self.visualRect(index))
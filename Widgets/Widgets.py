@@ -1,8 +1,9 @@
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QSlider, QPushButton,
-                            QFrame, QHBoxLayout, QSizePolicy, QDialog, QComboBox, QCheckBox, QScrollArea, QGridLayout, QFileDialog)
+                            QFrame, QHBoxLayout, QSizePolicy, QDialog, QComboBox, QCheckBox, QScrollArea, QGridLayout, QFileDialog, QSpinBox,
+                            QDoubleSpinBox)
 
 from PyQt6.QtGui import QPainter, QColor, QPen, QFont, QPixmap, QIcon, QImage, QMovie, QPalette
-from PyQt6.QtCore import Qt, QSize, QTimer, QEvent, QPropertyAnimation, QParallelAnimationGroup, QPoint, QEasingCurve, QRect
+from PyQt6.QtCore import Qt, QSize, QTimer, QEvent, QPropertyAnimation, QParallelAnimationGroup, QPoint, QEasingCurve, QRect, pyqtSignal
 
 import json
 from typing import List
@@ -10,36 +11,76 @@ import os
 import subprocess
 from PyQt6 import QtGui
 from Utility import Util
-from PIL import Image
-from Threads.Threads import CheckProcessedVideo, ProcessVideo, ImageLoader, GifLoader
-from collections import Counter
+from Utility import PlaybackAutoTune
+from Utility import Preprocess
+from Utility.PreviewCache import PreviewCache
+from Widgets.VideoGrid import VideoListModel, VideoGridView
+from Threads.LibraryWatcher import LibraryWatcher
+from Threads.Threads import (TranscodeQueue, ThumbnailScheduler, MetadataRevalidator, PaletteWorker, AutoTuneWorker,
+                             default_thumbnail_workers, PRIORITY_CURRENT, PRIORITY_VISIBLE, PRIORITY_OFFSCREEN)
 import sys
-from Core.LiveWallPIDManager import LiveWallPIDManager
+import time
+from Core.LiveWallPIDManager import LiveWallPIDManager, ProcessReaper
 from Core.LiveWallPlayer import  LiveWallPlayer
+from Core.LiveWallMpvIpc import MpvIpcError
+from Core.LiveWallMetadataIndex import LiveWallMetadataIndex
+from Core.LiveWallOcclusion import OcclusionMonitor
+from Core.LiveWallTopology import LiveWallTopology
 from Core.LiveWallState import  LiveWallState
-import time
-import tempfile
 
-import numpy as np
-from sklearn.cluster import KMeans
-import colorsys
 
-TARGET_WIDTH = 320
-TARGET_HEIGHT = 180
+TARGET_WIDTH, TARGET_HEIGHT = Util.TILE_SIZE
+TILE_UPDATE_INTERVAL_MS = 50  # Janela em que miniaturas prontas são agrupadas num só repaint
+STANDBY_DELAY_MS = 400  # Seleção estável por esse tempo antes de pré-carregar o vídeo
+STANDBY_REPLACE_DELAY_MS = 2500  # Para trocar um standby já carregado a nova seleção precisa durar mais
 THUMBNAIL_PADDING = 15
 
 SCRIPT_PATH = Util.get_file_path("livewallpaperv4.sh")
 GRID_COLUMNS = 3
 
+DEFAULT_SETTINGS = {
+    "play_all_monitors": True,
+    "playback_mode": "per_monitor",
+    "selected_monitor": "",
+    "vo": "gpu",
+    "gpu_context": "auto",
+    "gpu_api": "auto",
+    "hwdec": "auto",
+    "thumbnail_workers": default_thumbnail_workers(),
+    "preprocess_jobs": 1,
+    "cache_max_mb": 512,
+    "virtual_grid_threshold": 300,
+    "recursive_scan": False,
+    "pause_when_covered": True,
+    "warm_standby": True,
+    "loop_cache_mb": 256,
+    "scale_to_monitor": False,
+    "max_fps": 0,
+    "monitor_caps": {},
+    "seamless_loop": False,
+    "loop_crossfade": 0.0
+}
+
+# Limites que mantêm o wallpaper em poucos por cento de um núcleo
+EFFICIENCY_PROFILE = {"scale_to_monitor": True, "max_fps": 30}
+
+
+def preprocess_options(settings):
+    """Encode options of the transcode queue taken from the settings"""
+    return {"max_fps": settings["max_fps"], "seamless_loop": settings["seamless_loop"],
+            "crossfade": settings["loop_crossfade"]}
+
 
 class SettingsDialogWidget(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, player=None):
         super().__init__(parent)
 
         self.setWindowTitle("Settings")
         self.resize(500, 400)
 
         self.settings = self.load_settings()
+        self.player = player
+        self.auto_tune_worker = None
 
         self.layout = QVBoxLayout(self)
 
@@ -64,6 +105,25 @@ class SettingsDialogWidget(QDialog):
 
         self.layout.addLayout(all_monitors_layout)
 
+        # Playback mode (only with all monitors)
+        self.playback_mode_frame = QWidget(self)
+        playback_mode_layout = QHBoxLayout(self.playback_mode_frame)
+
+        playback_mode_label = QLabel("Multi-monitor mode")
+        playback_mode_label.setFont(QtGui.QFont("Inter", 14))
+        playback_mode_layout.addWidget(playback_mode_label)
+
+        self.playback_mode_dropdown = QComboBox()
+        self.playback_mode_dropdown.addItem("One player per monitor", "per_monitor")
+        self.playback_mode_dropdown.addItem("Single player spanning all monitors", "span")
+        self.playback_mode_dropdown.setCurrentIndex(
+            max(0, self.playback_mode_dropdown.findData(self.settings.get("playback_mode", "per_monitor"))))
+        playback_mode_layout.addWidget(self.playback_mode_dropdown)
+
+        self.playback_mode_frame.setVisible(self.all_monitors_var)
+        playback_mode_layout.addStretch(1)
+        self.layout.addWidget(self.playback_mode_frame)
+
         # Monitor selection
         self.monitor_frame = QWidget(self)
         monitor_layout = QHBoxLayout(self.monitor_frame)
@@ -134,6 +194,148 @@ class SettingsDialogWidget(QDialog):
 
         self.layout.addLayout(hwdec_layout)
 
+        # Auto-tune: mede as combinações acima com o wallpaper atual
+        auto_tune_layout = QHBoxLayout()
+        self.auto_tune_button = QPushButton("Auto-tune")
+        self.auto_tune_button.clicked.connect(self.start_auto_tune)
+        if not (self.player and self.player.video_path):
+            self.auto_tune_button.setEnabled(False)
+            self.auto_tune_button.setToolTip("Select a wallpaper first")
+        auto_tune_layout.addWidget(self.auto_tune_button)
+
+        self.auto_tune_status = QLabel("")
+        auto_tune_layout.addWidget(self.auto_tune_status, 1)
+
+        self.layout.addLayout(auto_tune_layout)
+
+        # Playback caps: default row + one row per monitor
+        caps_label = QLabel("Playback caps (max FPS 0 = source rate)")
+        caps_label.setFont(QtGui.QFont("Inter", 14))
+        self.layout.addWidget(caps_label)
+
+        caps_layout = QGridLayout()
+        self.caps_rows = {}
+        monitor_caps = self.settings.get("monitor_caps", {})
+        default_caps = {"scale_to_monitor": self.settings.get("scale_to_monitor", False),
+                        "max_fps": self.settings.get("max_fps", 0)}
+        for row, name in enumerate([None] + self.get_available_monitors()):
+            caps = dict(default_caps, **monitor_caps.get(name, {})) if name else default_caps
+            caps_layout.addWidget(QLabel(name or "Default"), row, 0)
+
+            scale_checkbox = QCheckBox("Scale to monitor")
+            scale_checkbox.setChecked(caps["scale_to_monitor"])
+            caps_layout.addWidget(scale_checkbox, row, 1)
+
+            fps_spinbox = QSpinBox()
+            fps_spinbox.setRange(0, 240)
+            fps_spinbox.setValue(int(caps["max_fps"]))
+            caps_layout.addWidget(fps_spinbox, row, 2)
+
+            self.caps_rows[name] = (scale_checkbox, fps_spinbox)
+        self.layout.addLayout(caps_layout)
+
+        efficiency_button = QPushButton("Efficiency profile")
+        efficiency_button.clicked.connect(self.apply_efficiency_profile)
+        self.layout.addWidget(efficiency_button)
+
+        # Thumbnail workers
+        workers_layout = QHBoxLayout()
+        workers_label = QLabel("Thumbnail workers")
+        workers_label.setFont(QtGui.QFont("Inter", 14))
+        workers_layout.addWidget(workers_label)
+
+        self.workers_spinbox = QSpinBox()
+        self.workers_spinbox.setRange(1, max(1, os.cpu_count() or 1))
+        self.workers_spinbox.setValue(self.settings.get("thumbnail_workers", default_thumbnail_workers()))
+        workers_layout.addWidget(self.workers_spinbox)
+
+        self.layout.addLayout(workers_layout)
+
+        # Parallel preprocessing jobs
+        preprocess_jobs_layout = QHBoxLayout()
+        preprocess_jobs_label = QLabel("Parallel preprocessing jobs")
+        preprocess_jobs_label.setFont(QtGui.QFont("Inter", 14))
+        preprocess_jobs_layout.addWidget(preprocess_jobs_label)
+
+        self.preprocess_jobs_spinbox = QSpinBox()
+        self.preprocess_jobs_spinbox.setRange(1, max(1, os.cpu_count() or 1))
+        self.preprocess_jobs_spinbox.setValue(int(self.settings.get("preprocess_jobs", 1)))
+        preprocess_jobs_layout.addWidget(self.preprocess_jobs_spinbox)
+
+        self.layout.addLayout(preprocess_jobs_layout)
+
+        # Seamless loop preprocessing
+        seamless_loop_layout = QHBoxLayout()
+        seamless_loop_label = QLabel("Preprocess for seamless loop")
+        seamless_loop_label.setFont(QtGui.QFont("Inter", 14))
+        seamless_loop_layout.addWidget(seamless_loop_label)
+
+        self.seamless_loop_checkbox = QCheckBox()
+        self.seamless_loop_checkbox.setChecked(self.settings.get("seamless_loop", False))
+        seamless_loop_layout.addWidget(self.seamless_loop_checkbox)
+
+        self.crossfade_spinbox = QDoubleSpinBox()
+        self.crossfade_spinbox.setRange(0.0, Preprocess.MAX_CROSSFADE)
+        self.crossfade_spinbox.setSingleStep(0.25)
+        self.crossfade_spinbox.setSuffix(" s crossfade")
+        self.crossfade_spinbox.setValue(float(self.settings.get("loop_crossfade", 0.0)))
+        self.crossfade_spinbox.setEnabled(self.seamless_loop_checkbox.isChecked())
+        self.seamless_loop_checkbox.toggled.connect(self.crossfade_spinbox.setEnabled)
+        seamless_loop_layout.addWidget(self.crossfade_spinbox)
+
+        self.layout.addLayout(seamless_loop_layout)
+
+        # Recursive scan
+        recursive_layout = QHBoxLayout()
+        recursive_label = QLabel("Scan subfolders")
+        recursive_label.setFont(QtGui.QFont("Inter", 14))
+        recursive_layout.addWidget(recursive_label)
+
+        self.recursive_checkbox = QCheckBox()
+        self.recursive_checkbox.setChecked(self.settings.get("recursive_scan", False))
+        recursive_layout.addWidget(self.recursive_checkbox)
+
+        self.layout.addLayout(recursive_layout)
+
+        # Pause when covered
+        pause_covered_layout = QHBoxLayout()
+        pause_covered_label = QLabel("Pause when covered")
+        pause_covered_label.setFont(QtGui.QFont("Inter", 14))
+        pause_covered_layout.addWidget(pause_covered_label)
+
+        self.pause_covered_checkbox = QCheckBox()
+        self.pause_covered_checkbox.setChecked(self.settings.get("pause_when_covered", True))
+        self.pause_covered_checkbox.setEnabled(OcclusionMonitor.available())
+        pause_covered_layout.addWidget(self.pause_covered_checkbox)
+
+        self.layout.addLayout(pause_covered_layout)
+
+        # Warm standby
+        standby_layout = QHBoxLayout()
+        standby_label = QLabel("Preload selected wallpaper")
+        standby_label.setFont(QtGui.QFont("Inter", 14))
+        standby_layout.addWidget(standby_label)
+
+        self.standby_checkbox = QCheckBox()
+        self.standby_checkbox.setChecked(self.settings.get("warm_standby", True))
+        standby_layout.addWidget(self.standby_checkbox)
+
+        self.layout.addLayout(standby_layout)
+
+        # RAM loop cache
+        loop_cache_layout = QHBoxLayout()
+        loop_cache_label = QLabel("RAM loop cache (MB, 0 = off)")
+        loop_cache_label.setFont(QtGui.QFont("Inter", 14))
+        loop_cache_layout.addWidget(loop_cache_label)
+
+        self.loop_cache_spinbox = QSpinBox()
+        self.loop_cache_spinbox.setRange(0, 16384)
+        self.loop_cache_spinbox.setSingleStep(64)
+        self.loop_cache_spinbox.setValue(int(self.settings.get("loop_cache_mb", 256)))
+        loop_cache_layout.addWidget(self.loop_cache_spinbox)
+
+        self.layout.addLayout(loop_cache_layout)
+
         # Botões de ação
         button_layout = QHBoxLayout()
         save_button = QPushButton("Save")
@@ -148,8 +350,68 @@ class SettingsDialogWidget(QDialog):
 
         self.layout.addLayout(button_layout)
 
+    def start_auto_tune(self):
+        self.auto_tune_button.setEnabled(False)
+        # O wallpaper em reprodução competiria pela CPU/GPU com as medições; a oclusão não o retoma até o fim
+        self.player.set_suspended(True)
+        self.auto_tune_worker = AutoTuneWorker(self.player.video_path, self.settings)
+        self.auto_tune_worker.progress.connect(self.auto_tune_status.setText)
+        self.auto_tune_worker.tuned.connect(self.on_auto_tuned)
+        self.auto_tune_worker.start()
+
+    def on_auto_tuned(self, best):
+        self.auto_tune_worker = None
+        self.auto_tune_button.setEnabled(True)
+        # Volta a pausar só os monitores cobertos
+        self.player.set_suspended(False)
+        if best is None:
+            self.auto_tune_status.setText("No configuration could play the video")
+            return
+
+        for dropdown, key in ((self.video_output_dropdown, "vo"), (self.gpu_context_dropdown, "gpu_context"),
+                              (self.gpu_api_dropdown, "gpu_api"), (self.hwdec_dropdown, "hwdec")):
+            if dropdown.findText(best[key]) < 0:
+                dropdown.addItem(best[key])
+            dropdown.setCurrentText(best[key])
+
+        # Gravado só por save_settings, junto com o resto do diálogo
+        self.settings = PlaybackAutoTune.apply_result(self.settings, best)
+        self.auto_tune_status.setText(
+            f"{best['vo']} / {best['gpu_api']} / hwdec {best['hwdec']}: CPU {best['cpu_percent']:.1f}%")
+
+    def done(self, result):
+        worker = self.auto_tune_worker
+        if worker is not None:
+            self.auto_tune_worker = None
+            # O resultado chegaria depois do diálogo fechado
+            worker.tuned.disconnect(self.on_auto_tuned)
+            worker.progress.disconnect(self.auto_tune_status.setText)
+            worker.requestInterruption()
+            # Sem wait(): a medição em andamento termina em segundo plano, mantida viva pela janela principal
+            worker.setParent(self.parent())
+            worker.finished.connect(worker.deleteLater)
+            self.player.set_suspended(False)
+        super().done(result)
+
+    def apply_efficiency_profile(self):
+        for scale_checkbox, fps_spinbox in self.caps_rows.values():
+            scale_checkbox.setChecked(EFFICIENCY_PROFILE["scale_to_monitor"])
+            fps_spinbox.setValue(EFFICIENCY_PROFILE["max_fps"])
+
+    def collect_caps(self):
+        """Default caps and the monitors whose caps differ from them"""
+        default_scale, default_fps = self.caps_rows[None]
+        defaults = {"scale_to_monitor": default_scale.isChecked(), "max_fps": default_fps.value()}
+        monitor_caps = {}
+        for name, (scale_checkbox, fps_spinbox) in self.caps_rows.items():
+            caps = {"scale_to_monitor": scale_checkbox.isChecked(), "max_fps": fps_spinbox.value()}
+            if name and caps!=defaults:
+                monitor_caps[name] = caps
+        return defaults, monitor_caps
+
     def toggle_monitor_selection(self):
         self.monitor_frame.setVisible(not self.all_monitors_checkbox.isChecked())
+        self.playback_mode_frame.setVisible(self.all_monitors_checkbox.isChecked())
 
     def center_window(self):
         screen = QApplication.primaryScreen()
@@ -159,16 +421,9 @@ class SettingsDialogWidget(QDialog):
         self.move(x, y)
 
     def get_available_monitors(self) -> List[str]:
-        try:
-            result = subprocess.run(['xrandr', '--listmonitors'], capture_output=True, text=True)
-            monitors = []
-            for line in result.stdout.split('\n')[1:]:
-                if line.strip():
-                    monitors.append(line.split()[-1])
-            return monitors if monitors else ["Monitor 1"]
-        except Exception as e:
-            print(f"Erro ao listar monitores: {e}")
-            return ["Monitor 1"]
+        # Layout em cache, atualizado pelos eventos RandR
+        monitors = LiveWallTopology.shared().monitor_names()
+        return monitors if monitors else ["Monitor 1"]
 
     def get_mpv_option_available_list(self, option: str) -> List[str]:
         try:
@@ -181,32 +436,18 @@ class SettingsDialogWidget(QDialog):
     @staticmethod
     def load_settings() -> dict:
         config_path = os.path.expanduser("~/.config/MyLiveWall/settings.json")
+        settings = dict(DEFAULT_SETTINGS)
         try:
             if os.path.exists(config_path):
                 with open(config_path, 'r') as f:
-                    return json.load(f)
+                    settings.update(json.load(f))
         except Exception as e:
             print(f"Erro ao carregar configurações: {e}")
-        return {
-            "play_all_monitors": True,
-            "selected_monitor": "",
-            "vo": "gpu",
-            "gpu_context": "auto",
-            "gpu_api": "auto",
-            "hwdec": "auto"
-        }
-
-    def save_settings(self):
-        settings = {
-            "play_all_monitors": self.all_monitors_checkbox.isChecked(),
-            "selected_monitor": self.monitor_dropdown.currentText(),
-            "vo": self.video_output_dropdown.currentText(),
-            "gpu_context": self.gpu_context_dropdown.currentText(),
-            "gpu_api": self.gpu_api_dropdown.currentText(),
-            "hwdec": self.hwdec_dropdown.currentText()
-
-        }
+        return settings
 
+    @staticmethod
+    def write_settings(settings: dict):
+        """Persist settings to settings.json; returns False on failure"""
         config_dir = os.path.expanduser("~/.config/MyLiveWall")
         config_path = os.path.join(config_dir, "settings.json")
 
@@ -214,13 +455,43 @@ class SettingsDialogWidget(QDialog):
             os.makedirs(config_dir, exist_ok=True)
             with open(config_path, 'w') as f:
                 json.dump(settings, f, indent=4)
-            self.accept()
+            return True
         except Exception as e:
             print(f"Erro ao salvar configurações: {e}")
+            return False
+
+    def save_settings(self):
+        default_caps, monitor_caps = self.collect_caps()
+
+        # Preserva chaves que não são editadas por este diálogo
+        settings = dict(self.settings)
+        settings.update({
+            "play_all_monitors": self.all_monitors_checkbox.isChecked(),
+            "playback_mode": self.playback_mode_dropdown.currentData(),
+            "selected_monitor": self.monitor_dropdown.currentText(),
+            "vo": self.video_output_dropdown.currentText(),
+            "gpu_context": self.gpu_context_dropdown.currentText(),
+            "gpu_api": self.gpu_api_dropdown.currentText(),
+            "hwdec": self.hwdec_dropdown.currentText(),
+            "thumbnail_workers": self.workers_spinbox.value(),
+            "preprocess_jobs": self.preprocess_jobs_spinbox.value(),
+            "seamless_loop": self.seamless_loop_checkbox.isChecked(),
+            "loop_crossfade": self.crossfade_spinbox.value(),
+            "recursive_scan": self.recursive_checkbox.isChecked(),
+            "pause_when_covered": self.pause_covered_checkbox.isChecked(),
+            "warm_standby": self.standby_checkbox.isChecked(),
+            "loop_cache_mb": self.loop_cache_spinbox.value(),
+            "scale_to_monitor": default_caps["scale_to_monitor"],
+            "max_fps": default_caps["max_fps"],
+            "monitor_caps": monitor_caps
+        })
+
+        if self.write_settings(settings):
+            self.accept()
 
 
 class VideoThumbnailWidget(QWidget):
-    def __init__(self, parent, video_path, thumbnail_path, preview_path, on_select, on_playback_toggle, is_playing=False, is_preprocessed=False):
+    def __init__(self, parent, video_path, thumbnail_path, preview_path, on_select, on_playback_toggle, is_playing=False, is_preprocessed=False, on_path_changed=None, on_preprocess=None):
         super().__init__(parent)
 
         self.setAttribute(Qt.WidgetAttribute.WA_StyledBackground, True)
@@ -228,21 +499,20 @@ class VideoThumbnailWidget(QWidget):
         self.video_path = video_path
         self.on_select = on_select
         self.on_playback_toggle = on_playback_toggle
+        self.on_path_changed = on_path_changed
+        self.on_preprocess = on_preprocess
         self.selected = False
         self.preview_playing = False
         self.is_preprocessed = is_preprocessed
+        self.is_processing = False
         self.is_playing = is_playing
         self.thumbnail_pixmap = None
         self.movie_preview = None
         self.thumbnail_label = None
         self.preview_widget = None
 
-        self.videoCheckThread = CheckProcessedVideo(video_path=video_path)
-        self.videoCheckThread.video_checked.connect(self.on_video_checked)
-        self.videoCheckThread.start()
-
-        self.videoProcessThread = ProcessVideo(video_path=video_path)
-        self.videoProcessThread.video_processed.connect(self.on_video_processed)
+        # O estado de pré-processamento chega pelo job de análise (metadata_ready);
+        # os encodes rodam na TranscodeQueue da janela principal
         # Load play/stop icons
         play_icon_path = Util.get_file_path("../play_icon.png")
         stop_icon_path = Util.get_file_path("../stop_icon.png")
@@ -383,21 +653,13 @@ class VideoThumbnailWidget(QWidget):
     def update_thumbnail(self, thumbnail_path, preview_path):
 
         if (thumbnail_path!=None):
-            image = Image.open(thumbnail_path)
-            resized_image = self.resize_with_aspect_ratio(image, TARGET_WIDTH, TARGET_HEIGHT)
-
-            # Create black background
-            background = Image.new('RGB', (TARGET_WIDTH, TARGET_HEIGHT), Util.COLORS['bg_primary'])
-
-            # Center image
-            x = (TARGET_WIDTH - resized_image.width) // 2
-            y = (TARGET_HEIGHT - resized_image.height) // 2
-            background.paste(resized_image, (x, y))
-
-            # Convert to QPixmap
-            qt_image = QImage(background.tobytes(), TARGET_WIDTH, TARGET_HEIGHT, QImage.Format.Format_RGB888)
+            # As miniaturas já chegam no tamanho do tile (geradas fora da thread da GUI)
+            pixmap = QPixmap(thumbnail_path)
+            if pixmap.width() > TARGET_WIDTH or pixmap.height() > TARGET_HEIGHT:
+                pixmap = pixmap.scaled(QSize(TARGET_WIDTH, TARGET_HEIGHT), Qt.AspectRatioMode.KeepAspectRatio,
+                                       Qt.TransformationMode.SmoothTransformation)
 
-            self.thumbnail_pixmap = QPixmap.fromImage(qt_image)
+            self.thumbnail_pixmap = pixmap
             if (self.thumbnail_label!=None):
                 self.thumbnail_label.setPixmap(self.thumbnail_pixmap)
 
@@ -416,30 +678,36 @@ class VideoThumbnailWidget(QWidget):
 
 
     def preprocess_video(self):
-        if not self.is_preprocessed:
-            try:
-                if (self.is_playing):
-                    self.toggle_playback()
-
-                self.setEnabled(False)
-                process_video_thread = ProcessVideo.ProcessVideo(self.video_path)
-                self.videoProcessThread.start()
-            except subprocess.CalledProcessError as e:
-                print(f"Error preprocessing video: {e}")
-                self.setEnabled(True)
+        # Durante o processamento o mesmo botão cancela o job
+        if (not self.is_preprocessed or self.is_processing) and self.on_preprocess:
+            self.on_preprocess(self)
+
+    def set_processing(self, is_processing):
+        self.is_processing = is_processing
+        if is_processing:
+            self.preprocess_button.setIcon(QIcon())
+            self.preprocess_button.setText("...")
+            self.preprocess_button.setToolTip("Na fila (clique para cancelar)")
+        else:
+            self.preprocess_button.setText("")
+            self.preprocess_button.setToolTip("")
+            self.preprocess_button.setIcon(self.success_icon if self.is_preprocessed else self.fail_icon)
 
-    def on_video_processed(self, is_processed, output_path):
+    def set_progress(self, progress):
+        if self.is_processing and progress is not None:
+            self.preprocess_button.setText(f"{progress.percent:.0f}%")
+            self.preprocess_button.setToolTip(f"{progress.describe()} (clique para cancelar)")
 
+    def on_video_processed(self, is_processed, new_path):
         self.is_preprocessed = is_processed
-        self.preprocess_button.setIcon(self.success_icon if is_processed else self.fail_icon)
+        self.set_processing(False)
         self.preprocess_button.setEnabled(not is_processed)
-        self.setEnabled(True)
 
-        if (is_processed):
-            os.remove(self.video_path)
-            renamed_path = os.path.splitext(self.video_path)[0] + ".mp4"
-            os.rename(output_path, renamed_path)
-            self.video_path = renamed_path
+        if is_processed and new_path!=self.video_path:
+            old_path = self.video_path
+            self.video_path = new_path
+            if self.on_path_changed:
+                self.on_path_changed(self, old_path, new_path)
 
 
     def set_playing(self, is_playing):
@@ -505,26 +773,6 @@ class VideoThumbnailWidget(QWidget):
         self.selected = selected
         self.setStyleSheet(f"background-color: {Util.COLORS['selected'] if selected else Util.COLORS['bg_secondary']}; border-radius: 10px;")
 
-    def resize_with_aspect_ratio(self, image, target_width, target_height):
-        """Redimensiona a imagem mantendo o aspect ratio"""
-        original_width, original_height = image.size
-        aspect_ratio = original_width / original_height
-
-        if original_width > original_height:
-            new_width = target_width
-            new_height = int(target_width / aspect_ratio)
-            if new_height > target_height:
-                new_height = target_height
-                new_width = int(target_height * aspect_ratio)
-        else:
-            new_height = target_height
-            new_width = int(target_height * aspect_ratio)
-            if new_width > target_width:
-                new_width = target_width
-                new_height = int(target_width / aspect_ratio)
-
-        return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
 
 class BackgroundWidget(QWidget):
     def __init__(self, parent=None):
@@ -547,6 +795,8 @@ class BackgroundWidget(QWidget):
 
 
 class MyLiveWallWidget(QMainWindow):
+    topology_changed = pyqtSignal(object, object, object)  # Layout antigo, novo e TopologyDiff
+
     def __init__(self):
         super().__init__()
 
@@ -561,10 +811,45 @@ class MyLiveWallWidget(QMainWindow):
         # Variáveis
         self.video_dir = ""
         self.selected_thumbnail = None
-        self.video_process = None
+        self.playing_thumbnail = None
+        self.selected_video_path = None
+        self.tiles_by_path = {}  # Índice caminho -> VideoThumbnailWidget do grid de widgets
+        self.pending_tile_updates = {}  # Atualizações de miniatura aguardando o próximo repaint
+        self.virtual_grid = False
+        self.visible_paths = set()
+        self.palette_workers = {}
+        self.accent_video_path = None
+        self.player = None  # Instâncias mpv reaproveitadas entre trocas de wallpaper
+        self.topology = LiveWallTopology.shared()
+        self.occlusion_monitor = OcclusionMonitor(self.on_coverage_changed, self.topology.monitors)
         self.process_manager = LiveWallPIDManager()
         self.wallpaper_state = LiveWallState()
-        self.thumbnail_loaders = []
+
+        # Reinicia só as instâncias dos monitores conectados, removidos ou movidos
+        self.topology_changed.connect(self.on_topology_changed)
+        self.topology.add_listener(self.topology_changed.emit)
+        self.topology.start()
+
+        # Pool compartilhado para miniaturas e previews
+        settings = SettingsDialogWidget.load_settings()
+        PreviewCache.shared().set_max_bytes(int(settings["cache_max_mb"]) * 1024 * 1024)
+        self.thumbnail_scheduler = ThumbnailScheduler(settings.get("thumbnail_workers"))
+        self.thumbnail_scheduler.thumbnail_ready.connect(self.on_thumbnail_loadedImg)
+        self.thumbnail_scheduler.preview_ready.connect(self.on_thumbnail_loadedGif)
+        self.thumbnail_scheduler.metadata_ready.connect(self.on_metadata_loaded)
+        self.thumbnail_scheduler.idle.connect(self.on_thumbnails_idle)
+        self.metadata_revalidator = None
+
+        # Fila única de pré-processamento, com limite de encodes simultâneos
+        self.transcode_queue = TranscodeQueue(settings["preprocess_jobs"], preprocess_options(settings))
+        self.transcode_queue.job_progress.connect(self.on_transcode_progress)
+        self.transcode_queue.job_finished.connect(self.on_transcode_finished)
+        self.transcode_queue.job_cancelled.connect(self.on_transcode_cancelled)
+
+        # Varredura incremental da pasta, observada via inotify (sem as saídas parciais da fila)
+        self.library_watcher = LibraryWatcher(settings["recursive_scan"], self, self.transcode_queue.is_output)
+        self.library_watcher.videos_added.connect(self.add_video_tiles)
+        self.library_watcher.videos_removed.connect(self.remove_video_tiles)
 
         self.thumbnails_row_col = []
 
@@ -578,8 +863,31 @@ class MyLiveWallWidget(QMainWindow):
 
 
         self._create_widgets()
+
+        # Timer que agrupa as miniaturas prontas em um único repaint
+        self.tile_update_timer = QTimer()
+        self.tile_update_timer.setSingleShot(True)
+        self.tile_update_timer.timeout.connect(self.flush_tile_updates)
+
+        # Timer que pré-carrega o vídeo selecionado só depois que a seleção para de mudar
+        self.standby_video_path = None
+        self.warm_standby = settings["warm_standby"]
+        self.standby_timer = QTimer()
+        self.standby_timer.setSingleShot(True)
+        self.standby_timer.timeout.connect(self.prepare_standby)
+
+        # Timer para recalcular as prioridades das miniaturas após rolagem
+        self.visibility_timer = QTimer()
+        self.visibility_timer.setSingleShot(True)
+        self.visibility_timer.timeout.connect(self.update_thumbnail_priorities)
+        self.video_scroll_area.verticalScrollBar().valueChanged.connect(self.schedule_priority_update)
+
         self._load_initial_state()
 
+        # Jobs interrompidos ao fechar o app na sessão anterior
+        for video_path in self.transcode_queue.resume():
+            self.set_video_processing(video_path, True)
+
         # Criar timer para verificar redimensionamento
         self.resize_timer = QTimer()
         self.resize_timer.setSingleShot(True)
@@ -621,11 +929,12 @@ class MyLiveWallWidget(QMainWindow):
             col = info["col"]
             thumbnail = info["thumbnail"]
             self.main_container_layout.addWidget(thumbnail, row, col)
+        self.schedule_priority_update()
 
 
     def reorganize_grid(self):
         """Reorganiza os widgets no grid"""
-        if not self.video_dir:
+        if not self.video_dir or self.virtual_grid:
             return
 
         # Cancelar animações anteriores se existirem
@@ -690,72 +999,6 @@ class MyLiveWallWidget(QMainWindow):
         # Iniciar animações
         self.animation_group.start()
 
-    def capture_frame(video_path, output_image, timestamp="00:00:01"):
-        """
-        Captura um frame do vídeo usando ffmpeg.
-        """
-        command = [
-            "ffmpeg",
-            '-y',
-            "-ss", timestamp,  # Tempo do frame (1 segundo por padrão)
-            "-i", video_path,  # Caminho do vídeo
-            "-frames:v", "1",  # Número de frames a capturar
-            "-q:v", "2",  # Qualidade da imagem
-            output_image  # Caminho da saída
-        ]
-        subprocess.run(command, check=True)
-
-    def get_dominant_color(image_path):
-        """
-        Analisa a cor predominante de uma imagem.
-        """
-        image = Image.open(image_path)
-        image = image.resize((50, 50))  # Reduz o tamanho para acelerar o processamento
-        pixels = list(image.getdata())
-        most_common_color = Counter(pixels).most_common(1)[0][0]
-        return most_common_color
-
-    def get_dominant_colors(image_path, num_colors=3):
-        """
-        Identifica as cores que mais se destacam em uma imagem usando KMeans.
-        """
-        image = Image.open(image_path).convert("RGB")
-        image = image.resize((100, 100))  # Reduz o tamanho para acelerar o processamento
-        pixels = np.array(image).reshape(-1, 3)  # Transforma em uma lista de pixels (R, G, B)
-
-        # Aplica KMeans para encontrar os clusters de cores
-        kmeans = KMeans(n_clusters=num_colors, random_state=0)
-        kmeans.fit(pixels)
-
-        # Obtém as cores dos clusters e ordena pela frequência
-        colors = kmeans.cluster_centers_.astype(int)
-        labels, counts = np.unique(kmeans.labels_, return_counts=True)
-        sorted_colors = [colors[i] for i in labels[np.argsort(-counts)]]
-        return sorted_colors
-
-    def get_vibrant_colors(image_path, num_colors=5):
-        """
-        Identifica as cores mais vibrantes da imagem.
-        """
-        image = Image.open(image_path).convert("RGB")
-        image = image.resize((100, 100))  # Reduz o tamanho para acelerar o processamento
-        pixels = np.array(image).reshape(-1, 3)  # Lista de pixels (R, G, B)
-
-        vibrant_pixels = []
-        for r, g, b in pixels:
-            # Converte RGB para HSV
-            h, s, v = colorsys.rgb_to_hsv(r / 255.0, g / 255.0, b / 255.0)
-            s, v = s * 255, v * 255  # Normaliza saturação e valor para 0-255
-            # Considera apenas cores com alta saturação e brilho
-            if s > 100 and v > 100:  # Ajuste os limites conforme necessário
-                vibrant_pixels.append((r, g, b, s, v))
-
-        # Ordena por saturação e brilho, decrescente
-        vibrant_pixels.sort(key=lambda x: (x[3], x[4]), reverse=True)
-
-        # Retorna as `num_colors` cores mais vibrantes (R, G, B)
-        return [pixel[:3] for pixel in vibrant_pixels[:num_colors]]
-
     def color_to_qcolor(color):
         """
         Converte uma cor (R, G, B) para um objeto QColor.
@@ -837,7 +1080,7 @@ class MyLiveWallWidget(QMainWindow):
             border-radius: 8px;
             padding: 5px;
         """)
-        self.refresh_button.clicked.connect(self.update_videos)
+        self.refresh_button.clicked.connect(self.refresh_videos)
         button_layout.addWidget(self.refresh_button)
 
         # Container principal
@@ -869,6 +1112,16 @@ class MyLiveWallWidget(QMainWindow):
         # main_container_layout.addWidget(self.video_frame)
         self.main_container_layout = QGridLayout(self.video_scroll_content)
         self.main_container_layout.setSpacing(30)  # Espaçamento entre thumbnails
+
+        # Grid virtualizado (model/view) usado em bibliotecas grandes
+        self.video_model = VideoListModel(self)
+        self.video_grid_view = VideoGridView(self.video_model)
+        self.video_grid_view.video_selected.connect(self.select_video_path)
+        self.video_grid_view.playback_toggled.connect(self.toggle_model_playback)
+        self.video_grid_view.preprocess_requested.connect(self.preprocess_model_video)
+        self.video_grid_view.verticalScrollBar().valueChanged.connect(self.schedule_priority_update)
+        self.video_grid_view.hide()
+        main_layout.addWidget(self.video_grid_view)
         # self.main_container_layout.setContentsMargins(120, 60, 60, 60)  # Margens
 
 
@@ -880,7 +1133,16 @@ class MyLiveWallWidget(QMainWindow):
 
 
     def show_settings(self):
-        settings_dialog = SettingsDialogWidget(self)
+        settings_dialog = SettingsDialogWidget(self, self.player)
+        settings_dialog.accepted.connect(self.on_settings_saved)
+
+    def on_settings_saved(self):
+        settings = SettingsDialogWidget.load_settings()
+        self.transcode_queue.set_max_parallel(settings["preprocess_jobs"])
+        self.transcode_queue.encode_options = preprocess_options(settings)
+        self.warm_standby = settings["warm_standby"]
+        if not self.warm_standby and self.player is not None:
+            self.player.discard_standby()
 
     def select_folder(self):
         folder_path = QFileDialog.getExistingDirectory(self, "Select Video Folder")
@@ -890,10 +1152,67 @@ class MyLiveWallWidget(QMainWindow):
 
 
     def load_videos(self, video_dir):
-        """Obtém uma lista de vídeos no diretório especificado."""
-        videos = [os.path.join(video_dir, file) for file in os.listdir(video_dir)
-                  if file.lower().endswith((".mp4", ".mkv", ".webm"))]
-        return videos
+        """Obtém uma lista de vídeos no diretório especificado e passa a observá-lo."""
+        settings = SettingsDialogWidget.load_settings()
+        return self.library_watcher.set_directory(video_dir, settings["recursive_scan"])
+
+    def refresh_videos(self):
+        """Rescan the current folder and apply only the differences to the grid"""
+        if not self.video_dir:
+            return
+        if self.library_watcher.video_dir!=self.video_dir:
+            self.update_videos()
+            return
+        self.library_watcher.rescan()
+
+    def add_video_tiles(self, video_paths):
+        """Add tiles for new videos without rebuilding the grid"""
+        if self.virtual_grid:
+            self.video_model.add_videos(video_paths)
+        else:
+            for video_path in video_paths:
+                if video_path in self.tiles_by_path:
+                    continue
+                index = self.main_container_layout.count()
+                thumbnail = self.create_video_tile(video_path)
+                self.main_container_layout.addWidget(thumbnail, index // self.grid_columns, index % self.grid_columns)
+
+        for video_path in video_paths:
+            self.thumbnail_scheduler.submit(video_path, PRIORITY_VISIBLE)
+        self.schedule_priority_update()
+
+    def remove_video_tiles(self, video_paths):
+        """Remove the tiles of deleted or renamed videos"""
+        removed = set(video_paths)
+        for video_path in removed:
+            self.thumbnail_scheduler.cancel(video_path)
+            self.pending_tile_updates.pop(video_path, None)
+
+        if self.virtual_grid:
+            self.video_model.remove_videos(removed)
+            if self.selected_video_path in removed:
+                self.selected_video_path = None
+            return
+
+        for video_path in removed:
+            widget = self.tiles_by_path.pop(video_path, None)
+            if widget is None:
+                continue
+            self.main_container_layout.removeWidget(widget)
+            widget.setParent(None)
+            widget.deleteLater()
+            if widget==self.selected_thumbnail:
+                self.selected_thumbnail = None
+                self.selected_video_path = None
+            if widget==self.playing_thumbnail:
+                self.playing_thumbnail = None
+        self.relayout_grid()
+
+    def relayout_grid(self):
+        """Close the gaps left by removed tiles"""
+        widgets = [self.main_container_layout.itemAt(i).widget() for i in range(self.main_container_layout.count())]
+        for i, widget in enumerate(widgets):
+            self.main_container_layout.addWidget(widget, i // self.grid_columns, i % self.grid_columns)
 
     def update_videos(self, initial_video=None, is_playing=False):
         """Atualiza a lista de vídeos"""
@@ -901,6 +1220,13 @@ class MyLiveWallWidget(QMainWindow):
             return
 
         self.selected_thumbnail = None
+        self.playing_thumbnail = None
+        self.tiles_by_path.clear()
+        self.pending_tile_updates.clear()
+        self.tile_update_timer.stop()
+
+        # Descarta jobs de miniaturas dos tiles que serão destruídos
+        self.thumbnail_scheduler.clear()
 
         # Limpar layout existente
         while self.main_container_layout.count():
@@ -912,19 +1238,52 @@ class MyLiveWallWidget(QMainWindow):
 
         # Carregar vídeos
         videos = self.load_videos(self.video_dir)
+        visible_count = self.estimate_visible_count()
+
+        # Bibliotecas grandes usam o grid virtualizado
+        settings = SettingsDialogWidget.load_settings()
+        self.virtual_grid = len(videos) >= int(settings["virtual_grid_threshold"])
+        self.video_scroll_area.setVisible(not self.virtual_grid)
+        self.video_grid_view.setVisible(self.virtual_grid)
+        self.visible_paths = set()
+        if self.virtual_grid:
+            self.populate_virtual_grid(videos, initial_video, is_playing, visible_count)
+        else:
+            self.video_model.set_videos([])
+            self.populate_widget_grid(videos, initial_video, is_playing, visible_count)
+
+        self.schedule_priority_update()
+        self.start_metadata_revalidation(videos)
+
+    def populate_virtual_grid(self, videos, initial_video, is_playing, visible_count):
+        """Fill the model of the virtualized grid; cells are only painted when visible"""
+        current = None
+        if initial_video:
+            current = next((path for path in videos if os.path.samefile(path, initial_video)), None)
+
+        self.video_model.set_videos(videos, playing_path=current if is_playing else None)
+        for i, video_path in enumerate(videos):
+            if video_path==current:
+                priority = PRIORITY_CURRENT
+            elif i < visible_count:
+                priority = PRIORITY_VISIBLE
+            else:
+                priority = PRIORITY_OFFSCREEN
+            self.thumbnail_scheduler.submit(video_path, priority)
+            if self.transcode_queue.is_active(video_path):
+                self.video_model.set_processing(video_path, True)
+
+        if current:
+            self.video_grid_view.select_video(current)
+            self.select_video_path(current)
+
+    def populate_widget_grid(self, videos, initial_video, is_playing, visible_count):
+        """Create one VideoThumbnailWidget per video"""
         for i, video_path in enumerate(videos):
             is_current = initial_video and os.path.samefile(video_path, initial_video)
 
             # Criar thumbnail
-            temp_thumbnail = VideoThumbnailWidget(
-                self.video_frame,
-                video_path,
-                None,
-                None,
-                self.select_video,
-                self.toggle_video_playback,
-                is_playing=is_playing and is_current
-            )
+            temp_thumbnail = self.create_video_tile(video_path, is_playing=is_playing and is_current)
 
             # Configurar tamanho
             # temp_thumbnail.setFixedSize(self.THUMBNAIL_WIDTH, self.THUMBNAIL_HEIGHT)
@@ -935,68 +1294,256 @@ class MyLiveWallWidget(QMainWindow):
             self.main_container_layout.addWidget(temp_thumbnail, row, col)
 
             # Iniciar carregamento das miniaturas
-            self.start_thumbnail_loading(temp_thumbnail, video_path, is_current)
-
-    def start_thumbnail_loading(self, thumbnail, video_path, is_current):
+            if is_current:
+                priority = PRIORITY_CURRENT
+            elif i < visible_count:
+                priority = PRIORITY_VISIBLE
+            else:
+                priority = PRIORITY_OFFSCREEN
+            self.start_thumbnail_loading(temp_thumbnail, video_path, is_current, priority)
+
+    def create_video_tile(self, video_path, is_playing=False):
+        thumbnail = VideoThumbnailWidget(
+            self.video_frame,
+            video_path,
+            None,
+            None,
+            self.select_video,
+            self.toggle_video_playback,
+            is_playing=is_playing,
+            on_path_changed=self.on_tile_renamed,
+            on_preprocess=lambda tile: self.toggle_preprocess(tile.video_path)
+        )
+        self.tiles_by_path[video_path] = thumbnail
+        if self.transcode_queue.is_active(video_path):
+            thumbnail.set_processing(True)
+        if is_playing:
+            self.playing_thumbnail = thumbnail
+        return thumbnail
+
+    def on_tile_renamed(self, thumbnail, old_path, new_path):
+        """Keep the path index in sync after a preprocessed video replaces its source"""
+        if self.tiles_by_path.get(old_path) is thumbnail:
+            del self.tiles_by_path[old_path]
+        self.tiles_by_path[new_path] = thumbnail
+        self.pending_tile_updates.pop(old_path, None)
+        if self.selected_video_path==old_path:
+            self.selected_video_path = new_path
+        self.forget_renamed(old_path)
+        self.start_thumbnail_loading(thumbnail, new_path, False, self.tile_priority(thumbnail))
+
+    def forget_renamed(self, old_path):
+        """Drop the job and index rows of a replaced source; previews and metadata are keyed on the file"""
+        self.thumbnail_scheduler.cancel(old_path)
+        LiveWallMetadataIndex.shared().remove(old_path)
+
+    def start_metadata_revalidation(self, videos):
+        """Re-probe in background only the files changed since they were indexed"""
+        if self.metadata_revalidator and self.metadata_revalidator.isRunning():
+            self.metadata_revalidator.requestInterruption()
+            self.metadata_revalidator.wait()
+        self.metadata_revalidator = MetadataRevalidator(self.video_dir, videos)
+        self.metadata_revalidator.metadata_ready.connect(self.on_metadata_loaded)
+        self.metadata_revalidator.start()
+
+    def start_thumbnail_loading(self, thumbnail, video_path, is_current, priority=PRIORITY_OFFSCREEN):
         """Inicia o carregamento das miniaturas em background"""
-        thumbnail_loaderImg = ImageLoader(video_path)
-        thumbnail_loaderGif = GifLoader(video_path)
+        self.thumbnail_scheduler.submit(video_path, priority)
 
-        thumbnail_loaderImg.thumbnail_ready.connect(self.on_thumbnail_loadedImg)
-        thumbnail_loaderGif.thumbnail_ready.connect(self.on_thumbnail_loadedGif)
+        if is_current:
+            self.select_video(thumbnail)
 
-        thumbnail_loaderImg.start()
-        thumbnail_loaderGif.start()
+    def on_thumbnails_idle(self):
+        """Report cache efficiency once every queued thumbnail job is done"""
+        print(f"Cache de previews: {PreviewCache.shared().stats()}")
 
-        self.thumbnail_loaders.append(thumbnail_loaderImg)
-        self.thumbnail_loaders.append(thumbnail_loaderGif)
+    def estimate_visible_count(self):
+        """Estimate how many tiles fit in the viewport before the grid is laid out"""
+        spacing = self.main_container_layout.spacing()
+        rows = self.video_scroll_area.viewport().height() // (self.THUMBNAIL_HEIGHT + spacing) + 1
+        return rows * self.grid_columns
+
+    def schedule_priority_update(self):
+        self.visibility_timer.start(100)
+
+    def update_thumbnail_priorities(self):
+        """Prioritize the jobs of visible and selected/playing tiles"""
+        if self.virtual_grid:
+            visible = set(self.video_grid_view.visible_paths())
+            for video_path in self.visible_paths - visible:
+                self.thumbnail_scheduler.set_priority(video_path, PRIORITY_OFFSCREEN)
+            for video_path in visible:
+                self.thumbnail_scheduler.set_priority(video_path, PRIORITY_VISIBLE)
+            for video_path in (self.selected_video_path, self.video_model.playing_path()):
+                if video_path:
+                    self.thumbnail_scheduler.set_priority(video_path, PRIORITY_CURRENT)
+            self.visible_paths = visible
+            return
 
-        if is_current:
-            self.select_video(thumbnail)
+        for widget in self.tiles_by_path.values():
+            self.thumbnail_scheduler.set_priority(widget.video_path, self.tile_priority(widget))
+
+    def tile_priority(self, widget):
+        if widget==self.selected_thumbnail or widget.is_playing:
+            return PRIORITY_CURRENT
+        if not widget.visibleRegion().isEmpty():
+            return PRIORITY_VISIBLE
+        return PRIORITY_OFFSCREEN
 
     def on_thumbnail_loadedImg(self, video_path, thumbnail_path):
         """Atualiza a miniatura do vídeo assim que o carregamento assíncrono estiver concluído."""
-        # Procurar o item de miniatura que corresponde ao caminho do vídeo e atualizar
-        for i in range(self.main_container_layout.count()):
-            widget = self.main_container_layout.itemAt(i).widget()
-            if isinstance(widget, VideoThumbnailWidget) and widget.video_path==video_path:
-                widget.update_thumbnail(thumbnail_path, None)
-                break
+        self.queue_tile_update(video_path, thumbnail_path=thumbnail_path)
 
     def on_thumbnail_loadedGif(self, video_path, preview_path):
         """Atualiza a miniatura do vídeo assim que o carregamento assíncrono estiver concluído."""
-        # Procurar o item de miniatura que corresponde ao caminho do vídeo e atualizar
-        for i in range(self.main_container_layout.count()):
-            widget = self.main_container_layout.itemAt(i).widget()
-            if isinstance(widget, VideoThumbnailWidget) and widget.video_path==video_path:
-                widget.update_thumbnail(None, preview_path)
-                break
+        self.queue_tile_update(video_path, preview_path=preview_path)
+
+    def on_metadata_loaded(self, video_path, probe):
+        """Atualiza o estado de pré-processamento com os metadados do job de análise."""
+        self.queue_tile_update(video_path, is_preprocessed=probe.preprocessed)
+
+    def queue_tile_update(self, video_path, **changes):
+        """Coalesce the results of many jobs into a single repaint"""
+        self.pending_tile_updates.setdefault(video_path, {}).update(changes)
+        if not self.tile_update_timer.isActive():
+            self.tile_update_timer.start(TILE_UPDATE_INTERVAL_MS)
+
+    def flush_tile_updates(self):
+        """Apply the queued thumbnail, preview and preprocess updates"""
+        updates, self.pending_tile_updates = self.pending_tile_updates, {}
+        if not updates:
+            return
+
+        if self.virtual_grid:
+            self.video_model.apply_updates(updates)
+            return
 
+        self.video_scroll_content.setUpdatesEnabled(False)
+        try:
+            for video_path, changes in updates.items():
+                widget = self.tiles_by_path.get(video_path)
+                if widget is None:
+                    continue
+                if "thumbnail_path" in changes:
+                    widget.update_thumbnail(changes["thumbnail_path"], None)
+                if "preview_path" in changes:
+                    widget.update_thumbnail(None, changes["preview_path"])
+                if "is_preprocessed" in changes:
+                    widget.on_video_checked(changes["is_preprocessed"])
+                if "progress" in changes:
+                    widget.set_progress(changes["progress"])
+        finally:
+            self.video_scroll_content.setUpdatesEnabled(True)
 
     def toggle_video_playback(self, thumbnail):
         if thumbnail.is_playing:
-            self.apply_selection()
-            self.selected_thumbnail.video_path = thumbnail.video_path
+            self.apply_selection(thumbnail.video_path)
             self.wallpaper_state.save_state(thumbnail.video_path, True)
         else:
-            self.process_manager.kill_processes()
-            self.video_process = None
+            self.stop_wallpaper()
             self.wallpaper_state.save_state(thumbnail.video_path, False)
 
-        for i in range(self.main_container_layout.count()):
-            widget = self.main_container_layout.itemAt(i).widget()
-            if isinstance(widget, VideoThumbnailWidget) and widget!=thumbnail:
-                widget.set_playing(False)
+        # Só o tile que tocava antes precisa ser desmarcado
+        previous = self.playing_thumbnail
+        if previous is not None and previous is not thumbnail:
+            previous.set_playing(False)
+        self.playing_thumbnail = thumbnail if thumbnail.is_playing else None
 
     def select_video(self, thumbnail):
         if self.selected_thumbnail:
             self.selected_thumbnail.set_selected(False)
         thumbnail.set_selected(True)
         self.selected_thumbnail = thumbnail
+        self.selected_video_path = thumbnail.video_path
+        self.thumbnail_scheduler.set_priority(thumbnail.video_path, PRIORITY_CURRENT)
+        self.schedule_priority_update()
+        self.schedule_standby(thumbnail.video_path)
+
+    def select_video_path(self, video_path):
+        """Selection coming from the virtualized grid"""
+        self.selected_video_path = video_path
+        self.thumbnail_scheduler.set_priority(video_path, PRIORITY_CURRENT)
+        self.schedule_priority_update()
+        self.schedule_standby(video_path)
+
+    def toggle_model_playback(self, video_path):
+        """Play/stop toggle coming from the virtualized grid"""
+        item = self.video_model.item(video_path)
+        if item is None:
+            return
+        if not item.is_playing:
+            self.video_model.set_playing(video_path)
+            self.apply_selection(video_path)
+        else:
+            self.video_model.set_playing(None)
+            self.stop_wallpaper()
+            self.wallpaper_state.save_state(video_path, False)
+
+    def preprocess_model_video(self, video_path):
+        """Preprocess button of the virtualized grid; the state lives in the model"""
+        self.toggle_preprocess(video_path)
+
+    def toggle_preprocess(self, video_path):
+        """Queue the preprocessing of a video, or cancel it if it is already queued"""
+        if self.transcode_queue.is_active(video_path):
+            self.transcode_queue.cancel(video_path)
+            return
 
-    def apply_selection(self):
-        # Primeiro, mata processos anteriores se existirem
-        self.process_manager.kill_processes()
+        # O arquivo em reprodução será substituído pela versão processada
+        if self.virtual_grid:
+            item = self.video_model.item(video_path)
+            if item is not None and item.is_playing:
+                self.toggle_model_playback(video_path)
+        else:
+            tile = self.tiles_by_path.get(video_path)
+            if tile is not None and tile.is_playing:
+                tile.toggle_playback()
+
+        if self.transcode_queue.submit(video_path):
+            self.set_video_processing(video_path, True)
+
+    def set_video_processing(self, video_path, is_processing):
+        self.pending_tile_updates.get(video_path, {}).pop("progress", None)
+        if self.virtual_grid:
+            self.video_model.set_processing(video_path, is_processing)
+        elif video_path in self.tiles_by_path:
+            self.tiles_by_path[video_path].set_processing(is_processing)
+
+    def on_transcode_progress(self, video_path, progress):
+        self.queue_tile_update(video_path, progress=progress)
+
+    def on_transcode_cancelled(self, video_path):
+        self.set_video_processing(video_path, False)
+
+    def on_transcode_finished(self, video_path, is_processed, new_path):
+        self.pending_tile_updates.get(video_path, {}).pop("progress", None)
+        if not self.virtual_grid:
+            tile = self.tiles_by_path.get(video_path)
+            if tile is not None:
+                tile.on_video_processed(is_processed, new_path)
+            return
+
+        self.video_model.set_processing(video_path, False)
+        self.video_model.set_preprocessed(video_path, is_processed)
+        if is_processed and new_path!=video_path:
+            self.video_model.rename_video(video_path, new_path)
+            if self.selected_video_path==video_path:
+                self.selected_video_path = new_path
+            if video_path in self.visible_paths:
+                self.visible_paths.discard(video_path)
+                self.visible_paths.add(new_path)
+            if new_path in (self.selected_video_path, self.video_model.playing_path()):
+                priority = PRIORITY_CURRENT
+            elif new_path in self.visible_paths:
+                priority = PRIORITY_VISIBLE
+            else:
+                priority = PRIORITY_OFFSCREEN
+            self.forget_renamed(video_path)
+            self.thumbnail_scheduler.submit(new_path, priority)
+
+    def apply_selection(self, video_path=None):
+        video_path = video_path or self.selected_thumbnail.video_path
+        switch_start = time.perf_counter()
 
         # Carregar configurações
         settings = SettingsDialogWidget.load_settings()
@@ -1008,44 +1555,122 @@ class MyLiveWallWidget(QMainWindow):
         player.set_hwdec(settings["hwdec"])
         player.set_selected_monitor(settings["selected_monitor"])
         player.set_play_all_monitors(settings["play_all_monitors"])
-        player.set_video_path(self.selected_thumbnail.video_path)
-        player.start()
-
-        # Esperar um pouco para os processos filhos iniciarem
-        time.sleep(1)
-
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_file:
-            frame_image = temp_file.name
-        MyLiveWallWidget.capture_frame(self.selected_thumbnail.video_path, frame_image)
-        dominant_color = MyLiveWallWidget.get_dominant_color(frame_image)
-        dominant_colors= MyLiveWallWidget.get_dominant_colors(frame_image)
-        vibrant_colors = MyLiveWallWidget.get_vibrant_colors(frame_image, num_colors=3)
-        print("Cores vibrantes (R, G, B):", vibrant_colors)
-
-        print(f"Cor predominante: {dominant_color}")
-        print(f"Cores predominantes: {dominant_colors}")
-        q_color = MyLiveWallWidget.color_to_qcolor(vibrant_colors[0])
-        palette = MyLiveWallWidget.palette(self)
-        palette.setColor(QPalette.ColorRole.Window, q_color)
-        MyLiveWallWidget.setPalette(self, palette)
-        #MyLiveWallWidget.setAutoFillBackground(True)
-        self.background.setColor(q_color.getRgb()[0],q_color.getRgb()[1],q_color.getRgb()[2], 128)
+        player.set_playback_mode(settings["playback_mode"])
+        player.set_playback_caps(settings["scale_to_monitor"], settings["max_fps"], settings["monitor_caps"])
+        player.set_cache_budget(settings["loop_cache_mb"] * 2**20)
+        player.set_video_path(video_path)
+
+        # Mesma configuração de render: usa o standby pré-carregado ou troca o arquivo nas instâncias em execução
+        reused = None
+        if self.player is not None and self.player.can_reuse(player.render_config()):
+            if self.player.promote_standby(video_path):
+                reused = "standby"
+            else:
+                try:
+                    self.player.load_video(video_path)
+                    reused = "IPC loadfile"
+                except MpvIpcError as e:
+                    print(f"Erro ao trocar vídeo via IPC, reiniciando o player: {e}")
+
+        if not reused:
+            self.stop_wallpaper()
+            player.on_processes_changed = self.save_player_processes
+            player.start()
+            self.player = player
+
+            # Salvar informações dos processos
+            self.save_player_processes(player)
+
+        # Pausa as instâncias de monitores cobertos por janelas
+        if settings["pause_when_covered"]:
+            if self.occlusion_monitor.covered:
+                self.player.apply_coverage(self.occlusion_monitor.covered)
+            self.occlusion_monitor.start()
+        else:
+            self.occlusion_monitor.stop()
 
-        # Obter PIDs dos processos xwinwrap
-        child_pids = []
-        try:
-            ps_output = subprocess.check_output(['pgrep', 'xwinwrap']).decode()
-            child_pids = [int(pid) for pid in ps_output.splitlines()]
-        except subprocess.CalledProcessError:
-            pass
+        print(f"Troca de wallpaper: {(time.perf_counter() - switch_start) * 1000:.0f} ms "
+              f"({reused or 'novas instâncias'})")
 
-        # Salvar informações dos processos
-        self.process_manager.save_process_info(0, child_pids)
+        # Cor de destaque: instantânea se a paleta já foi calculada, senão em background
+        self.update_accent_color(video_path)
 
         # Save state
-        self.wallpaper_state.save_state(self.selected_thumbnail.video_path, True)
+        self.wallpaper_state.save_state(video_path, True)
+
+        return 0, self.player.pids
+
+    def schedule_standby(self, video_path):
+        """Preload the selected video once the selection settles"""
+        self.standby_video_path = video_path
+        if not self.warm_standby:
+            return
+        # Cada standby é um conjunto xwinwrap + mpv por monitor: só é substituído por uma seleção duradoura
+        replacing = self.player is not None and self.player.standby is not None
+        self.standby_timer.start(STANDBY_REPLACE_DELAY_MS if replacing else STANDBY_DELAY_MS)
+
+    def prepare_standby(self):
+        player = self.player
+        if player is None or not self.standby_video_path:
+            return
+        if self.warm_standby:
+            player.prepare_standby(self.standby_video_path)
+        else:
+            player.discard_standby()
+
+    def save_player_processes(self, player):
+        # Também chamado pela thread do supervisor quando uma instância é reiniciada
+        self.process_manager.save_process_info(0, player.process_records())
+
+    def on_topology_changed(self, old, new, diff):
+        # Recebido na thread da interface (o sinal vem da thread de topologia)
+        if self.player is not None:
+            self.player.apply_topology(old, new, diff)
+
+    def on_coverage_changed(self, covered):
+        # Chamado pela thread do monitor de oclusão; os comandos IPC são thread-safe
+        player = self.player
+        if player is not None:
+            player.apply_coverage(covered)
+
+    def stop_wallpaper(self):
+        """Stop the running instances and whatever other session left in the PID file"""
+        if self.player is not None:
+            self.player.stop()
+            self.player = None
+        self.process_manager.kill_processes()
+
+    def update_accent_color(self, video_path):
+        """Apply the palette of the wallpaper, computing it off the GUI thread if needed"""
+        self.accent_video_path = video_path
+        palette = Util.get_cached_palette(video_path, LiveWallMetadataIndex.shared())
+        if palette is not None:
+            self.apply_palette(palette)
+            return
 
-        return 0, child_pids
+        if video_path in self.palette_workers:
+            return
+        worker = PaletteWorker(video_path)
+        worker.palette_ready.connect(self.on_palette_ready)
+        worker.finished.connect(lambda: self.palette_workers.pop(video_path, None))
+        self.palette_workers[video_path] = worker
+        worker.start()
+
+    def on_palette_ready(self, video_path, palette):
+        # Ignora paletas de wallpapers que já foram trocados
+        if video_path==self.accent_video_path:
+            self.apply_palette(palette)
+
+    def apply_palette(self, palette):
+        print("Cores vibrantes (R, G, B):", palette.vibrant)
+        print(f"Cor predominante: {palette.dominant}")
+        print(f"Cores predominantes: {palette.dominant_colors}")
+        q_color = MyLiveWallWidget.color_to_qcolor(palette.accent)
+        window_palette = MyLiveWallWidget.palette(self)
+        window_palette.setColor(QPalette.ColorRole.Window, q_color)
+        MyLiveWallWidget.setPalette(self, window_palette)
+        #MyLiveWallWidget.setAutoFillBackground(True)
+        self.background.setColor(q_color.getRgb()[0],q_color.getRgb()[1],q_color.getRgb()[2], 128)
 
     def closeEvent(self, event):
         # if self.video_process:
@@ -1055,4 +1680,16 @@ class MyLiveWallWidget(QMainWindow):
         #         child.terminate()
         #     parent.terminate()  # Termina o próprio script
         #     self.video_process = None
+        self.thumbnail_scheduler.stop()
+        self.transcode_queue.stop()
+        if self.metadata_revalidator and self.metadata_revalidator.isRunning():
+            self.metadata_revalidator.requestInterruption()
+            self.metadata_revalidator.wait()
+        for worker in list(self.palette_workers.values()):
+            worker.wait()
+        self.occlusion_monitor.stop()
+        # Standbys descartados ainda podem estar sendo encerrados em segundo plano
+        ProcessReaper.shared().wait()
+        self.topology.remove_listener(self.topology_changed.emit)
+        self.topology.stop()
         self.close()
\ No newline at end of file